@@ -1,4 +1,6 @@
 import csv
+import re
+from src.rag.arabic_normalization import normalize_arabic, collapse_whitespace
 
 def read_articles(file_path):
     articles = []
@@ -8,32 +10,14 @@ def read_articles(file_path):
             articles.append(row)
     return articles
 
-def clean_text(text):
-    import re
-    import pyarabic.araby as araby
+_ARTICLE_HEADER_RE = re.compile(r'^المادة \d+ من قانون العمل المصري:')
 
+def clean_text(text):
     # Remove article header
-    text = re.sub(r'^المادة \d+ من قانون العمل المصري:', '', text)
+    text = _ARTICLE_HEADER_RE.sub('', text)
 
     # Remove extra whitespace
-    text = re.sub('\s+', ' ', text)
+    text = collapse_whitespace(text)
 
     # Normalize Arabic text
-    text = re.sub("[إأٱآا]", "ا", text)
-    text = re.sub("ى", "ي", text)
-    text = re.sub("ؤ", "ء", text)
-    text = re.sub("ئ", "ء", text)
-    text = re.sub("ة", "ه", text)
-    noise = re.compile(""" ّ    | # Tashdid
-                             َ    | # Fatha
-                             ً    | # Tanwin Fath
-                             ُ    | # Damma
-                             ٌ    | # Tanwin Damm
-                             ِ    | # Kasra
-                             ٍ    | # Tanwin Kasr
-                             ْ    | # Sukun
-                             ـ     # Tatwil/Kashida
-                         """, re.VERBOSE)
-    text = re.sub(noise, '', text)
-    text = re.sub(r'(.)\1+', r"\1\1", text)  # Remove elongation
-    return araby.strip_tashkeel(text)
\ No newline at end of file
+    return normalize_arabic(text, strip=False)
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException
+from src.rag.RAG_Pipeline import get_rag_pipeline
+from src.apis.authentication import get_current_user
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Comma-separated usernames allowed to manage the retrieval indexes
+ADMIN_USERNAMES = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
+
+router = APIRouter()
+
+# Dependency allowing only the configured admin users
+def get_admin_user(current_user: dict = Depends(get_current_user)):
+    if current_user["username"] not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+def rebuild_status(rag_pipeline):
+    return {**rag_pipeline.index_rebuild.status(), "corpus_version": rag_pipeline.retriever.corpus_version}
+
+# API endpoint for rebuilding the retrieval indexes in the background
+@router.post("/rebuild", status_code=202)
+def start_rebuild(admin_user: dict = Depends(get_admin_user), rag_pipeline=Depends(get_rag_pipeline)):
+    if not rag_pipeline.rebuild_retriever():
+        raise HTTPException(status_code=409, detail="A rebuild is already running")
+    return rebuild_status(rag_pipeline)
+
+# API endpoint for the state of the last rebuild
+@router.get("/rebuild")
+def get_rebuild_status(admin_user: dict = Depends(get_admin_user), rag_pipeline=Depends(get_rag_pipeline)):
+    return rebuild_status(rag_pipeline)
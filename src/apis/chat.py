@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
-from src.rag.RAG_Pipeline import rag_pipeline # Uncomment this line to use the actual RAG pipeline
+from src.rag.RAG_Pipeline import get_rag_pipeline # Uncomment this line to use the actual RAG pipeline
 # from src.rag.RAG_Pipeline import dummy_rag_service # Uncomment this line to use the dummy service
 from src.database.schema import insert_message, get_chat_history, get_user_chats, create_chat, update_chat_title, delete_chat, get_chat_by_id
 from src.database.models import QueryRequest, ChatCreateRequest, ChatUpdateRequest, ChatResponse, ChatListResponse, ChatHistoryResponse
@@ -7,6 +7,9 @@ from src.apis.authentication import get_current_user
 from datetime import datetime
 import json
 
+# Loaded when the API starts, before the first request
+rag_pipeline = get_rag_pipeline() # Comment this line to use the Dummy service
+
 router = APIRouter()
 
 # API endpoint for creating a new chat
@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from src.apis.authentication import router as auth_router
 from src.apis.chat import router as chat_router
+from src.apis.admin import router as admin_router
 
 # Create a FastAPI instance
 app = FastAPI()
@@ -9,6 +10,8 @@ app = FastAPI()
 app.include_router(auth_router, prefix="/auth", tags=["User"])
 # Include the chat router
 app.include_router(chat_router, prefix="/chat", tags=["Chat"])
+# Include the admin router
+app.include_router(admin_router, prefix="/admin", tags=["Admin"])
 
 # API endpoint for homepage
 @app.get("/")
@@ -1,6 +1,16 @@
+import os
+import threading
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 from transformers import AutoTokenizer, AutoModelForCausalLM
 from sentence_transformers import SentenceTransformer
 from src.rag.hybrid_retrieval import HybridRetriever
+from src.rag.artifact_versions import publish_version, remove_path, stage_version
+from src.rag.corpus_artifact import CorpusArtifact, build_corpus_artifact, is_corpus_artifact
+from src.rag.index_rebuild import IndexRebuild
+from src.rag.packed_docstore import default_docstore_path
 from src.rag.generation import LegalGenerator
 
 class DummyRAGService:
@@ -10,7 +20,7 @@ class DummyRAGService:
         self.retriever = HybridRetriever(
             documents="data/merged_data/legal_articles_with_short.json",
             vectorstore_path="data/chromadb-law",
-            docstore_path="data/docstore",
+            docstore_path=default_docstore_path(),
             embedding_model_name="intfloat/multilingual-e5-large",
             bm25_weight=0.5,
             pc_weight=0.5
@@ -60,11 +70,13 @@ class RAGPipeline:
                  embedding_model_name="intfloat/multilingual-e5-large",
                  llm_model_id="Qwen/Qwen2.5-3B-Instruct",
                  vectorstore_path="data/chromadb-law",
-                 docstore_path="data/docstore",
+                 docstore_path=None,
                 #  Update the path to finetuned model with your own path
                  finetuned_model_id="/content/drive/MyDrive/GP/llm-finetuning2/qwen-models/Qwen2.5-3B",
                  bm25_weight=0.5,
-                 pc_weight=0.5):
+                 pc_weight=0.5,
+                 sparse_index_path="data/bm25-law",
+                 **retriever_options):
         """
         Initialize the RAG Pipeline with hybrid retrieval and legal generation components.
         
@@ -72,29 +84,35 @@ class RAGPipeline:
             embedding_model_name: Model name for embeddings
             llm_model_id: Base model for generation
             vectorstore_path: Path to persist vectorstore
-            docstore_path: Path to persist document store
+            docstore_path: Path to persist document store; defaults to the packed
+                data/docstore.sqlite, or the data/docstore directory if it was not migrated
             finetuned_model_id: Path to finetuned model (optional)
             bm25_weight: Weight for BM25 retriever
             pc_weight: Weight for dense retriever
+            sparse_index_path: Directory of the BM25 index
+            retriever_options: Further HybridRetriever arguments, e.g. dense_backend="numpy"
+                and dense_index_path
         """
         self.documents = documents
         self.embedding_model_name = embedding_model_name
         self.llm_model_id = llm_model_id
         self.vectorstore_path = vectorstore_path
-        self.docstore_path = docstore_path
+        self.docstore_path = docstore_path or default_docstore_path()
         self.finetuned_model_id = finetuned_model_id
         self.bm25_weight = bm25_weight
         self.pc_weight = pc_weight
+        self.sparse_index_path = sparse_index_path
+        self.retriever_options = retriever_options
+        # Index paths -> versions built by the running rebuild, published when it is swapped in
+        self.staged_versions = {}
+        self.staged_leases = []
+        # Guards taking and replacing the live retriever
+        self._retriever_lock = threading.Lock()
         
         # Will be initialized when documents are loaded
-        self.retriever = HybridRetriever(
-            documents=self.documents,
-            vectorstore_path=self.vectorstore_path,
-            docstore_path=self.docstore_path,
-            embedding_model_name=self.embedding_model_name,
-            bm25_weight=self.bm25_weight,
-            pc_weight=self.pc_weight
-        )
+        self.retriever = self.create_retriever()
+        # Background blue/green rebuild, swapped in without restarting the API
+        self.index_rebuild = IndexRebuild(self.build_next_retriever, self.swap_retriever)
         
         # Initialize generator
         self.generator = LegalGenerator(
@@ -102,6 +120,120 @@ class RAGPipeline:
             finetuned_model_id=self.finetuned_model_id if self.finetuned_model_id else self.llm_model_id
         )
     
+    def create_retriever(self, **overrides):
+        options = dict(
+            documents=self.documents,
+            vectorstore_path=self.vectorstore_path,
+            docstore_path=self.docstore_path,
+            embedding_model_name=self.embedding_model_name,
+            bm25_weight=self.bm25_weight,
+            pc_weight=self.pc_weight,
+            sparse_index_path=self.sparse_index_path,
+            **self.retriever_options
+        )
+        options.update(overrides)
+        return HybridRetriever(**options)
+
+    def index_paths(self):
+        """
+        Live paths of the docstore, dense index (Chroma collection or NumPy index) and BM25 index,
+        and of the corpus artifact the retriever starts from, if any.
+        """
+        paths = {"docstore_path": self.docstore_path, "sparse_index_path": self.sparse_index_path}
+        if isinstance(self.documents, str) and is_corpus_artifact(self.documents):
+            paths["documents"] = self.documents
+        if self.retriever_options.get("dense_backend", "chroma") == "numpy":
+            paths["dense_index_path"] = self.retriever_options.get("dense_index_path", "data/dense-law")
+        else:
+            paths["vectorstore_path"] = self.vectorstore_path
+        return {name: path for name, path in paths.items() if path}
+
+    def build_next_retriever(self):
+        """
+        Build a retriever over the current corpus file while the live one keeps serving.
+
+        The docstore, dense index and BM25 index are written to new versions of their paths
+        (see artifact_versions), which the live retriever does not read, and are published
+        together by swap_retriever. A corpus artifact is compiled again from the corpus JSON
+        it records as its source, into a new version published with them. The loaded embedding
+        model and rerankers are shared with the new retriever instead of being loaded a second time.
+        """
+        live = self.retriever
+        staged, leases = {}, []
+        try:
+            # Leased until published, so a publish meanwhile does not remove them half-written
+            for name, path in self.index_paths().items():
+                staged[name], lease = stage_version(path)
+                leases.append(lease)
+            if "documents" in staged:
+                source_path = CorpusArtifact.read_meta(self.documents).get("source_path")
+                if not source_path or not os.path.exists(source_path):
+                    raise ValueError(f"Corpus artifact {self.documents} does not record an existing corpus JSON to rebuild it "
+                                     f"from. Compile it with `python -m src.rag.corpus_artifact --documents <corpus JSON>`.")
+                tokenizer = live.reranker.tokenizer if live.artifact_tokenizer == live.reranker.tokenizer_key else None
+                build_corpus_artifact(source_path, staged["documents"], live.processed_cache_dir, tokenizer=tokenizer,
+                                      publish=False)
+            retriever = self.create_retriever(build_indexes=True, embeddings=live.embeddings, reranker=live.reranker,
+                                              cascade_reranker=live.cascade_reranker, **staged)
+        except Exception:
+            for version in staged.values():
+                remove_path(version)
+            for lease in leases:
+                lease.release()
+            raise
+        self.staged_versions = staged
+        self.staged_leases = leases
+        return retriever
+
+    def swap_retriever(self, retriever):
+        # The staged indexes are published first, and the new retriever writes later corpus
+        # updates to the live paths, which now point at the versions it has loaded (and leases)
+        try:
+            for name, path in self.index_paths().items():
+                version = self.staged_versions.pop(name, None)
+                if version is not None:
+                    publish_version(path, version)
+                    # The retriever's attribute for its corpus is the artifact path
+                    attribute = "corpus_artifact_path" if name == "documents" else name
+                    if hasattr(retriever, attribute):
+                        setattr(retriever, attribute, path)
+        finally:
+            for lease in self.staged_leases:
+                lease.release()
+            self.staged_leases = []
+        # Requests that already took the old retriever finish on it: close() shuts its thread
+        # pool down and saves its caches once the last of them releases it
+        with self._retriever_lock:
+            previous, self.retriever = self.retriever, retriever
+        if previous is not None and previous is not retriever:
+            previous.close()
+        print(f"Retriever swapped, corpus version {retriever.corpus_version}")
+
+    def acquire_retriever(self):
+        """
+        The live retriever, retained for one request: release() it once the request is done.
+        """
+        with self._retriever_lock:
+            retriever = self.retriever
+            if not retriever:
+                raise ValueError("Retriever has not been initialized. Call initialize_retriever with documents first.")
+            return retriever.retain()
+
+    def rebuild_retriever(self, wait=False):
+        """
+        Rebuild the retrieval indexes in the background and swap them in once ready.
+
+        Args:
+            wait: Block until the rebuild finishes.
+
+        Returns:
+            bool: False if a rebuild is already running.
+        """
+        started = self.index_rebuild.start()
+        if started and wait:
+            self.index_rebuild.wait()
+        return started
+
     def generate_response(self, query, k=5):
         """
         Process a query through the RAG pipeline.
@@ -113,11 +245,13 @@ class RAGPipeline:
         Returns:
             dict: Contains retrieved contexts and generated answer
         """
-        if not self.retriever:
-            raise ValueError("Retriever has not been initialized. Call initialize_retriever with documents first.")
-        
-        # Retrieve relevant documents
-        contexts = self.retriever.retrieve_documents(query)
+        # Snapshot of the live retriever: a rebuild swapped in meanwhile does not affect this request
+        retriever = self.acquire_retriever()
+        try:
+            # Retrieve relevant documents
+            contexts = retriever.retrieve_documents(query)
+        finally:
+            retriever.release()
         
         # Generate response using the combined context
         answer = self.generator.generate_response(query, contexts)
@@ -128,5 +262,45 @@ class RAGPipeline:
             "contexts": contexts,
         }
 
-# Initialize once
-rag_pipeline = RAGPipeline() # Comment this line to use the Dummy service
\ No newline at end of file
+_rag_pipeline = None
+_rag_pipeline_lock = threading.Lock()
+# Held by the one API process serving the pipeline: a rebuild swaps the retriever of the
+# process that ran it only, so a second worker would keep serving the replaced indexes
+SERVING_LOCK_PATH = "data/api-serving.lock"
+_serving_lock_fd = None
+
+
+def acquire_serving_lock():
+    """
+    Take the exclusive serving lock (SERVING_LOCK_PATH) for this process, for as long as it runs.
+
+    Raises:
+        RuntimeError: Another process (e.g. a second uvicorn worker) serves the pipeline.
+    """
+    global _serving_lock_fd
+    if fcntl is None or _serving_lock_fd is not None:
+        return
+    os.makedirs(os.path.dirname(SERVING_LOCK_PATH) or ".", exist_ok=True)
+    fd = os.open(SERVING_LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        raise RuntimeError(f"Another process holds {SERVING_LOCK_PATH} and serves the RAG pipeline. Run the API with a "
+                           f"single worker: /admin/rebuild swaps the retriever of one process only.")
+    _serving_lock_fd = fd
+
+
+def get_rag_pipeline():
+    """
+    The RAG pipeline shared by the API routers, created (loading the models) on first use.
+    Concurrent first requests wait for the one pipeline being built instead of building their own,
+    and a second process serving the pipeline is refused (see acquire_serving_lock).
+    """
+    global _rag_pipeline
+    if _rag_pipeline is None:
+        with _rag_pipeline_lock:
+            if _rag_pipeline is None:
+                acquire_serving_lock()
+                _rag_pipeline = RAGPipeline()
+    return _rag_pipeline
\ No newline at end of file
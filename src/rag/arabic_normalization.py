@@ -0,0 +1,49 @@
+import re
+
+# Single-character rewrites applied in one str.translate pass:
+# alef variants -> bare alef, alef maqsura -> yeh, hamza carriers -> hamza, teh marbuta -> heh,
+# and tashkeel (the pyarabic.araby.TASHKEEL set) plus tatweel are deleted.
+ARABIC_NORMALIZATION_TABLE = str.maketrans({
+    "إ": "ا",
+    "أ": "ا",
+    "ٱ": "ا",
+    "آ": "ا",
+    "ى": "ي",
+    "ؤ": "ء",
+    "ئ": "ء",
+    "ة": "ه",
+    "ً": None,  # Tanwin Fath
+    "ٌ": None,  # Tanwin Damm
+    "ٍ": None,  # Tanwin Kasr
+    "َ": None,  # Fatha
+    "ُ": None,  # Damma
+    "ِ": None,  # Kasra
+    "ّ": None,  # Tashdid
+    "ْ": None,  # Sukun
+    "ـ": None,  # Tatwil/Kashida
+})
+
+# Runs of three or more identical characters are cut to two (runs of two are already final)
+_ELONGATION_RE = re.compile(r'(.)\1\1+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_arabic(text, strip=True):
+    """
+    Normalize Arabic letter variants, remove tashkeel/tatweel and cut elongations.
+
+    Args:
+        text: The text to normalize.
+        strip: Whether to strip leading and trailing whitespace first.
+
+    Returns:
+        str: The normalized text.
+    """
+    if strip:
+        text = text.strip()
+    text = text.translate(ARABIC_NORMALIZATION_TABLE)
+    return _ELONGATION_RE.sub(r'\1\1', text)
+
+
+def collapse_whitespace(text):
+    return _WHITESPACE_RE.sub(' ', text)
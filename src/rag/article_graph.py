@@ -0,0 +1,185 @@
+import ast
+from collections import deque
+from collections.abc import Sequence
+import numpy as np
+
+
+def article_key(document):
+    """
+    (law_short, article_number) key of the article a Document holds.
+    """
+    return (document.metadata.get("law_short"), str(document.metadata.get("article_number")))
+
+
+def parse_linked_articles(value):
+    """
+    Article numbers referenced by a linked_articles metadata value, e.g. "[5, 12]".
+
+    Raises:
+        ValueError: If the value is not a list (or single number) literal.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError) as e:
+            raise ValueError(f"Invalid linked_articles value {value!r}: {e}")
+    if isinstance(value, (int, str)):
+        return [value]
+    if not isinstance(value, (list, tuple)):
+        raise ValueError(f"Invalid linked_articles value {value!r}")
+    return list(value)
+
+
+class ArticleGraph:
+    def __init__(self, documents):
+        """
+        Graph of the references between articles, built once from the linked_articles metadata.
+
+        Articles are numbered in corpus order and every article keeps the tuple of article ids
+        it references within its own law, so expanding a retrieved article is a walk over
+        integers instead of parsing its metadata on every request. References to articles that
+        are not in the corpus, and unparsable metadata, are reported once here.
+
+        Args:
+            documents (list[Document]): The corpus articles, with law_short, article_number and
+                linked_articles metadata.
+        """
+        self.keys = []
+        self.ids = {}
+        self.texts = []
+        for document in documents:
+            key = article_key(document)
+            if key in self.ids:
+                continue
+            self.ids[key] = len(self.keys)
+            self.keys.append(key)
+            self.texts.append(document.metadata.get("original_text", document.page_content))
+
+        self.missing_links = []
+        self.invalid_links = []
+        self.neighbors = [()] * len(self.keys)
+        linked = set()
+        for document in documents:
+            key = article_key(document)
+            source = self.ids[key]
+            if source in linked:
+                continue
+            linked.add(source)
+            try:
+                articles = parse_linked_articles(document.metadata.get("linked_articles"))
+            except ValueError as e:
+                self.invalid_links.append((key, str(e)))
+                continue
+            targets = []
+            for article in articles:
+                target_key = (key[0], str(article))
+                target = self.ids.get(target_key)
+                if target is None:
+                    self.missing_links.append((key, target_key))
+                elif target != source and target not in targets:
+                    targets.append(target)
+            self.neighbors[source] = tuple(targets)
+        self.report()
+
+    @classmethod
+    def from_arrays(cls, keys, texts, indptr, indices):
+        """
+        Rebuild a graph saved with to_arrays(), without parsing any metadata.
+
+        Args:
+            keys: (law_short, article_number) of every article, in graph order.
+            texts: Text of every article; a sequence (e.g. a corpus artifact's memory-mapped
+                column) is kept as it is.
+            indptr, indices: CSR arrays of the linked article ids, as returned by to_arrays().
+        """
+        graph = cls.__new__(cls)
+        graph.keys = list(keys)
+        graph.ids = {key: i for i, key in enumerate(graph.keys)}
+        graph.texts = texts if isinstance(texts, Sequence) else list(texts)
+        indptr, indices = np.asarray(indptr).tolist(), np.asarray(indices).tolist()
+        graph.neighbors = [tuple(indices[start:end]) for start, end in zip(indptr[:-1], indptr[1:])]
+        graph.missing_links = []
+        graph.invalid_links = []
+        return graph
+
+    def to_arrays(self):
+        """
+        The links as CSR arrays: the int32 ids linked from article i are indices[indptr[i]:indptr[i + 1]].
+        """
+        indptr = np.zeros(len(self.neighbors) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(targets) for targets in self.neighbors])
+        indices = np.asarray([target for targets in self.neighbors for target in targets], dtype=np.int32)
+        return indptr, indices
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.ids
+
+    def report(self):
+        """
+        Print the links that could not be resolved while building the graph.
+        """
+        if self.missing_links:
+            links = ", ".join(f"{source[0]} {source[1]} -> {target[1]}" for source, target in self.missing_links)
+            print(f"Warning: {len(self.missing_links)} linked articles not found in the corpus: {links}")
+        for key, error in self.invalid_links:
+            print(f"Warning: Ignoring linked articles of {key}: {error}")
+
+    def linked_keys(self, key, max_hops=1):
+        """
+        Articles reachable from an article, nearest first.
+
+        Args:
+            key: (law_short, article_number) of the article.
+            max_hops: Maximum number of links followed; None follows every chain.
+
+        Returns:
+            list[tuple]: Keys of the linked articles, without the article itself.
+        """
+        return [self.keys[i] for i in self._walk(self.ids[key], max_hops)[1:]]
+
+    def _walk(self, start, max_hops):
+        # Breadth-first, so every article is reached by its shortest chain of links
+        order = [start]
+        seen = {start}
+        frontier = deque([(start, 0)])
+        while frontier:
+            node, hops = frontier.popleft()
+            if max_hops is not None and hops >= max_hops:
+                continue
+            for neighbor in self.neighbors[node]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    order.append(neighbor)
+                    frontier.append((neighbor, hops + 1))
+        return order
+
+    def expand(self, keys, max_hops=1):
+        """
+        Texts of the given articles, each followed by the articles it links to.
+
+        Every article appears once in the output: a linked article already included with an
+        earlier article is not repeated, and an article already included as a link gets no row
+        of its own. Keys that are not in the corpus are skipped.
+
+        Args:
+            keys: (law_short, article_number) keys, best first.
+            max_hops: Maximum number of links followed; None follows every chain.
+
+        Returns:
+            list[list[str]]: One row per article, its own text first.
+        """
+        emitted = set()
+        rows = []
+        for key in keys:
+            start = self.ids.get(key)
+            if start is None or start in emitted:
+                continue
+            row = [i for i in self._walk(start, max_hops) if i not in emitted]
+            emitted.update(row)
+            rows.append([self.texts[i] for i in row])
+        return rows
@@ -0,0 +1,264 @@
+import argparse
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # e.g. Windows: versions cannot be leased, so no replaced version is ever removed
+    fcntl = None
+
+# Version of a file or directory that existed before it was versioned
+LEGACY_VERSION = 0
+# Name of a version directory or file: <root>.v<20 digits><suffix>
+VERSION_NAME = re.compile(r"\.v\d{20}(\.[^.]*)?$")
+
+
+def _split(path):
+    path = path.rstrip(os.sep)
+    directory, name = os.path.split(path)
+    root, ext = os.path.splitext(name)
+    return directory, root, ext
+
+
+def version_path(path, version):
+    """
+    Path of a version of an index path: data/bm25-law -> data/bm25-law.v<version>, and
+    data/docstore.sqlite -> data/docstore.v<version>.sqlite (the suffix is kept).
+    """
+    directory, root, ext = _split(path)
+    return os.path.join(directory, f"{root}.v{version:020d}{ext}")
+
+
+def require_versioned(path):
+    """
+    Raise ValueError if path is a plain file or directory from before the indexes were
+    versioned: it is only versioned by an explicit migrate_legacy_path, never by a publish.
+    """
+    path = path.rstrip(os.sep)
+    if os.path.lexists(path) and not os.path.islink(path):
+        raise ValueError(f"{path} is not versioned yet. Version it once with "
+                         f"`python -m src.rag.artifact_versions --migrate {path}` before publishing a new version of it.")
+
+
+def new_version_path(path):
+    """
+    A new, not yet existing version path to write the next version of path into. Versions
+    are numbered by creation time, so a later version sorts after an earlier one.
+    """
+    require_versioned(path)
+    version = time.time_ns()
+    while os.path.lexists(version_path(path, version)):
+        version += 1
+    return version_path(path, version)
+
+
+def _version_number(path, candidate):
+    directory, root, ext = _split(path)
+    match = re.fullmatch(re.escape(root) + r"\.v(\d{20})" + re.escape(ext), os.path.basename(candidate))
+    return int(match.group(1)) if match else None
+
+
+def list_versions(path):
+    """
+    (version number, path) of every version of path on disk, oldest first.
+    """
+    directory = _split(path)[0] or "."
+    if not os.path.isdir(directory):
+        return []
+    versions = []
+    for name in os.listdir(directory):
+        number = _version_number(path, name)
+        if number is not None:
+            versions.append((number, os.path.join(_split(path)[0], name)))
+    return sorted(versions)
+
+
+def remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+class VersionLease:
+    def __init__(self, version, fd=None):
+        """
+        Shared lock on the lock file of a version (<version>.lock), held while a process has the
+        version loaded or is writing it. publish_version only removes versions nobody leases.
+
+        Args:
+            version: The leased version path.
+            fd: Open lock file holding the shared lock; None for a path that is never removed.
+        """
+        self.version = version
+        self.fd = fd
+
+    def release(self):
+        if self.fd is None:
+            return
+        # The lock file of a version that is gone (abandoned or removed) is not needed anymore
+        if not os.path.lexists(self.version) and os.path.exists(_lock_path(self.version)):
+            os.remove(_lock_path(self.version))
+        os.close(self.fd)
+        self.fd = None
+
+
+def _lock_path(path):
+    return f"{path.rstrip(os.sep)}.lock"
+
+
+def _lock(path, operation):
+    fd = os.open(_lock_path(path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, operation)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def stage_version(path):
+    """
+    A new version path of path (see new_version_path), leased before it is written so a
+    publish running meanwhile does not remove it half-written. Release the lease once the
+    version is published or removed.
+
+    Returns:
+        tuple: The version path and its VersionLease.
+    """
+    version = new_version_path(path)
+    return version, VersionLease(version, _lock(version, fcntl.LOCK_SH) if fcntl else None)
+
+
+@contextmanager
+def staged_version(path):
+    """
+    Write a new version of path: the block writes the leased version path it is given, which
+    is published once the block completes, and removed if the block raises.
+    """
+    version, lease = stage_version(path)
+    try:
+        try:
+            yield version
+        except BaseException:
+            remove_path(version)
+            raise
+        publish_version(path, version)
+    finally:
+        lease.release()
+
+
+def lease_version(path):
+    """
+    Resolve path to its current version (see resolve_version) and lease it, so a publish does
+    not remove the version while the caller has it loaded. A version removed between resolving
+    and leasing it is resolved again. A missing path, or one that is not a version (e.g. a
+    plain directory from before versioning, which is never removed), gets an empty lease.
+
+    Returns:
+        tuple: The resolved path and its VersionLease.
+    """
+    while True:
+        version = resolve_version(path)
+        if fcntl is None or not os.path.lexists(path) or not VERSION_NAME.search(os.path.basename(version.rstrip(os.sep))):
+            return version, VersionLease(version)
+        fd = _lock(version, fcntl.LOCK_SH)
+        if os.path.lexists(version):
+            return version, VersionLease(version, fd)
+        VersionLease(version, fd).release()
+        if resolve_version(path) == version:
+            # A dangling symlink: there is no newer version to resolve
+            return version, VersionLease(version)
+
+
+def _remove_unleased_versions(path):
+    # Every version but the current one that no process leases; a version being leased waits
+    # for the exclusive lock taken here, and finds the version gone once it gets its lease
+    current = _version_number(path, os.readlink(path)) if os.path.islink(path) else None
+    for number, old_path in list_versions(path):
+        if number == current:
+            continue
+        try:
+            fd = _lock(old_path, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            continue
+        remove_path(old_path)
+        os.remove(_lock_path(old_path))
+        os.close(fd)
+
+
+def _link(path, version):
+    # The new symlink is created under a unique name and renamed over path in one step
+    link_path = f"{path}.link-{os.getpid()}-{uuid.uuid4().hex}"
+    os.symlink(os.path.basename(version), link_path)
+    os.replace(link_path, path)
+
+
+def migrate_legacy_path(path):
+    """
+    Version a file or directory written before the indexes were versioned (e.g. the tracked
+    data/chromadb-law and data/docstore): it is moved to version 0 and path becomes a symlink
+    to it. Run once, explicitly, while no process is loading path.
+
+    Returns:
+        bool: False if path is missing or already versioned.
+    """
+    path = path.rstrip(os.sep)
+    if not os.path.lexists(path) or os.path.islink(path):
+        return False
+    legacy = version_path(path, LEGACY_VERSION)
+    if os.path.lexists(legacy):
+        raise ValueError(f"Cannot version {path}: {legacy} already exists")
+    os.replace(path, legacy)
+    _link(path, legacy)
+    return True
+
+
+def publish_version(path, version):
+    """
+    Make version (written to a path from stage_version) the one path points to.
+
+    path is a relative symlink to the current version, replaced by a single rename, so a
+    reader always finds a complete version at path. Every other version is then removed
+    unless a process leases it (see lease_version): replaced versions stay on disk while any
+    retriever still has them loaded, and are removed by the first publish after it released
+    them. Publishes of the same path, across processes, run one at a time.
+
+    A plain file or directory at path (from before the indexes were versioned) is never moved
+    or replaced: publishing raises ValueError until it is versioned with migrate_legacy_path.
+    """
+    path = path.rstrip(os.sep)
+    require_versioned(path)
+    if fcntl is None:
+        _link(path, version)
+        return
+    fd = _lock(path, fcntl.LOCK_EX)
+    try:
+        _link(path, version)
+        _remove_unleased_versions(path)
+    finally:
+        os.close(fd)
+
+
+def resolve_version(path):
+    """
+    The version directory or file path currently points to, resolved once so a load reads
+    every file from the same version even if a new one is published meanwhile.
+    """
+    return os.path.realpath(path) if os.path.islink(path) else path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Version index files or directories written before the indexes were versioned, once.")
+    parser.add_argument('--migrate', type=str, nargs='+', required=True, help='Paths to move to version 0 behind a symlink.')
+    args = parser.parse_args()
+    for path in args.migrate:
+        if migrate_legacy_path(path):
+            print(f"Versioned {path} as {version_path(path.rstrip(os.sep), LEGACY_VERSION)}")
+        else:
+            print(f"{path} is missing or already versioned")
@@ -0,0 +1,55 @@
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+
+# One lock per file path, so saves of the same file from different threads do not interleave
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def path_lock(path):
+    """
+    Process-wide lock serializing the writers of one file.
+
+    Args:
+        path: File path; equivalent spellings of the same path share a lock.
+
+    Returns:
+        threading.Lock for the path.
+    """
+    key = os.path.abspath(path)
+    with _path_locks_guard:
+        return _path_locks.setdefault(key, threading.Lock())
+
+
+@contextmanager
+def atomic_write(path, mode='w', encoding='utf-8'):
+    """
+    Write a file atomically: the block writes to a uniquely named temporary file next to path,
+    which replaces path once the block completes. On error path is left untouched and the
+    temporary file is removed. Writers of the same path in this process are serialized.
+
+    Args:
+        path: File to write.
+        mode: 'w' for text or 'wb' for bytes.
+        encoding: Text encoding (ignored in binary mode).
+
+    Yields:
+        File object open on the temporary file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # pid + random suffix: unique across processes and threads; mode 'x' never reuses a file
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    mode = mode.replace('w', 'x')
+    with path_lock(path):
+        try:
+            with open(tmp_path, mode, encoding=None if 'b' in mode else encoding) as f:
+                yield f
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
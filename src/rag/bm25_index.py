@@ -0,0 +1,529 @@
+import os
+import json
+import math
+import bisect
+import hashlib
+import argparse
+from collections import Counter
+from collections.abc import Sequence
+from typing import Any, Callable, List
+
+import numpy as np
+from scipy import sparse
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from src.rag.artifact_versions import remove_path, resolve_version, staged_version
+
+
+# Bump whenever the on-disk layout written by BM25Index.save changes
+BM25_INDEX_VERSION = 3
+
+# MaxScore only pays off for short queries on large corpora; the sparse product wins otherwise.
+# Measured with tests/benchmark_bm25.py --query_terms 2 4 8 0 (ms/query, exhaustive vs MaxScore;
+# the evaluation questions have ~12 distinct terms):
+#   3.5k docs: 2 terms 0.30 vs 0.15, 4 terms 0.34 vs 0.33, questions 0.32 vs 0.93
+#   35k docs:  4 terms 1.09 vs 0.72, 8 terms 1.08 vs 1.67, questions 1.39 vs 2.53
+#   354k docs: 4 terms 10.9 vs 5.2,  8 terms 8.9 vs 7.0,   questions 11.0 vs 13.8
+MAXSCORE_MIN_DOCS = 30000
+MAXSCORE_MAX_TERMS = 4
+
+
+def default_preprocessing_func(text):
+    return text.split()
+
+
+def corpus_fingerprint(texts):
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def top_k(doc_ids, scores, k):
+    """
+    Select the k best (doc_id, score) pairs, ordered by score descending then doc id ascending.
+    """
+    if len(scores) > k:
+        kth_score = np.partition(scores, len(scores) - k)[len(scores) - k]
+        mask = scores >= kth_score
+        doc_ids, scores = doc_ids[mask], scores[mask]
+    order = np.lexsort((doc_ids, -scores))[:k]
+    return doc_ids[order], scores[order]
+
+
+class MappedVocabulary:
+    def __init__(self, blob, offsets):
+        """
+        Read-only term -> id mapping over a sorted, memory-mapped UTF-8 term blob.
+
+        Term ids are positions in sorted order, so lookups are a binary search and nothing
+        has to be deserialized at startup.
+        """
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def term(self, term_id):
+        return bytes(self.blob[self.offsets[term_id]:self.offsets[term_id + 1]]).decode('utf-8')
+
+    def get(self, term, default=None):
+        terms = _TermSequence(self)
+        term_id = bisect.bisect_left(terms, term)
+        if term_id < len(self) and terms[term_id] == term:
+            return term_id
+        return default
+
+    def __contains__(self, term):
+        return self.get(term) is not None
+
+    def __getitem__(self, term):
+        term_id = self.get(term)
+        if term_id is None:
+            raise KeyError(term)
+        return term_id
+
+    def items(self):
+        return ((self.term(term_id), term_id) for term_id in range(len(self)))
+
+
+class _TermSequence:
+    # Sequence view used by bisect; terms are decoded lazily
+    def __init__(self, vocabulary):
+        self.vocabulary = vocabulary
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def __getitem__(self, term_id):
+        return self.vocabulary.term(term_id)
+
+
+class BM25Index:
+    def __init__(self, vocabulary, matrix, doc_len, k1=1.5, b=0.75, epsilon=0.25, term_max=None, term_freqs=None):
+        """
+        Sparse BM25 index: a CSR term-document matrix whose entries are precomputed BM25 weights.
+
+        Scoring a query is a single sparse (1 x terms) @ (terms x docs) product. Weights follow
+        rank_bm25's BM25Okapi, including its epsilon floor for negative idf values.
+
+        Args:
+            vocabulary: Mapping of term -> row in the matrix.
+            matrix: scipy.sparse.csr_matrix of shape (n_terms, n_docs), float32 weights.
+            doc_len: Array with the number of tokens of each document.
+            term_max: Per-term maximum weight (MaxScore upper bounds); computed if omitted.
+            term_freqs: Raw term frequency of every matrix entry (aligned with matrix.data), which
+                with_changes() recomputes the weights from.
+        """
+        self.vocabulary = vocabulary
+        self.matrix = matrix
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.term_max = term_max if term_max is not None else self._compute_term_max(matrix)
+        self.term_freqs = term_freqs
+        # MaxScore bounds only hold when no weight can lower a score
+        self.has_negative_weights = bool(len(matrix.data) and matrix.data.min() < 0)
+
+    @staticmethod
+    def _compute_term_max(matrix):
+        term_max = np.zeros(matrix.shape[0], dtype=np.float32)
+        non_empty = np.diff(matrix.indptr) > 0
+        if non_empty.any():
+            term_max[non_empty] = np.maximum.reduceat(matrix.data, matrix.indptr[:-1][non_empty])
+        return term_max
+
+    @property
+    def num_docs(self):
+        return self.matrix.shape[1]
+
+    @classmethod
+    def from_tokenized(cls, tokenized_docs, k1=1.5, b=0.75, epsilon=0.25):
+        term_counts = [Counter(tokens) for tokens in tokenized_docs]
+        terms = sorted(set().union(*term_counts)) if term_counts else []
+        vocabulary = {term: term_id for term_id, term in enumerate(terms)}
+
+        rows, cols, tfs = [], [], []
+        for doc_id, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                rows.append(vocabulary[term])
+                cols.append(doc_id)
+                tfs.append(tf)
+        return cls.from_term_frequencies(terms, rows, cols, tfs, len(tokenized_docs), k1=k1, b=b, epsilon=epsilon)
+
+    @classmethod
+    def from_term_frequencies(cls, terms, rows, cols, tfs, num_docs, k1=1.5, b=0.75, epsilon=0.25):
+        """
+        Build the index from (term id, doc id, term frequency) triplets.
+
+        Args:
+            terms: Sorted vocabulary; rows index into it.
+            rows, cols, tfs: Term id, document id and frequency of every (term, document) pair.
+            num_docs: Number of documents (columns).
+        """
+        vocabulary = {term: term_id for term_id, term in enumerate(terms)}
+        tf = sparse.csr_matrix(
+            (np.asarray(tfs, dtype=np.float32), (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int32))),
+            shape=(len(terms), num_docs),
+        )
+        tf.sum_duplicates()
+        tf.sort_indices()
+        tfs = tf.data.astype(np.float64)
+        doc_len = np.bincount(tf.indices, weights=tfs, minlength=num_docs).astype(np.int32)
+
+        avgdl = doc_len.sum() / num_docs if num_docs else 0.0
+        doc_freq = np.diff(tf.indptr)
+        idf = np.asarray([math.log(num_docs - df + 0.5) - math.log(df + 0.5) for df in doc_freq.tolist()])
+        if len(idf):
+            idf[idf < 0] = epsilon * idf.mean()
+
+        term_ids = np.repeat(np.arange(len(terms)), doc_freq)
+        length_norm = k1 * (1 - b + b * doc_len[tf.indices] / avgdl) if num_docs else np.zeros(0)
+        weights = idf[term_ids] * (tfs * (k1 + 1) / (tfs + length_norm))
+
+        # Same sparsity pattern as the frequencies, so term_freqs stays aligned with matrix.data
+        matrix = sparse.csr_matrix((weights.astype(np.float32), tf.indices, tf.indptr), shape=tf.shape)
+        return cls(vocabulary, matrix, doc_len, k1=k1, b=b, epsilon=epsilon, term_freqs=tf.data)
+
+    def terms(self):
+        return [term for term, _ in sorted(self.vocabulary.items(), key=lambda item: item[1])]
+
+    def with_changes(self, replaced=None, removed=(), appended=()):
+        """
+        A new index with some documents replaced, removed or appended, without re-tokenizing
+        the unchanged ones.
+
+        Every weight depends on the corpus statistics (idf, average length), so all weights are
+        recomputed, but from the stored term frequencies in a few vectorized passes.
+
+        Args:
+            replaced: Mapping of doc id -> new tokens; the document keeps its position.
+            removed: Doc ids to drop; the following documents move up.
+            appended: Tokens of the documents added after the remaining ones.
+
+        Returns:
+            BM25Index: The updated index; this one is left unchanged.
+        """
+        if self.term_freqs is None:
+            raise ValueError("This index has no term frequencies; rebuild it with from_tokenized()")
+        replaced = replaced or {}
+        dropped = np.zeros(self.num_docs, dtype=bool)
+        dropped[list(removed)] = True
+        new_ids = np.cumsum(~dropped) - 1
+        num_docs = int((~dropped).sum()) + len(appended)
+        dropped[list(replaced)] = True
+
+        # Kept entries of the unchanged documents, remapped to the new doc ids and vocabulary
+        term_ids = np.repeat(np.arange(self.matrix.shape[0]), np.diff(self.matrix.indptr))
+        keep = ~dropped[self.matrix.indices]
+        old_terms = self.terms()
+        used_term_ids = np.unique(term_ids[keep])
+        changed = [(int(new_ids[doc_id]), Counter(tokens)) for doc_id, tokens in replaced.items()]
+        changed += [(num_docs - len(appended) + i, Counter(tokens)) for i, tokens in enumerate(appended)]
+        terms = sorted({old_terms[term_id] for term_id in used_term_ids.tolist()}.union(*(counts for _, counts in changed)))
+        vocabulary = {term: term_id for term_id, term in enumerate(terms)}
+        old_to_new = np.full(len(old_terms), -1, dtype=np.int64)
+        old_to_new[used_term_ids] = [vocabulary[old_terms[term_id]] for term_id in used_term_ids.tolist()]
+
+        rows = [old_to_new[term_ids[keep]]]
+        cols = [new_ids[self.matrix.indices[keep]]]
+        tfs = [np.asarray(self.term_freqs)[keep]]
+        for doc_id, counts in changed:
+            rows.append(np.asarray([vocabulary[term] for term in counts], dtype=np.int64))
+            cols.append(np.full(len(counts), doc_id, dtype=np.int64))
+            tfs.append(np.asarray(list(counts.values()), dtype=np.float32))
+        return self.from_term_frequencies(terms, np.concatenate(rows), np.concatenate(cols), np.concatenate(tfs), num_docs,
+                                          k1=self.k1, b=self.b, epsilon=self.epsilon)
+
+    def save(self, path, fingerprint=None, preprocess=default_preprocessing_func.__name__):
+        """
+        Write the index as a versioned directory of .npy arrays that load() can memory-map.
+
+        The directory is written next to its final location and published by swapping the
+        path symlink (see artifact_versions), so processes loading the index always find a
+        complete version at path.
+        """
+        with staged_version(path) as version:
+            self.write(version, fingerprint=fingerprint, preprocess=preprocess)
+
+    def write(self, path, fingerprint=None, preprocess=default_preprocessing_func.__name__):
+        """
+        Write the index into a new directory, e.g. a version staged to be published later.
+        """
+        try:
+            self._write(path, fingerprint, preprocess)
+        except Exception:
+            remove_path(path)
+            raise
+
+    def _write(self, path, fingerprint, preprocess):
+        os.makedirs(path)
+        terms = sorted(self.vocabulary.items(), key=lambda item: item[1])
+        encoded = [term.encode('utf-8') for term, _ in terms]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(term) for term in encoded])
+        with open(os.path.join(path, "terms.bin"), 'wb') as f:
+            f.write(b"".join(encoded))
+        np.save(os.path.join(path, "term_offsets.npy"), offsets)
+        # Keep scipy's index dtype so loading does not have to convert (and copy) the arrays
+        np.save(os.path.join(path, "indptr.npy"), self.matrix.indptr)
+        np.save(os.path.join(path, "indices.npy"), self.matrix.indices)
+        np.save(os.path.join(path, "data.npy"), self.matrix.data.astype(np.float32))
+        np.save(os.path.join(path, "doc_len.npy"), np.asarray(self.doc_len, dtype=np.int32))
+        np.save(os.path.join(path, "term_max.npy"), np.asarray(self.term_max, dtype=np.float32))
+        if self.term_freqs is not None:
+            np.save(os.path.join(path, "term_freqs.npy"), np.asarray(self.term_freqs, dtype=np.float32))
+        meta = {
+            "version": BM25_INDEX_VERSION,
+            "num_terms": self.matrix.shape[0],
+            "num_docs": self.matrix.shape[1],
+            "k1": self.k1,
+            "b": self.b,
+            "epsilon": self.epsilon,
+            "preprocess": preprocess,
+            "fingerprint": fingerprint,
+        }
+        with open(os.path.join(path, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+    @staticmethod
+    def read_meta(path):
+        with open(os.path.join(path, "meta.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load an index written by save(). With mmap, arrays stay on disk and are shared
+        between processes through the page cache.
+        """
+        path = resolve_version(path)
+        meta = cls.read_meta(path)
+        if meta.get("version") != BM25_INDEX_VERSION:
+            raise ValueError(f"BM25 index at {path} has version {meta.get('version')}, expected {BM25_INDEX_VERSION}")
+        mmap_mode = 'r' if mmap else None
+
+        def load_array(name):
+            return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+        blob_path = os.path.join(path, "terms.bin")
+        if mmap and os.path.getsize(blob_path):
+            blob = np.memmap(blob_path, dtype=np.uint8, mode='r')
+        else:
+            with open(blob_path, 'rb') as f:
+                blob = f.read()
+        vocabulary = MappedVocabulary(blob, load_array("term_offsets.npy"))
+        matrix = sparse.csr_matrix(
+            (load_array("data.npy"), load_array("indices.npy"), load_array("indptr.npy")),
+            shape=(meta["num_terms"], meta["num_docs"]), copy=False,
+        )
+        term_freqs = load_array("term_freqs.npy") if os.path.exists(os.path.join(path, "term_freqs.npy")) else None
+        return cls(vocabulary, matrix, load_array("doc_len.npy"), k1=meta["k1"], b=meta["b"], epsilon=meta["epsilon"],
+                   term_max=load_array("term_max.npy"), term_freqs=term_freqs)
+
+    def query_terms(self, query_tokens):
+        """
+        Map query tokens to (term ids, counts); unknown tokens contribute nothing to BM25.
+        """
+        term_ids = (self.vocabulary.get(token) for token in query_tokens)
+        counts = Counter(term_id for term_id in term_ids if term_id is not None)
+        terms = sorted(counts.items())
+        term_ids = np.asarray([term_id for term_id, _ in terms], dtype=np.int32)
+        term_counts = np.asarray([count for _, count in terms], dtype=np.float32)
+        return term_ids, term_counts
+
+    def _score(self, term_ids, term_counts):
+        if not len(term_ids):
+            return np.zeros(self.num_docs, dtype=np.float32)
+        query = sparse.csr_matrix(
+            (term_counts, (np.zeros(len(term_ids), dtype=np.int32), term_ids)),
+            shape=(1, self.matrix.shape[0]),
+        )
+        return (query @ self.matrix).toarray().ravel()
+
+    def get_scores(self, query_tokens):
+        return self._score(*self.query_terms(query_tokens))
+
+    def _postings(self, term_id):
+        start, end = self.matrix.indptr[term_id], self.matrix.indptr[term_id + 1]
+        return self.matrix.indices[start:end], self.matrix.data[start:end]
+
+    def search(self, query_tokens, k, method="auto"):
+        """
+        Return the ids and scores of the k best documents, like rank_bm25's get_top_n.
+
+        Args:
+            query_tokens: The tokenized query.
+            k: The number of documents to return.
+            method: "exhaustive" scores every document, "maxscore" prunes documents that
+                cannot reach the top-k, "auto" picks MaxScore for queries of at most
+                MAXSCORE_MAX_TERMS distinct terms on corpora of MAXSCORE_MIN_DOCS documents or
+                more. Both return the same documents and scores.
+        """
+        term_ids, term_counts = self.query_terms(query_tokens)
+        if method == "auto":
+            use_maxscore = self.num_docs >= MAXSCORE_MIN_DOCS and len(term_ids) <= MAXSCORE_MAX_TERMS
+            method = "maxscore" if use_maxscore else "exhaustive"
+        if method == "maxscore" and len(term_ids) > 1 and not self.has_negative_weights:
+            result = self._search_maxscore(term_ids, term_counts, k)
+            if result is not None:
+                return result
+        scores = self._score(term_ids, term_counts)
+        return top_k(np.arange(self.num_docs, dtype=np.int32), scores, k)
+
+    def _search_maxscore(self, term_ids, term_counts, k):
+        """
+        Term-at-a-time MaxScore. Terms are visited by decreasing upper bound while the current
+        top-k contenders are fully scored, which gives a lower bound on the final k-th score.
+        Once the remaining terms' bounds fall below it no unseen document can enter the top-k,
+        so only surviving candidates are updated, by binary search into the remaining (usually
+        long, low idf) posting lists, and candidates that cannot catch up are dropped.
+
+        Returns None when fewer than k documents match, so the caller falls back to the
+        exhaustive path for the zero-score padding.
+        """
+        bounds = term_counts * self.term_max[term_ids]
+        order = np.argsort(-bounds, kind="stable")
+        # remaining[pos]: the most that terms order[pos:] can still add to any document
+        remaining = np.append(np.cumsum(bounds[order][::-1])[::-1], 0.0).astype(np.float64)
+        # Partial sums run in float64 while final scores are float32, so bounds get a little slack
+        slack = 1e-4 * float(remaining[0])
+
+        accumulator = np.zeros(self.num_docs, dtype=np.float64)
+        top_docs = np.empty(0, dtype=np.int32)
+        threshold = -np.inf
+        pos = 0
+        while pos < len(order) and remaining[pos] >= threshold - slack:
+            docs, weights = self._postings(term_ids[order[pos]])
+            accumulator[docs] += term_counts[order[pos]] * weights
+            pos += 1
+            # Scores only grow, so the new top-k is among the old top-k and the docs just updated
+            in_postings, _ = self._locate(docs, top_docs)
+            contenders = np.concatenate([top_docs[~in_postings], docs])
+            top_docs, top_scores = top_k(contenders, accumulator[contenders], k)
+            if len(top_docs) < k:
+                continue
+            # Partial scores of the contenders are a lower bound on the final k-th score;
+            # their full scores are a tighter one, worth computing once the phase may end
+            threshold = max(threshold, float(top_scores[-1]))
+            if threshold < remaining[pos] <= 2 * top_scores[-1]:
+                exact_scores = self._exact_scores(top_docs, term_ids, term_counts)
+                threshold = max(threshold, float(exact_scores.min()))
+
+        # Weights are non-negative, so every document a processed term touched has a positive score
+        cand_docs = np.flatnonzero(accumulator).astype(np.int32)
+        cand_scores = accumulator[cand_docs]
+        for pos in range(pos, len(order)):
+            keep = cand_scores + remaining[pos] >= threshold - slack
+            cand_docs, cand_scores = cand_docs[keep], cand_scores[keep]
+            docs, weights = self._postings(term_ids[order[pos]])
+            hits, positions = self._locate(docs, cand_docs)
+            cand_scores[hits] += term_counts[order[pos]] * weights[positions[hits]]
+
+        cand_docs = cand_docs[cand_scores >= threshold - slack]
+        if len(cand_docs) < k:
+            return None
+        final_scores = self._exact_scores(cand_docs, term_ids, term_counts)
+        if (final_scores <= 0).any():
+            return None
+        return top_k(cand_docs, final_scores, k)
+
+    def _exact_scores(self, docs, term_ids, term_counts):
+        # Summed in term id order with float32 arithmetic, exactly like the sparse product
+        scores = np.zeros(len(docs), dtype=np.float32)
+        for term_id, term_count in zip(term_ids, term_counts):
+            posting_docs, weights = self._postings(term_id)
+            hits, positions = self._locate(posting_docs, docs)
+            scores[hits] += term_count * weights[positions[hits]]
+        return scores
+
+    @staticmethod
+    def _locate(posting_docs, docs):
+        positions = np.minimum(np.searchsorted(posting_docs, docs), max(len(posting_docs) - 1, 0))
+        if not len(posting_docs):
+            return np.zeros(len(docs), dtype=bool), positions
+        return posting_docs[positions] == docs, positions
+
+
+class BM25IndexRetriever(BaseRetriever):
+    """Drop-in replacement for langchain's BM25Retriever backed by a BM25Index."""
+
+    index: Any
+    # A list of Documents, or any sequence of them such as a CorpusStore view
+    docs: Any
+    k: int = 4
+    preprocess_func: Callable[[str], List[str]] = default_preprocessing_func
+
+    @classmethod
+    def from_documents(cls, documents, k=4, preprocess_func=default_preprocessing_func, index_path=None, **bm25_params):
+        """
+        Build the retriever, memory-mapping a prebuilt index from index_path when it matches
+        the documents, and tokenizing the documents otherwise.
+        """
+        if not isinstance(documents, Sequence):
+            documents = list(documents)
+        index = None
+        if index_path and os.path.exists(os.path.join(index_path, "meta.json")):
+            # Checked and loaded from the same version, even if a new one is published meanwhile
+            index_path = resolve_version(index_path)
+            meta = BM25Index.read_meta(index_path)
+            fingerprint = corpus_fingerprint(doc.page_content for doc in documents)
+            if (meta.get("version") == BM25_INDEX_VERSION and meta.get("fingerprint") == fingerprint
+                    and meta.get("preprocess") == preprocess_func.__name__):
+                index = BM25Index.load(index_path)
+            else:
+                print(f"Warning: BM25 index at {index_path} is stale, rebuilding in memory. "
+                      f"Run `python -m src.rag.bm25_index` to refresh it.")
+        if index is None:
+            index = BM25Index.from_tokenized(
+                [preprocess_func(doc.page_content) for doc in documents], **bm25_params
+            )
+        return cls(index=index, docs=documents, k=k, preprocess_func=preprocess_func)
+
+    def with_changes(self, replaced=None, removed=(), appended=(), docs=None):
+        """
+        A new retriever with some documents replaced, removed or appended; only those are tokenized.
+
+        Args:
+            replaced: Mapping of doc id (position in docs) -> new Document.
+            removed: Doc ids to drop.
+            appended: Documents added at the end.
+            docs: The updated documents, if the caller already holds them (e.g. a new CorpusStore view).
+        """
+        replaced = replaced or {}
+        removed = set(removed)
+        index = self.index.with_changes(
+            replaced={doc_id: self.preprocess_func(doc.page_content) for doc_id, doc in replaced.items()},
+            removed=removed,
+            appended=[self.preprocess_func(doc.page_content) for doc in appended],
+        )
+        if docs is None:
+            docs = [replaced.get(doc_id, doc) for doc_id, doc in enumerate(self.docs) if doc_id not in removed] + list(appended)
+        return type(self)(index=index, docs=docs, k=self.k, preprocess_func=self.preprocess_func)
+
+    def search_with_scores(self, query, k=None):
+        doc_ids, scores = self.index.search(self.preprocess_func(query), k or self.k)
+        return [(self.docs[doc_id], float(score)) for doc_id, score in zip(doc_ids.tolist(), scores.tolist())]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores(query)]
+
+
+def build_index(documents_path, output_path):
+    with open(documents_path, 'r', encoding='utf-8') as f:
+        texts = [item['page_content'] for item in json.load(f)]
+    index = BM25Index.from_tokenized([default_preprocessing_func(text) for text in texts])
+    index.save(output_path, fingerprint=corpus_fingerprint(texts))
+    print(f"BM25 index with {index.matrix.shape[0]} terms and {index.num_docs} documents written to {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the on-disk BM25 index used by HybridRetriever.")
+    parser.add_argument('--documents', type=str, default="data/merged_data/legal_articles_with_short.json", help='Path to the documents JSON file.')
+    parser.add_argument('--output', type=str, default="data/bm25-law", help='Directory to write the index to.')
+    args = parser.parse_args()
+    build_index(args.documents, args.output)
@@ -0,0 +1,208 @@
+import atexit
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+from langchain_core.stores import BaseStore
+from src.rag.atomic_files import atomic_write
+
+
+class LRUCache:
+    def __init__(self, max_size=1024):
+        """
+        Bounded, thread-safe least-recently-used cache with hit/miss counters.
+
+        Args:
+            max_size: Maximum number of entries kept; the least recently used one is evicted first.
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self.entries.pop(key, default)
+
+    def items(self):
+        with self._lock:
+            return list(self.entries.items())
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# Persistent query embedding caches still alive, saved once at exit. A WeakSet rather than one
+# atexit hook per instance, which would keep every cache (and its model) alive until exit;
+# a cache released before exit saves itself in close() or when it is collected
+_persistent_embeddings = weakref.WeakSet()
+
+
+@atexit.register
+def _save_persistent_embeddings():
+    for embeddings in list(_persistent_embeddings):
+        embeddings.save()
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings, model_name, max_size=1024, path=None, save_every=32):
+        """
+        Query embedding cache in front of an Embeddings model.
+
+        Query vectors are kept in an LRU cache keyed by (model name, query text), so a repeated
+        question skips the encoder forward pass. Document embedding is passed through uncached.
+
+        Args:
+            embeddings: The wrapped Embeddings instance.
+            model_name: Name of the embedding model, part of the cache key.
+            max_size: Maximum number of cached query vectors.
+            path: JSON file the cache is persisted to across restarts. None keeps it in memory only.
+            save_every: Number of new entries after which the cache is written to disk.
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = LRUCache(max_size)
+        self.path = path
+        self.save_every = save_every
+        self._unsaved = 0
+        self._save_lock = threading.Lock()
+        self._load()
+        if self.path:
+            _persistent_embeddings.add(self)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Ignoring unreadable query embedding cache {self.path}: {e}")
+            return
+        if payload.get("model") != self.model_name:
+            return
+        # Entries are stored least recently used first, so the newest survive a smaller max_size
+        for text, vector in payload.get("entries", []):
+            self.cache.put((self.model_name, text), vector)
+
+    def embed_query(self, text):
+        key = (self.model_name, text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(key, vector)
+            with self._save_lock:
+                self._unsaved += 1
+                due = self._unsaved >= self.save_every
+            if self.path and due:
+                self.save()
+        return list(vector)
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def stats(self):
+        return self.cache.stats()
+
+    def save(self):
+        """
+        Atomically write the cached query vectors to disk if new ones were added.
+        """
+        if not self.path or not self._unsaved:
+            return
+        with self._save_lock:
+            entries = [[text, vector] for (model_name, text), vector in self.cache.items()]
+            with atomic_write(self.path) as f:
+                json.dump({"model": self.model_name, "entries": entries}, f, ensure_ascii=False)
+            self._unsaved = 0
+
+    def close(self):
+        """
+        Save the cache when its owner releases it (e.g. a retriever replaced by a rebuild).
+        """
+        self.save()
+
+    def __del__(self):
+        # Collected before exit, the cache is no longer in _persistent_embeddings
+        try:
+            self.save()
+        except Exception:
+            pass
+
+
+class CachedDocstore(BaseStore):
+    def __init__(self, store, max_size=1024):
+        """
+        Parent document cache in front of a document store.
+
+        Documents are kept in an LRU cache by key, so the parents of frequent chunks are not
+        read and deserialized again. Writes and deletes go through to the store and update the
+        cache.
+
+        Args:
+            store: The wrapped BaseStore of Documents.
+            max_size: Maximum number of cached documents.
+        """
+        self.store = store
+        self.cache = LRUCache(max_size)
+
+    def mget(self, keys):
+        documents = [self.cache.get(key) for key in keys]
+        missing = [i for i, document in enumerate(documents) if document is None]
+        if missing:
+            for i, document in zip(missing, self.store.mget([keys[i] for i in missing])):
+                documents[i] = document
+                if document is not None:
+                    self.cache.put(keys[i], document)
+        return documents
+
+    def mset(self, key_value_pairs):
+        key_value_pairs = list(key_value_pairs)
+        self.store.mset(key_value_pairs)
+        for key, document in key_value_pairs:
+            self.cache.put(key, document)
+
+    def mdelete(self, keys):
+        self.store.mdelete(keys)
+        for key in keys:
+            self.cache.pop(key)
+
+    def yield_keys(self, prefix=None):
+        return self.store.yield_keys(prefix=prefix)
+
+    def stats(self):
+        return self.cache.stats()
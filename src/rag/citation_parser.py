@@ -0,0 +1,108 @@
+import re
+from src.rag.arabic_normalization import normalize_arabic
+
+# Arabic-Indic and Extended Arabic-Indic (Persian) digits -> ASCII digits
+DIGIT_TABLE = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+
+# Longest range expanded, so a typo like "المواد من 1 إلى 1000" cannot pull in a whole law
+MAX_RANGE_ARTICLES = 50
+
+# Matched on normalized text (teh marbuta -> heh, alef variants -> bare alef)
+_ARTICLE_WORD_RE = re.compile(r'^[وفبل]?(?:ال|لل)?(?:ماده|مادتين|مادتان|مواد)$')
+_LAW_WORD_RE = re.compile(r'^[وفبل]?(?:ال|لل)?قانون$')
+_TOKEN_RE = re.compile(r'\d+|[^\W\d_]+|[-–،,]')
+_FILLER_WORDS = {"رقم", "ارقام", "رقمي", "برقم", "من"}
+_LIST_WORDS = {"و", "،", ","}
+_RANGE_WORDS = {"الي", "حتي", "لغايه", "-", "–"}
+_LAW_PREFIX_WORDS = {"من", "في", "ب", "ل"}
+
+
+def normalize_citation_text(text):
+    return normalize_arabic(text.translate(DIGIT_TABLE))
+
+
+def _law_name(token):
+    # "العمل" and "عمل" name the same law
+    return token[2:] if token.startswith("ال") else token
+
+
+def _match_law(token, law_names):
+    if law_names is None:
+        return token
+    return law_names.get(_law_name(token))
+
+
+def _read_numbers(tokens, start, max_range):
+    # Article numbers after an article word: lists ("12 و13"، "12، 13") and ranges ("من 10 إلى 15")
+    numbers = []
+    pending_range = False
+    i = start
+    while i < len(tokens):
+        token = tokens[i]
+        if token.isdigit():
+            number = int(token)
+            if pending_range and numbers:
+                low, high = sorted((numbers[-1], number))
+                numbers.extend(n for n in range(low, min(high, low + max_range - 1) + 1) if n not in numbers)
+            elif number not in numbers:
+                numbers.append(number)
+            pending_range = False
+        elif token in _RANGE_WORDS and numbers:
+            pending_range = True
+        elif token in _LIST_WORDS and numbers:
+            pending_range = False
+        elif not (token in _FILLER_WORDS and not numbers):
+            break
+        i += 1
+    return numbers, i
+
+
+def _read_law(tokens, start, law_names):
+    # "من قانون العمل"، "في قانون العمل"، "بقانون التعليم"
+    i = start
+    while i < len(tokens) and tokens[i] in _LAW_PREFIX_WORDS:
+        i += 1
+    if i + 1 < len(tokens) and _LAW_WORD_RE.match(tokens[i]):
+        return _match_law(tokens[i + 1], law_names)
+    return None
+
+
+def parse_article_citations(query, laws=None, max_range=MAX_RANGE_ARTICLES):
+    """
+    Find the articles a query cites explicitly.
+
+    Handles single articles ("المادة 12 من قانون العمل"), lists and the dual ("المادتين 12 و13"),
+    ranges ("المواد من 10 إلى 15"، "المواد 10-15") and Arabic-Indic or Persian digits. A citation
+    without its own law takes the only law the query names elsewhere, and is skipped if the query
+    names none or several.
+
+    Args:
+        query: The user question.
+        laws: The law_short names of the corpus. None accepts any word after "قانون" (Arabic-normalized).
+        max_range: Maximum number of articles a range expands to.
+
+    Returns:
+        list[tuple[str, str]] | None: (article_number, law_short) of every cited article in the
+        order cited, or None if the query cites no article.
+    """
+    tokens = _TOKEN_RE.findall(normalize_citation_text(query))
+    law_names = None if laws is None else {_law_name(normalize_arabic(law)): law for law in laws}
+    query_laws = {law for i, token in enumerate(tokens[:-1]) if _LAW_WORD_RE.match(token)
+                  for law in [_match_law(tokens[i + 1], law_names)] if law is not None}
+    default_law = next(iter(query_laws)) if len(query_laws) == 1 else None
+
+    results = []
+    i = 0
+    while i < len(tokens):
+        if not _ARTICLE_WORD_RE.match(tokens[i]):
+            i += 1
+            continue
+        numbers, i = _read_numbers(tokens, i + 1, max_range)
+        law = _read_law(tokens, i, law_names) or default_law
+        if law is None:
+            continue
+        for number in numbers:
+            citation = (str(number), law)
+            if citation not in results:
+                results.append(citation)
+    return results if results else None
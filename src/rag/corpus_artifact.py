@@ -0,0 +1,332 @@
+import argparse
+import json
+import os
+import numpy as np
+from collections.abc import Sequence
+from langchain.schema import Document
+from src.rag.artifact_versions import resolve_version, staged_version
+from src.rag.article_graph import ArticleGraph, article_key
+from src.rag.bm25_index import corpus_fingerprint
+from src.rag.preprocessing_pipline import PREPROCESSING_VERSION
+
+# Bump whenever the on-disk layout written by write_corpus_artifact changes
+CORPUS_ARTIFACT_VERSION = 1
+
+
+def write_strings(path, name, strings):
+    """
+    Write strings as one UTF-8 blob (<name>.bin) and the int64 byte offsets of every string
+    (<name>_offsets.npy), so any of them can be sliced out of the memory-mapped blob.
+    """
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(string) for string in encoded])
+    with open(os.path.join(path, f"{name}.bin"), 'wb') as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(path, f"{name}_offsets.npy"), offsets)
+
+
+class StringColumn(Sequence):
+    __slots__ = ("blob", "starts", "ends")
+
+    def __init__(self, blob, starts, ends):
+        """
+        Read-only sequence of the strings written by write_strings, each decoded from its
+        slice of the (memory-mapped) UTF-8 blob when accessed. Holding the column keeps no
+        decoded string alive, so the texts stay in the page cache shared by the workers.
+
+        Args:
+            blob: The UTF-8 blob, a uint8 memmap or bytes.
+            starts, ends: Byte offsets of every string in the blob.
+        """
+        self.blob = blob
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        return bytes(self.blob[self.starts[row]:self.ends[row]]).decode('utf-8')
+
+    def take(self, rows):
+        """
+        A column of the strings at the given rows, sharing this column's blob.
+        """
+        return StringColumn(self.blob, self.starts[rows], self.ends[rows])
+
+
+def read_strings(path, name, mmap=True):
+    """
+    The strings written by write_strings, as a StringColumn over the memory-mapped blob
+    (or over its bytes read into memory without mmap).
+    """
+    blob_path = os.path.join(path, f"{name}.bin")
+    if mmap and os.path.getsize(blob_path):
+        blob = np.memmap(blob_path, dtype=np.uint8, mode='r')
+    else:
+        with open(blob_path, 'rb') as f:
+            blob = f.read()
+    offsets = np.load(os.path.join(path, f"{name}_offsets.npy"), mmap_mode='r' if mmap else None)
+    return StringColumn(blob, offsets[:-1], offsets[1:])
+
+
+def write_corpus_artifact(path, items, processed_texts, tokenizer=None, lemma_table=None, source_path=None, publish=True):
+    """
+    Compile the corpus into a versioned directory that CorpusArtifact.load() memory-maps.
+
+    Columns are stored as NumPy arrays and UTF-8 blobs: the raw and processed texts, the
+    metadata dictionary-encoded per field (every distinct value is stored once), the
+    linked-article graph as CSR arrays, and optionally the tokenizer's token ids of every
+    raw text and the query lemma table. The directory is written next to its final location
+    and published by swapping the path symlink (see artifact_versions).
+
+    Args:
+        path: Output directory.
+        items: The corpus JSON items (page_content and metadata).
+        processed_texts: The processed (lemmatized and normalized) text of every item.
+        tokenizer: Reranker tokenizer whose text token ids are precomputed; None skips them.
+        lemma_table: LemmaTable built while the texts were processed; None skips it.
+        source_path: Corpus JSON the artifact is compiled from, which a rebuild recompiles it from.
+        publish: False writes path itself (e.g. a version staged by a rebuild) instead of
+            publishing a new version of it.
+    """
+    if not publish:
+        _write_artifact(path, items, processed_texts, tokenizer, lemma_table, source_path)
+        return
+    with staged_version(path) as version:
+        _write_artifact(version, items, processed_texts, tokenizer, lemma_table, source_path)
+
+
+def _write_artifact(path, items, processed_texts, tokenizer, lemma_table, source_path):
+    texts = [item['page_content'] for item in items]
+    os.makedirs(path)
+    write_strings(path, "raw", texts)
+    write_strings(path, "processed", processed_texts)
+
+    # Metadata columns: one int32 code per (document, field), -1 when the field is missing
+    fields = sorted({name for item in items for name in item['metadata']})
+    values = {}
+    codes = np.full((len(items), len(fields)), -1, dtype=np.int32)
+    for row, item in enumerate(items):
+        for column, name in enumerate(fields):
+            if name in item['metadata']:
+                encoded = json.dumps(item['metadata'][name], ensure_ascii=False)
+                codes[row, column] = values.setdefault(encoded, len(values))
+    write_strings(path, "metadata_values", list(values))
+    np.save(os.path.join(path, "metadata_codes.npy"), codes)
+
+    # Article graph: the corpus row of every article and the articles it links to
+    documents = [Document(page_content=text, metadata=dict(item['metadata'], original_text=text))
+                 for text, item in zip(texts, items)]
+    graph = ArticleGraph(documents)
+    first_rows = {}
+    for row, document in enumerate(documents):
+        first_rows.setdefault(article_key(document), row)
+    np.save(os.path.join(path, "graph_rows.npy"), np.asarray([first_rows[key] for key in graph.keys], dtype=np.int32))
+    indptr, indices = graph.to_arrays()
+    np.save(os.path.join(path, "graph_indptr.npy"), indptr)
+    np.save(os.path.join(path, "graph_indices.npy"), indices)
+
+    tokenizer_key = None
+    if tokenizer is not None:
+        token_ids = tokenizer(texts, add_special_tokens=False)["input_ids"]
+        offsets = np.zeros(len(token_ids) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(ids) for ids in token_ids])
+        np.save(os.path.join(path, "token_ids.npy"), np.asarray([i for ids in token_ids for i in ids], dtype=np.int32))
+        np.save(os.path.join(path, "token_offsets.npy"), offsets)
+        tokenizer_key = f"{tokenizer.name_or_path}:{len(tokenizer)}"
+
+    # Word -> lemma counts, so a retriever started from the artifact can look up query lemmas
+    # without running Stanza over the corpus
+    has_lemma_table = bool(lemma_table)
+    if has_lemma_table:
+        with open(os.path.join(path, "lemma_table.json"), 'w', encoding='utf-8') as f:
+            json.dump({"version": lemma_table.version, "counts": lemma_table.counts}, f, ensure_ascii=False)
+
+    meta = {
+        "version": CORPUS_ARTIFACT_VERSION,
+        "num_docs": len(items),
+        "fingerprint": corpus_fingerprint(texts),
+        "preprocessing_version": PREPROCESSING_VERSION,
+        "fields": fields,
+        "tokenizer": tokenizer_key,
+        "lemma_table": has_lemma_table,
+        "source_path": source_path,
+    }
+    with open(os.path.join(path, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+
+def is_corpus_artifact(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, "meta.json"))
+
+
+class CorpusArtifact:
+    def __init__(self, meta, raw_texts, processed_texts, metadata, graph_rows, graph_indptr, graph_indices,
+                 token_ids=None, token_offsets=None, lemma_table_path=None):
+        """
+        A compiled corpus loaded by load(); see write_corpus_artifact for the layout.
+
+        Args:
+            meta: The artifact's meta.json.
+            raw_texts, processed_texts: Raw and processed text of every article.
+            metadata: Metadata dictionary of every article.
+            graph_rows, graph_indptr, graph_indices: The linked-article graph (see ArticleGraph.from_arrays).
+            token_ids, token_offsets: Concatenated token ids of the raw texts and their offsets.
+            lemma_table_path: The artifact's lemma table file, if it was written with one.
+        """
+        self.meta = meta
+        self.raw_texts = raw_texts
+        self.processed_texts = processed_texts
+        self.metadata = metadata
+        self.graph_rows = graph_rows
+        self.graph_indptr = graph_indptr
+        self.graph_indices = graph_indices
+        self.token_ids = token_ids
+        self.token_offsets = token_offsets
+        self.lemma_table_path = lemma_table_path
+
+    def __len__(self):
+        return len(self.raw_texts)
+
+    @property
+    def fingerprint(self):
+        return self.meta["fingerprint"]
+
+    @staticmethod
+    def read_meta(path):
+        with open(os.path.join(path, "meta.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load an artifact written by write_corpus_artifact. With mmap, the token ids stay on
+        disk and are shared between processes through the page cache.
+
+        Raises:
+            ValueError: If the artifact was written by another version of this module.
+        """
+        path = resolve_version(path)
+        meta = cls.read_meta(path)
+        if meta.get("version") != CORPUS_ARTIFACT_VERSION:
+            raise ValueError(f"Corpus artifact at {path} has version {meta.get('version')}, expected {CORPUS_ARTIFACT_VERSION}")
+        mmap_mode = 'r' if mmap else None
+
+        def load_array(name):
+            return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+        # Every distinct metadata value is decoded once and shared by the articles using it
+        values = [json.loads(value) for value in read_strings(path, "metadata_values", mmap)]
+        fields = meta["fields"]
+        metadata = [{fields[column]: values[code] for column, code in enumerate(row) if code >= 0}
+                    for row in np.load(os.path.join(path, "metadata_codes.npy")).tolist()]
+        has_token_ids = meta.get("tokenizer") is not None
+        return cls(
+            meta,
+            read_strings(path, "raw", mmap),
+            read_strings(path, "processed", mmap),
+            metadata,
+            load_array("graph_rows.npy"),
+            load_array("graph_indptr.npy"),
+            load_array("graph_indices.npy"),
+            token_ids=load_array("token_ids.npy") if has_token_ids else None,
+            token_offsets=np.load(os.path.join(path, "token_offsets.npy")) if has_token_ids else None,
+            lemma_table_path=os.path.join(path, "lemma_table.json") if meta.get("lemma_table") else None,
+        )
+
+    def documents(self):
+        """
+        The raw and processed Documents of the corpus, as HybridRetriever keeps them. Both
+        Documents of an article share one metadata dictionary holding its original_text.
+
+        Returns:
+            tuple[list[Document], list[Document]]: The raw and the processed Documents.
+        """
+        raw_documents, processed_documents = [], []
+        for raw_text, processed_text, metadata in zip(self.raw_texts, self.processed_texts, self.metadata):
+            metadata = dict(metadata, original_text=raw_text)
+            # Unvalidated construction, which would copy the metadata into every Document
+            raw_documents.append(Document.model_construct(page_content=raw_text, metadata=metadata))
+            processed_documents.append(Document.model_construct(page_content=processed_text, metadata=metadata))
+        return raw_documents, processed_documents
+
+    def article_graph(self):
+        rows = self.graph_rows.tolist()
+        keys = [(self.metadata[row].get("law_short"), str(self.metadata[row].get("article_number"))) for row in rows]
+        return ArticleGraph.from_arrays(keys, self.raw_texts.take(self.graph_rows), self.graph_indptr, self.graph_indices)
+
+    def lemma_counts(self):
+        """
+        {token: {lemma: count}} of the query lemma table stored with the artifact, or None if it
+        was built without one or with another preprocessing version.
+        """
+        if self.lemma_table_path is None:
+            return None
+        with open(self.lemma_table_path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        return payload["counts"] if payload.get("version") == PREPROCESSING_VERSION else None
+
+    def text_token_ids(self):
+        """
+        Token ids of every raw text, as int32 views of the memory-mapped array, or None if the
+        artifact was built without a tokenizer.
+        """
+        if self.token_ids is None:
+            return None
+        offsets = self.token_offsets.tolist()
+        return [self.token_ids[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def build_corpus_artifact(documents_path, output_path, processed_cache_dir="data/processed_cache", tokenizer_name=None,
+                          workers=1, tokenizer=None, publish=True):
+    """
+    Compile the corpus JSON, lemmatizing the articles missing from the processed corpus cache.
+    An already loaded tokenizer is used instead of loading tokenizer_name; publish=False writes
+    output_path itself (see write_corpus_artifact).
+    """
+    from src.rag.corpus_cache import ProcessedCorpusCache
+    from src.rag.lemma_table import LemmaTable
+    from src.rag.preprocessing_pipline import clean_texts
+
+    with open(documents_path, 'r', encoding='utf-8') as f:
+        items = json.load(f)
+    texts = [item['page_content'] for item in items]
+    cache = ProcessedCorpusCache(processed_cache_dir)
+    processed_texts = [cache.get(text) for text in texts]
+    misses = [i for i, processed_text in enumerate(processed_texts) if processed_text is None]
+    lemma_table = LemmaTable(os.path.join(processed_cache_dir, f"lemma_table_v{PREPROCESSING_VERSION}.json"))
+    # The artifact carries the query lemma table, so an empty one is filled here, once, by
+    # re-lemmatizing the whole corpus
+    if not lemma_table:
+        misses = list(range(len(texts)))
+    if misses:
+        for i, processed_text in zip(misses, clean_texts([texts[i] for i in misses], workers=workers, lemma_table=lemma_table)):
+            processed_texts[i] = processed_text
+            cache.put(texts[i], processed_text)
+        lemma_table.save()
+    # Entries of articles no longer in the corpus are dropped
+    cache.prune(texts)
+    cache.save()
+
+    if tokenizer is None and tokenizer_name:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+    write_corpus_artifact(output_path, items, processed_texts, tokenizer, lemma_table, documents_path, publish)
+    print(f"Corpus artifact with {len(items)} articles ({len(misses)} lemmatized) written to {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the corpus JSON into the memory-mapped corpus artifact HybridRetriever starts from.")
+    parser.add_argument('--documents', type=str, default="data/merged_data/legal_articles_with_short.json", help='Path to the documents JSON file.')
+    parser.add_argument('--output', type=str, default="data/corpus-law", help='Directory to write the artifact to.')
+    parser.add_argument('--processed_cache_dir', type=str, default="data/processed_cache", help='Processed corpus cache to reuse.')
+    parser.add_argument('--tokenizer', type=str, default="BAAI/bge-reranker-v2-m3", help='Reranker tokenizer of the precomputed token ids.')
+    parser.add_argument('--no_token_ids', action='store_true', help='Do not precompute reranker token ids.')
+    parser.add_argument('--workers', type=int, default=1, help='Lemmatization processes.')
+    args = parser.parse_args()
+    build_corpus_artifact(args.documents, args.output, args.processed_cache_dir,
+                          None if args.no_token_ids else args.tokenizer, args.workers)
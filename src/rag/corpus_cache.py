@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+from src.rag.atomic_files import atomic_write
+from src.rag.preprocessing_pipline import PREPROCESSING_VERSION
+
+
+class ProcessedCorpusCache:
+    def __init__(self, cache_dir="data/processed_cache", version=PREPROCESSING_VERSION):
+        """
+        Content-addressed on-disk cache of processed (lemmatized and normalized) texts.
+
+        Entries are keyed by the hash of the raw text plus the preprocessing version,
+        so an article is only re-processed when its text or the pipeline changes.
+
+        Args:
+            cache_dir: Directory holding the cache file.
+            version: Preprocessing version the cached texts were produced with.
+        """
+        self.cache_dir = cache_dir
+        self.version = version
+        self.cache_file = os.path.join(cache_dir, f"processed_v{version}.json")
+        self.entries = self._load()
+        self._dirty = False
+
+    def _load(self):
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Ignoring unreadable processed corpus cache {self.cache_file}: {e}")
+            return {}
+        if payload.get("version") != self.version:
+            return {}
+        return payload.get("entries", {})
+
+    def make_key(self, text):
+        return hashlib.sha256(f"{self.version}\0{text}".encode('utf-8')).hexdigest()
+
+    def get(self, text):
+        return self.entries.get(self.make_key(text))
+
+    def put(self, text, processed_text):
+        self.entries[self.make_key(text)] = processed_text
+        self._dirty = True
+
+    def prune(self, texts):
+        """
+        Drop entries that do not belong to any of the given raw texts.
+        """
+        keep = {self.make_key(text) for text in texts}
+        stale = [key for key in self.entries if key not in keep]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    def save(self):
+        """
+        Atomically write the cache to disk if it changed since it was loaded.
+        """
+        if not self._dirty:
+            return
+        with atomic_write(self.cache_file) as f:
+            json.dump({"version": self.version, "entries": self.entries}, f, ensure_ascii=False)
+        self._dirty = False
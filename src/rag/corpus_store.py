@@ -0,0 +1,113 @@
+import sys
+from array import array
+from collections.abc import Hashable, Sequence
+from langchain.schema import Document
+
+
+class CorpusStore:
+    __slots__ = ("raw_texts", "processed_texts", "fields", "values", "codes", "_value_ids")
+
+    def __init__(self, raw_texts, processed_texts, metadata):
+        """
+        Columnar in-memory corpus that the retrieval stages share by integer article id (the
+        corpus row, which is also the BM25 document id).
+
+        Every article is stored once: its raw and processed texts, and one int32 code per
+        metadata field into a table of distinct values. String values are interned, so law,
+        book and chapter names repeated across articles are a single object, and the
+        original_text metadata is the raw text itself. Documents are built on demand.
+
+        Args:
+            raw_texts: Raw text of every article.
+            processed_texts: Processed (lemmatized and normalized) text of every article.
+            metadata: Metadata dictionary of every article; original_text is not stored.
+
+        Text sequences are kept as they are, so the memory-mapped columns of a corpus artifact
+        are decoded per access instead of copied onto the heap.
+        """
+        self.raw_texts = raw_texts if isinstance(raw_texts, Sequence) else list(raw_texts)
+        self.processed_texts = processed_texts if isinstance(processed_texts, Sequence) else list(processed_texts)
+        if len(self.processed_texts) != len(self.raw_texts):
+            raise ValueError(f"Got {len(self.raw_texts)} raw texts but {len(self.processed_texts)} processed texts")
+        metadata = list(metadata)
+        self.fields = sorted({name for item in metadata for name in item if name != "original_text"})
+        self.values = []
+        self._value_ids = {}
+        self.codes = {field: array('i') for field in self.fields}
+        for item in metadata:
+            for field in self.fields:
+                self.codes[field].append(self._code(item[field]) if field in item else -1)
+
+    def _code(self, value):
+        if isinstance(value, str):
+            value = sys.intern(value)
+        if not isinstance(value, Hashable):
+            self.values.append(value)
+            return len(self.values) - 1
+        # The type is part of the key so that 1, 1.0 and True stay distinct values
+        key = (type(value), value)
+        code = self._value_ids.get(key)
+        if code is None:
+            code = self._value_ids[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+    @classmethod
+    def from_documents(cls, documents, processed_texts=None):
+        """
+        Store the raw Documents of the corpus, with the processed text of every article
+        (their own text when omitted).
+        """
+        documents = list(documents)
+        raw_texts = [doc.page_content for doc in documents]
+        return cls(raw_texts, raw_texts if processed_texts is None else processed_texts, [doc.metadata for doc in documents])
+
+    def __len__(self):
+        return len(self.raw_texts)
+
+    def value(self, row, field, default=None):
+        code = self.codes[field][row] if field in self.codes else -1
+        return self.values[code] if code >= 0 else default
+
+    def key(self, row):
+        """
+        (law_short, article_number) of an article, like article_key().
+        """
+        return (self.value(row, "law_short"), str(self.value(row, "article_number")))
+
+    def metadata(self, row, original_text=True):
+        metadata = {field: self.values[codes[row]] for field, codes in self.codes.items() if codes[row] >= 0}
+        if original_text:
+            metadata["original_text"] = self.raw_texts[row]
+        return metadata
+
+    def document(self, row, processed=False):
+        texts = self.processed_texts if processed else self.raw_texts
+        # Unvalidated construction: the metadata dictionary is new and need not be copied again
+        return Document.model_construct(page_content=texts[row], metadata=self.metadata(row))
+
+    def documents(self, processed=False):
+        """
+        Read-only sequence of the raw (or processed) Documents, built when accessed.
+        """
+        return DocumentView(self, processed)
+
+
+class DocumentView(Sequence):
+    __slots__ = ("corpus", "processed")
+
+    def __init__(self, corpus, processed=False):
+        self.corpus = corpus
+        self.processed = processed
+
+    def __len__(self):
+        return len(self.corpus)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self.corpus.document(i, self.processed) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("Document index out of range")
+        return self.corpus.document(row, self.processed)
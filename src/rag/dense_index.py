@@ -0,0 +1,390 @@
+import argparse
+import json
+import os
+import numpy as np
+from src.rag.artifact_versions import remove_path, resolve_version, staged_version
+from src.rag.bm25_index import top_k
+
+# Bump whenever the on-disk layout written by NumpyDenseIndex.save changes
+DENSE_INDEX_VERSION = 2
+
+QUANTIZATION_MODES = (None, "int8", "binary")
+
+PROJECTION_METHODS = ("pca", "truncate")
+
+# Rows of int8 codes widened to float32 at a time during a scan; small enough to stay in cache
+SCAN_BLOCK_ROWS = 256
+
+# Number of set bits of every 16-bit value, for Hamming distances between packed binary codes
+# on NumPy versions without np.bitwise_count
+POPCOUNT16 = np.array([bin(value).count("1") for value in range(1 << 16)], dtype=np.uint8)
+
+_INDEX_MODE = object()
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def quantize_int8(vectors):
+    """
+    Symmetric per-dimension int8 quantization.
+
+    Returns:
+        tuple: The (num_vectors, dim) int8 codes and the float32 scale of every dimension.
+    """
+    scales = np.abs(vectors).max(axis=0) / 127.0
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def fit_projection(vectors, dim, method="pca"):
+    """
+    Fit a linear projection of the embeddings to `dim` dimensions.
+
+    Args:
+        vectors: The (num_vectors, full_dim) normalized embeddings to fit on.
+        dim: The reduced dimension.
+        method: "pca" projects on the top principal components, "truncate" keeps the first
+            `dim` coordinates (only meaningful for Matryoshka-trained models).
+
+    Returns:
+        tuple: The float32 mean to subtract and the (full_dim, dim) projection matrix.
+    """
+    if method not in PROJECTION_METHODS:
+        raise ValueError(f"Unknown projection '{method}', expected one of {PROJECTION_METHODS}")
+    full_dim = vectors.shape[1]
+    if not 0 < dim <= full_dim:
+        raise ValueError(f"Reduced dimension must be between 1 and {full_dim}, got {dim}")
+    if method == "truncate":
+        return np.zeros(full_dim, dtype=np.float32), np.eye(full_dim, dim, dtype=np.float32)
+    mean = np.asarray(vectors, dtype=np.float64).mean(axis=0)
+    centered = np.asarray(vectors, dtype=np.float64) - mean
+    # Eigenvectors of the (full_dim x full_dim) covariance, largest variance first
+    eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered)
+    components = eigenvectors[:, np.argsort(eigenvalues)[::-1][:dim]]
+    return mean.astype(np.float32), components.astype(np.float32)
+
+
+def quantize_binary(vectors):
+    """
+    Sign quantization packed to one bit per dimension (dim / 8 bytes per vector).
+    """
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+class NumpyDenseIndex:
+    def __init__(self, vectors, ids, parent_ids, model_name=None, int8_codes=None, int8_scales=None, binary_codes=None,
+                 quantization=None, rescore_factor=10, projection=None, reduced_vectors=None, reduced=False,
+                 rescore_reduced=True):
+        """
+        Exact dense index over L2-normalized child chunk embeddings.
+
+        A query is scored against every chunk with one matrix-vector product, which for a
+        corpus of a few thousand chunks is faster than an approximate index and never misses.
+        In a quantized mode the first-stage scan runs over int8 or binary codes instead, and
+        only a shortlist of k * rescore_factor chunks is rescored with the float32 vectors.
+
+        Args:
+            vectors: (num_chunks, dim) float32 matrix of normalized embeddings.
+            ids: Chunk id of every row.
+            parent_ids: Docstore id of the parent article of every row.
+            model_name: Name of the embedding model the vectors come from.
+            int8_codes, int8_scales: int8 codes of the vectors, computed when missing.
+            binary_codes: Packed sign bits of the vectors, computed when missing.
+            quantization: None for the exact float32 scan, "int8" or "binary".
+            rescore_factor: Shortlist size of the quantized or reduced scan, as a multiple of k.
+            projection: Optional (method, mean, components) from fit_projection.
+            reduced_vectors: Normalized projected vectors, computed from the projection when missing.
+            reduced: Scan the reduced-dimension vectors instead of the full ones.
+            rescore_reduced: Rescore the shortlist of the reduced scan with the full vectors.
+        """
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATION_MODES}")
+        if reduced and projection is None:
+            raise ValueError("A reduced scan needs an index with a projection, see add_projection()")
+        if reduced and quantization is not None:
+            raise ValueError("Choose either a quantized or a reduced first stage, not both")
+        self.vectors = vectors
+        self.ids = ids
+        self.parent_ids = parent_ids
+        self.model_name = model_name
+        if int8_codes is None:
+            int8_codes, int8_scales = quantize_int8(vectors)
+        self.int8_codes = int8_codes
+        self.int8_scales = int8_scales
+        self.binary_codes = quantize_binary(vectors) if binary_codes is None else binary_codes
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.projection = projection
+        if projection is not None and reduced_vectors is None:
+            reduced_vectors = self._project(vectors)
+        self.reduced_vectors = reduced_vectors
+        self.reduced = reduced
+        self.rescore_reduced = rescore_reduced
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    @classmethod
+    def from_embeddings(cls, embeddings, ids, parent_ids, model_name=None):
+        return cls(normalize_rows(embeddings), np.asarray(ids), np.asarray(parent_ids), model_name=model_name)
+
+    @classmethod
+    def from_chroma(cls, collection, id_key="doc_id", model_name=None, batch_size=1000):
+        """
+        Export the child chunk embeddings of a Chroma collection.
+
+        Args:
+            collection: The chromadb collection the ParentDocumentRetriever wrote to.
+            id_key: Metadata key holding the parent document id.
+            model_name: Name of the embedding model the collection was built with.
+            batch_size: Number of chunks read from Chroma at a time.
+        """
+        ids, parent_ids, embeddings = [], [], []
+        total = collection.count()
+        for offset in range(0, total, batch_size):
+            batch = collection.get(include=["embeddings", "metadatas"], limit=batch_size, offset=offset)
+            for chunk_id, metadata, embedding in zip(batch["ids"], batch["metadatas"], batch["embeddings"]):
+                if not metadata or metadata.get(id_key) is None:
+                    continue
+                ids.append(chunk_id)
+                parent_ids.append(metadata[id_key])
+                embeddings.append(embedding)
+        if not embeddings:
+            raise ValueError("The Chroma collection has no chunks with a parent document id")
+        return cls.from_embeddings(np.asarray(embeddings, dtype=np.float32), ids, parent_ids, model_name=model_name)
+
+    def add_projection(self, dim, method="pca"):
+        """
+        Fit a projection on the indexed vectors and store their reduced-dimension copy.
+        """
+        mean, components = fit_projection(self.vectors, dim, method)
+        self.projection = (method, mean, components)
+        self.reduced_vectors = self._project(self.vectors)
+
+    def with_changes(self, removed_parent_ids=(), embeddings=None, ids=(), parent_ids=()):
+        """
+        A new index without the chunks of some parent documents and with new chunks appended.
+
+        The search settings and a fitted projection are kept (the projection is not refitted);
+        the int8 scales are recomputed since they depend on every vector.
+
+        Args:
+            removed_parent_ids: Parent document ids whose chunks are dropped.
+            embeddings: (num_new_chunks, dim) embeddings of the new chunks.
+            ids, parent_ids: Chunk id and parent document id of every new chunk.
+        """
+        keep = ~np.isin(np.asarray(self.parent_ids), list(removed_parent_ids))
+        vectors = [np.asarray(self.vectors[keep], dtype=np.float32)]
+        if embeddings is not None and len(embeddings):
+            vectors.append(normalize_rows(embeddings))
+        return type(self)(
+            np.concatenate(vectors),
+            np.concatenate([np.asarray(self.ids)[keep].astype(str), np.asarray(ids, dtype=str)]),
+            np.concatenate([np.asarray(self.parent_ids)[keep].astype(str), np.asarray(parent_ids, dtype=str)]),
+            model_name=self.model_name,
+            quantization=self.quantization,
+            rescore_factor=self.rescore_factor,
+            projection=self.projection,
+            reduced=self.reduced,
+            rescore_reduced=self.rescore_reduced,
+        )
+
+    def _project(self, vectors):
+        _, mean, components = self.projection
+        return normalize_rows((np.asarray(vectors, dtype=np.float32) - mean) @ components)
+
+    def memory_footprint(self, quantization=None, reduced=False):
+        """
+        Bytes scanned for every query: the float32 vectors, the reduced vectors, or the codes
+        of a quantized mode.
+        """
+        if reduced:
+            return self.reduced_vectors.nbytes
+        if quantization == "int8":
+            return self.int8_codes.nbytes + self.int8_scales.nbytes
+        if quantization == "binary":
+            return self.binary_codes.nbytes
+        return self.vectors.nbytes
+
+    def search(self, query_vector, k, quantization=_INDEX_MODE, reduced=_INDEX_MODE):
+        """
+        Return the rows and cosine similarities of the k chunks closest to the query.
+
+        Args:
+            query_vector: The query embedding.
+            k: The number of chunks to return.
+            quantization: Overrides the index's quantization mode for this query.
+            reduced: Overrides whether the reduced-dimension vectors are scanned for this query.
+                Without rescoring, the returned scores are similarities in the reduced space.
+        """
+        if quantization is _INDEX_MODE:
+            quantization = self.quantization
+        if reduced is _INDEX_MODE:
+            reduced = self.reduced
+        query = normalize_rows(query_vector)
+        all_rows = np.arange(len(self), dtype=np.int32)
+        if reduced:
+            approximate_scores = self.reduced_vectors @ self._project(query)
+            if not self.rescore_reduced:
+                return top_k(all_rows, approximate_scores, k)
+        elif quantization is None:
+            return top_k(all_rows, self.vectors @ query, k)
+        elif quantization == "int8":
+            approximate_scores = self._int8_scores(query)
+        elif quantization == "binary":
+            approximate_scores = self._binary_scores(query)
+        else:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATION_MODES}")
+        shortlist, _ = top_k(all_rows, approximate_scores, k * self.rescore_factor)
+        # Only the shortlisted float32 rows are read from the memory-mapped matrix
+        shortlist = np.sort(shortlist)
+        return top_k(shortlist, self.vectors[shortlist] @ query, k)
+
+    def _int8_scores(self, query):
+        scaled_query = query * self.int8_scales
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SCAN_BLOCK_ROWS):
+            block = self.int8_codes[start:start + SCAN_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ scaled_query
+        return scores
+
+    def _binary_scores(self, query):
+        # Fewer differing sign bits means a smaller angle; negate so higher is closer
+        differing = np.bitwise_xor(self.binary_codes, quantize_binary(query))
+        if hasattr(np, "bitwise_count") and differing.shape[1] % 8 == 0:
+            distances = np.bitwise_count(differing.view(np.uint64)).sum(axis=1, dtype=np.int32)
+        elif differing.shape[1] % 2 == 0:
+            distances = POPCOUNT16[differing.view(np.uint16)].sum(axis=1, dtype=np.int32)
+        else:
+            distances = np.unpackbits(differing, axis=1).sum(axis=1, dtype=np.int32)
+        return -distances
+
+    def save(self, path):
+        """
+        Write the index as a versioned directory that load() can memory-map, published by
+        swapping the path symlink (see artifact_versions) so processes loading the index
+        always find a complete version at path.
+        """
+        with staged_version(path) as version:
+            self.write(version)
+
+    def write(self, path):
+        """
+        Write the index into a new directory, e.g. a version staged to be published later.
+        """
+        try:
+            self._write(path)
+        except Exception:
+            remove_path(path)
+            raise
+
+    def _write(self, path):
+        os.makedirs(path)
+        np.save(os.path.join(path, "vectors.npy"), np.ascontiguousarray(self.vectors, dtype=np.float32))
+        np.save(os.path.join(path, "int8_codes.npy"), self.int8_codes)
+        np.save(os.path.join(path, "int8_scales.npy"), self.int8_scales)
+        np.save(os.path.join(path, "binary_codes.npy"), self.binary_codes)
+        np.save(os.path.join(path, "ids.npy"), np.asarray(self.ids, dtype=str))
+        np.save(os.path.join(path, "parent_ids.npy"), np.asarray(self.parent_ids, dtype=str))
+        projection_meta = None
+        if self.projection is not None:
+            method, mean, components = self.projection
+            np.save(os.path.join(path, "projection_mean.npy"), mean)
+            np.save(os.path.join(path, "projection_components.npy"), components)
+            np.save(os.path.join(path, "reduced_vectors.npy"), np.ascontiguousarray(self.reduced_vectors, dtype=np.float32))
+            projection_meta = {"method": method, "dim": int(components.shape[1])}
+        meta = {
+            "version": DENSE_INDEX_VERSION,
+            "model": self.model_name,
+            "num_chunks": len(self),
+            "dim": self.dim,
+            "projection": projection_meta,
+        }
+        with open(os.path.join(path, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+    @staticmethod
+    def read_meta(path):
+        with open(os.path.join(path, "meta.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @classmethod
+    def load(cls, path, mmap=True, quantization=None, rescore_factor=10, reduced=False, rescore_reduced=True):
+        """
+        Load an index written by save(). With mmap, arrays stay on disk and are shared between
+        processes through the page cache; in a quantized or reduced mode only the codes or
+        reduced vectors are scanned, so the full vectors are paged in just for the rescored
+        shortlists.
+        """
+        path = resolve_version(path)
+        meta = cls.read_meta(path)
+        if meta.get("version") != DENSE_INDEX_VERSION:
+            raise ValueError(f"Dense index at {path} has version {meta.get('version')}, expected {DENSE_INDEX_VERSION}")
+        mmap_mode = 'r' if mmap else None
+
+        def load_array(name):
+            return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+        projection = reduced_vectors = None
+        if meta.get("projection"):
+            projection = (meta["projection"]["method"], np.load(os.path.join(path, "projection_mean.npy")),
+                          np.load(os.path.join(path, "projection_components.npy")))
+            reduced_vectors = load_array("reduced_vectors.npy")
+        return cls(
+            load_array("vectors.npy"),
+            load_array("ids.npy"),
+            load_array("parent_ids.npy"),
+            model_name=meta.get("model"),
+            int8_codes=load_array("int8_codes.npy"),
+            int8_scales=load_array("int8_scales.npy"),
+            binary_codes=load_array("binary_codes.npy"),
+            quantization=quantization,
+            rescore_factor=rescore_factor,
+            projection=projection,
+            reduced_vectors=reduced_vectors,
+            reduced=reduced,
+            rescore_reduced=rescore_reduced,
+        )
+
+
+def export_chroma(persist_directory, output_path, collection_name="law_collection", model_name=None):
+    import chromadb
+    client = chromadb.PersistentClient(path=persist_directory)
+    index = NumpyDenseIndex.from_chroma(client.get_collection(collection_name), model_name=model_name)
+    index.save(output_path)
+    print(f"Dense index with {len(index)} chunks of dimension {index.dim} written to {output_path}")
+
+
+def reduce_index(path, dim, method="pca"):
+    """
+    Fit a projection on an exported index and store its reduced-dimension vectors alongside.
+    """
+    index = NumpyDenseIndex.load(path, mmap=False)
+    index.add_projection(dim, method)
+    index.save(path)
+    print(f"Dense index at {path} reduced from {index.dim} to {dim} dimensions ({method})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the Chroma child chunk embeddings to the NumPy dense index used by HybridRetriever.")
+    parser.add_argument('--chromadb', type=str, default="data/chromadb-law", help='Chroma persist directory.')
+    parser.add_argument('--collection', type=str, default="law_collection", help='Chroma collection name.')
+    parser.add_argument('--model', type=str, default="intfloat/multilingual-e5-large", help='Embedding model the collection was built with.')
+    parser.add_argument('--output', type=str, default="data/dense-law", help='Directory to write the index to.')
+    parser.add_argument('--reduce_dim', type=int, default=None, help='Also store a reduced-dimension copy of the vectors.')
+    parser.add_argument('--projection', type=str, default="pca", choices=PROJECTION_METHODS, help='Projection used with --reduce_dim.')
+    parser.add_argument('--skip_export', action='store_true', help='Only add the reduced vectors to an existing index.')
+    args = parser.parse_args()
+    if not args.skip_export:
+        export_chroma(args.chromadb, args.output, args.collection, args.model)
+    if args.reduce_dim:
+        reduce_index(args.output, args.reduce_dim, args.projection)
@@ -1,22 +1,160 @@
-from langchain.retrievers import BM25Retriever, EnsembleRetriever
 from langchain.schema import Document
 from langchain.vectorstores import Chroma
-from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.retrievers import ParentDocumentRetriever
 from langchain.storage import LocalFileStore
 from langchain.storage._lc_store import create_kv_docstore
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
-from src.rag.preprocessing_pipline import clean_text,setup_nlp_tools,extract_article_lookup
-import torch
+from src.rag.preprocessing_pipline import clean_text,clean_texts,clean_query,ensure_nlp_tools,extract_article_lookup,PREPROCESSING_VERSION
+from src.rag.corpus_cache import ProcessedCorpusCache
+from src.rag.lemma_table import LemmaTable
+from src.rag.bm25_index import BM25IndexRetriever, corpus_fingerprint
+from src.rag.caching import CachedDocstore, CachedEmbeddings, LRUCache
+from src.rag.packed_docstore import open_docstore
+from src.rag.atomic_files import atomic_write
+from src.rag.artifact_versions import lease_version
+from src.rag.arabic_normalization import normalize_arabic, collapse_whitespace
+from src.rag.dense_index import NumpyDenseIndex
+from src.rag.reranker import CrossEncoderReranker
+from src.rag.article_graph import ArticleGraph, article_key
+from src.rag.inference_backends import load_embeddings
+from src.rag.corpus_artifact import CorpusArtifact, is_corpus_artifact, write_corpus_artifact
+from src.rag.corpus_store import CorpusStore
+from src.rag.memory_report import memory_report
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import time
 import json
-import ast
+import os
+import re
+import uuid
 import chromadb
 
+FUSION_METHODS = ("rrf", "minmax", "zscore")
+CASCADE_STAGES = (None, "retrieval", "cross_encoder")
+
+# Parent articles and the child chunks that are embedded for the dense branch
+PARENT_CHUNK_SIZE = 2000
+CHILD_CHUNK_SIZE = 400
+
+_QUERY_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+
+def normalize_query_key(query):
+    """
+    Cache key form of a query: Arabic-normalized, lowercased, without punctuation and with
+    collapsed whitespace, so near-identical phrasings of a question share cached scores.
+    """
+    query = _QUERY_PUNCTUATION_RE.sub(' ', normalize_arabic(query).lower())
+    return collapse_whitespace(query).strip()
+
+
+def normalize_branch_scores(scores, method):
+    """
+    Normalize one branch's scores for score-based fusion.
+
+    Args:
+        scores: The raw scores of the branch, best first.
+        method: "minmax" maps them to [0, 1], "zscore" to zero mean and unit variance.
+
+    Returns:
+        list[float]: The normalized scores.
+    """
+    if not scores:
+        return []
+    if method == "minmax":
+        low, high = min(scores), max(scores)
+        return [(score - low) / (high - low) if high > low else 1.0 for score in scores]
+    mean = sum(scores) / len(scores)
+    std = (sum((score - mean) ** 2 for score in scores) / len(scores)) ** 0.5
+    return [(score - mean) / std if std > 0 else 0.0 for score in scores]
+
+
+def fuse_rankings(branches, weights, method="rrf", rrf_c=60):
+    """
+    Fuse the ranked (document, score) lists of several retrievers into one candidate list.
+
+    Candidates are deduplicated on (law_short, article_number) and keep the raw score each
+    branch gave them (None when a branch did not return them).
+
+    Args:
+        branches: Mapping of branch name to its [(document, score)] list, best first.
+        weights: Mapping of branch name to its fusion weight.
+        method: "rrf" for weighted reciprocal rank fusion, "minmax" or "zscore" for a
+            weighted sum of normalized scores. With score fusion, a candidate missing from a
+            branch gets that branch's lowest normalized score.
+        rrf_c: The RRF rank constant.
+
+    Returns:
+        list[dict]: Candidates with "document", "fused_score" and a "<branch>_score" per
+            branch, sorted by fused score (ties keep retrieval order).
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method '{method}', expected one of {FUSION_METHODS}")
+
+    candidates = {}
+    floors = {}
+    for name, results in branches.items():
+        if method == "rrf":
+            contributions = [1.0 / (rank + rrf_c) for rank in range(1, len(results) + 1)]
+        else:
+            contributions = normalize_branch_scores([score for _, score in results], method)
+        floors[name] = min(contributions) if method != "rrf" and contributions else 0.0
+        seen = set()
+        for (document, score), contribution in zip(results, contributions):
+            key = article_key(document)
+            if key in seen:
+                continue
+            seen.add(key)
+            candidate = candidates.get(key)
+            if candidate is None:
+                candidate = {"document": document, "fused_score": 0.0, "contributions": {}}
+                candidate.update({f"{branch}_score": None for branch in branches})
+                candidates[key] = candidate
+            candidate[f"{name}_score"] = score
+            candidate["contributions"][name] = contribution
+
+    fused = []
+    for candidate in candidates.values():
+        contributions = candidate.pop("contributions")
+        candidate["fused_score"] = sum(weights[name] * contributions.get(name, floors[name]) for name in branches)
+        fused.append(candidate)
+    return sorted(fused, key=lambda candidate: candidate["fused_score"], reverse=True)
+
+
 class HybridRetriever:
-    def __init__(self, documents, vectorstore_path=None, docstore_path=None, embedding_model_name="intfloat/multilingual-e5-large", bm25_weight=0.5, pc_weight=0.5):
+    def __init__(self, documents, vectorstore_path=None, docstore_path=None, embedding_model_name="intfloat/multilingual-e5-large",
+                 bm25_weight=0.5, pc_weight=0.5,
+                 processed_cache_dir="data/processed_cache", preprocessing_workers=1, query_lemma_lookup=True,
+                 sparse_index_path="data/bm25-law", retrieval_workers=4,
+                 fusion="rrf", rrf_c=60, max_rerank_candidates=8,
+                 query_embedding_cache_size=1024, query_embedding_cache_path=None,
+                 dense_backend="chroma", dense_index_path="data/dense-law", dense_k=4,
+                 dense_quantization=None, dense_rescore_factor=10, dense_reduced=False, dense_rescore_reduced=True,
+                 reranker_model_name="BAAI/bge-reranker-v2-m3", reranker_batch_size=16, reranker_batch_tokens=2048,
+                 reranker_token_cache_path=None, rerank_cache_size=4096,
+                 rerank_cascade=None, cascade_model_name="cross-encoder/mmarco-mMiniLMv2-L12-H384-v1", cascade_depth=4,
+                 embedding_backend="torch", reranker_backend="torch", onnx_cache_dir="data/onnx",
+                 link_hops=1, citation_link_hops=None, docstore_cache_size=1024,
+                 embeddings=None, reranker=None, cascade_reranker=None, build_indexes=False):
+        # Leases on the index versions this retriever loads, released by close()
+        self.version_leases = []
+        # Corpus file or artifact that upsert_articles / remove_articles write back to
+        self.documents_path = documents if isinstance(documents, str) else None
+        self.corpus_artifact_path = None
+        artifact = None
+        if isinstance(documents, str) and is_corpus_artifact(documents):
+            # Compiled corpus: texts, metadata, graph and token ids without parsing the JSON
+            try:
+                artifact = CorpusArtifact.load(self.hold_version(documents))
+            except (OSError, ValueError) as e:
+                raise ValueError(f"Error loading corpus artifact: {e}")
+            # Updates are written back to the artifact and to the corpus JSON it was compiled
+            # from, which a rebuild compiles it from again
+            source_path = artifact.meta.get("source_path")
+            self.corpus_artifact_path = documents
+            self.documents_path = source_path if source_path and os.path.exists(source_path) else None
         # Check if documents is a file path string
-        if isinstance(documents, str):
+        elif isinstance(documents, str):
             try:
                 with open(documents, 'r', encoding='utf-8') as f:
                     raw_documents = json.load(f)
@@ -26,32 +164,154 @@ class HybridRetriever:
         else:
             # Assume documents is already a list of dictionaries with page_content and metadata
             documents = [Document(page_content=item['page_content'], metadata=item['metadata']) for item in documents]
-        setup_nlp_tools()
-        processed_documents = self.process_dataset(documents)
-        processed_documents =[Document(page_content=item['page_content'], metadata=item['metadata']) for item in processed_documents]
-        
-        self.documents = processed_documents
-
-        self.doc_lookup = {
-        (str(doc.metadata.get("article_number")),doc.metadata.get("law_short")): doc
-        for doc in documents}
-
-        if (vectorstore_path and not docstore_path) or (docstore_path and not vectorstore_path):
+        # Word -> lemma table used to preprocess queries without a full Stanza pass
+        self.lemma_table = None
+        if query_lemma_lookup:
+            lemma_table_path = os.path.join(processed_cache_dir, f"lemma_table_v{PREPROCESSING_VERSION}.json") if processed_cache_dir else None
+            self.lemma_table = LemmaTable(lemma_table_path)
+        # Lemmatized texts are cached on disk, so Stanza is only loaded when an article changed.
+        # An artifact already holds them, so its cache is only opened once an article is processed
+        self.processed_cache_dir = processed_cache_dir
+        self.processed_cache = None
+        if artifact is not None and artifact.meta.get("preprocessing_version") != PREPROCESSING_VERSION:
+            print(f"Warning: Corpus artifact {self.corpus_artifact_path} was processed with preprocessing version "
+                  f"{artifact.meta.get('preprocessing_version')}, re-processing it. Rebuild it with `python -m src.rag.corpus_artifact`.")
+            documents = artifact.documents()[0]
+            artifact = None
+        if artifact is not None:
+            # The artifact's processed texts are used as they are, and its lemma table fills an
+            # empty query lemma table, so Stanza does not run over the corpus
+            if self.lemma_table is not None and not self.lemma_table:
+                lemma_counts = artifact.lemma_counts()
+                if lemma_counts:
+                    self.lemma_table.update(lemma_counts)
+                    self.lemma_table.save()
+                else:
+                    print(f"Warning: Corpus artifact {self.corpus_artifact_path} has no query lemma table, so queries are "
+                          f"lemmatized by Stanza. Rebuild it with `python -m src.rag.corpus_artifact`.")
+            # Every article is stored once, and the retrieval stages share it by corpus row; the
+            # texts stay in the artifact's memory-mapped columns
+            self.corpus = CorpusStore(artifact.raw_texts, artifact.processed_texts, artifact.metadata)
+        else:
+            self.open_processed_cache()
+            processed_documents = self.process_dataset(documents, workers=preprocessing_workers,
+                                                       live_texts=[doc.page_content for doc in documents])
+            processed_documents =[Document(page_content=item['page_content'], metadata=item['metadata']) for item in processed_documents]
+            # Every article is stored once, and the retrieval stages share it by corpus row
+            self.corpus = CorpusStore.from_documents(documents, [doc.page_content for doc in processed_documents])
+        self.documents = self.corpus.documents(processed=True)
+        documents = self.corpus.documents()
+
+        # Cached rerank scores are only valid for the corpus they were computed on
+        self.corpus_version = artifact.fingerprint if artifact is not None else corpus_fingerprint(self.corpus.raw_texts)
+        self.rerank_cache = LRUCache(rerank_cache_size)
+
+        # Article references are parsed once into a graph that expands the retrieved articles
+        self.article_graph = artifact.article_graph() if artifact is not None else ArticleGraph(documents)
+        self.link_hops = link_hops
+        # Cited articles are answered from the graph alone, by default with their linked articles
+        # as far as the retrieved ones are expanded
+        self.citation_link_hops = link_hops if citation_link_hops is None else citation_link_hops
+        self.laws = sorted({law for law, _ in self.article_graph.keys})
+
+        if dense_backend == "chroma" and ((vectorstore_path and not docstore_path) or (docstore_path and not vectorstore_path)):
           raise ValueError("You must provide both 'vectorstore_path' and 'docstore_path', or neither.")
 
-        if vectorstore_path:
-            self.vectorstore = self.load_vectorstore(vectorstore_path,embedding_model_name)
+        self.query_embedding_cache_size = query_embedding_cache_size
+        self.query_embedding_cache_path = query_embedding_cache_path
+        self.embedding_backend = embedding_backend
+        # Already loaded models (e.g. those of the live retriever during a rebuild) are used
+        # as they are instead of loading embedding_model_name and reranker_model_name again
+        self.embeddings = None
+        if embeddings is not None:
+            self.embeddings = embeddings if isinstance(embeddings, CachedEmbeddings) else CachedEmbeddings(
+                embeddings, embedding_model_name, max_size=query_embedding_cache_size, path=query_embedding_cache_path)
+        self.docstore_cache_size = docstore_cache_size
+        self.onnx_cache_dir = onnx_cache_dir
+        self.dense_k = dense_k
+        self.docstore_path = docstore_path
+        self.dense_index_path = dense_index_path
+        self.sparse_index_path = sparse_index_path
+        # Serving docstores are opened read-only; the first corpus update reopens them for writing
+        self._docstore_writable = docstore_path is None
+        # article_key -> docstore ids of its parent chunks, built on the first corpus update
+        self._article_parent_ids = None
+        self._update_lock = threading.Lock()
+        # A rebuild writes the docstore and dense index of the corpus to new (staged) paths,
+        # which are then loaded like prebuilt ones; the BM25 index is written once built below
+        if build_indexes:
+            self.write_dense_indexes(embedding_model_name, dense_backend, vectorstore_path)
+        # The NumPy backend replaces Chroma with an exact in-process index over the same child chunks
+        self.dense_index = None
+        if dense_backend == "numpy":
+            if not docstore_path:
+                raise ValueError("The 'numpy' dense backend needs the 'docstore_path' its index was exported with.")
+            self.dense_index = self.load_dense_index(dense_index_path, embedding_model_name, dense_quantization, dense_rescore_factor,
+                                                     dense_reduced, dense_rescore_reduced)
+        elif dense_backend != "chroma":
+            raise ValueError(f"Unknown dense backend '{dense_backend}', expected 'chroma' or 'numpy'")
+
+        if self.dense_index is not None:
+            self.embeddings = self.create_embeddings(embedding_model_name)
+            self.vectorstore = None
+            self.dense = None
+            self.docstore = CachedDocstore(open_docstore(self.hold_version(docstore_path), read_only=True), docstore_cache_size)
         else:
-            self.vectorstore = self.create_vectorstore(embedding_model_name)
-
-
-        self.sparse = self.create_sparse_retriever(documents)
-
-        self.dense = self.create_dense_retriever(self.vectorstore,docstore_path)
-        self.ensemble_retriever = self.create_ensemble_retriever(self.dense, self.sparse, bm25_weight, pc_weight)
-        self.tokenizer = AutoTokenizer.from_pretrained("BAAI/bge-reranker-v2-m3")
-        self.model = AutoModelForSequenceClassification.from_pretrained("BAAI/bge-reranker-v2-m3")
-        self.model.eval()  # Set the model to evaluation mode
+            if vectorstore_path:
+                self.vectorstore = self.load_vectorstore(vectorstore_path,embedding_model_name)
+            else:
+                self.vectorstore = self.create_vectorstore(embedding_model_name)
+            self.dense = self.create_dense_retriever(self.vectorstore,docstore_path)
+            self.docstore = self.dense.docstore
+
+        self.sparse = self.create_sparse_retriever(documents, index_path=sparse_index_path)
+        if build_indexes and sparse_index_path:
+            self.sparse.index.write(sparse_index_path, fingerprint=self.corpus_version,
+                                    preprocess=self.sparse.preprocess_func.__name__)
+
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{fusion}', expected one of {FUSION_METHODS}")
+        self.fusion = fusion
+        self.rrf_c = rrf_c
+        self.fusion_weights = {"dense": pc_weight, "sparse": bm25_weight}
+        self.max_rerank_candidates = max_rerank_candidates
+        # Dense and sparse branches of a query run concurrently on this bounded, shared pool
+        self.retrieval_executor = ThreadPoolExecutor(max_workers=retrieval_workers, thread_name_prefix="hybrid-retrieval")
+        # Requests using the retriever (retain/release); close() waits for them to finish
+        self._users = 0
+        self._closing = False
+        self._closed = False
+        self._users_lock = threading.Lock()
+        self.last_timings = {}
+        self._timing_totals = {}
+        self._timed_queries = 0
+        self._timing_lock = threading.Lock()
+        self.reranker = reranker or CrossEncoderReranker(reranker_model_name, max_batch_size=reranker_batch_size,
+                                                         max_batch_tokens=reranker_batch_tokens,
+                                                         token_cache_path=reranker_token_cache_path,
+                                                         backend=reranker_backend, onnx_cache_dir=onnx_cache_dir)
+        # Articles are static, so their reranker token ids are computed once here instead of per query
+        # (or taken from the artifact when it was built with the same tokenizer)
+        self.artifact_tokenizer = artifact.meta.get("tokenizer") if artifact is not None else None
+        if self.artifact_tokenizer is not None:
+            self.reranker.add_text_ids(artifact.raw_texts, artifact.text_token_ids(), self.artifact_tokenizer)
+        self.reranker.text_ids(self.corpus.raw_texts)
+        # Ids of articles no longer in the corpus (e.g. left by a previous corpus) are dropped
+        self.reranker.prune_text_ids(self.corpus.raw_texts)
+        self.reranker.save_token_cache()
+
+        # Optional cascade: a cheap first stage prunes the candidates before the large cross-encoder
+        if rerank_cascade not in CASCADE_STAGES:
+            raise ValueError(f"Unknown rerank cascade '{rerank_cascade}', expected one of {CASCADE_STAGES}")
+        self.rerank_cascade = rerank_cascade
+        self.cascade_depth = cascade_depth
+        self.cascade_reranker = None
+        if rerank_cascade == "cross_encoder":
+            self.cascade_reranker = cascade_reranker or CrossEncoderReranker(cascade_model_name, max_batch_size=reranker_batch_size,
+                                                                             max_batch_tokens=reranker_batch_tokens,
+                                                                             backend=reranker_backend, onnx_cache_dir=onnx_cache_dir)
+            self.cascade_reranker.text_ids(self.corpus.raw_texts)
+            self.cascade_reranker.prune_text_ids(self.corpus.raw_texts)
 
     def create_vectorstore(self,embedding_model_name):
         """
@@ -65,42 +325,141 @@ class HybridRetriever:
             A Chroma vector store instance.
         """
         persist_directory = "data/chromadb-law"  # Path to store the vector database
-        embeddings = HuggingFaceEmbeddings(model_name=embedding_model_name)
+        embeddings = self.create_embeddings(embedding_model_name)
         vectorstore = Chroma(
             embedding_function=embeddings,
             persist_directory=persist_directory,
             collection_name="law_collection",
         )
         return vectorstore
-    def process_dataset(self,documents):
+
+    def write_dense_indexes(self, embedding_model_name, dense_backend, vectorstore_path, batch_size=1000):
+        """
+        Write the parent docstore and the dense index (the NumPy index or a Chroma collection)
+        of the corpus to docstore_path and dense_index_path or vectorstore_path, which must not
+        exist yet, e.g. the staged versions of a rebuild.
+        """
+        dense_path = self.dense_index_path if dense_backend == "numpy" else vectorstore_path
+        if not self.docstore_path or not dense_path:
+            raise ValueError("Building the indexes needs the 'docstore_path' and the dense index path to write them to.")
+        if os.path.lexists(self.docstore_path) or os.path.lexists(dense_path):
+            raise ValueError(f"Cannot build the indexes into existing paths {self.docstore_path} and {dense_path}.")
+        embeddings = self.create_embeddings(embedding_model_name)
+        parents, children = self.split_parent_documents(list(self.documents))
+        docstore = open_docstore(self.docstore_path)
+        for start in range(0, len(parents), batch_size):
+            docstore.mset(parents[start:start + batch_size])
+        if dense_backend == "numpy":
+            NumpyDenseIndex.from_embeddings(embeddings.embed_documents([child.page_content for child in children]),
+                                            [str(uuid.uuid4()) for _ in children],
+                                            [child.metadata["doc_id"] for child in children],
+                                            model_name=embedding_model_name).write(dense_path)
+        else:
+            vectorstore = self.load_vectorstore(dense_path, embedding_model_name)
+            for start in range(0, len(children), batch_size):
+                vectorstore.add_documents(children[start:start + batch_size])
+        print(f"Indexes built: {len(parents)} parent documents, {len(children)} child chunks")
+
+    def open_processed_cache(self):
+        if self.processed_cache is None and self.processed_cache_dir:
+            self.processed_cache = ProcessedCorpusCache(self.processed_cache_dir)
+        return self.processed_cache
+
+    def process_dataset(self,documents, batch_size=32, workers=1, live_texts=None):
       """
       Process the entire dataset by applying the clean_text function to each document.
-      """
-      processed_documents = []
 
+      Documents whose text is already in the processed corpus cache are not re-lemmatized;
+      the rest are cleaned in Stanza batches, optionally across several processes.
+      If the query lemma table is empty, the whole corpus is re-lemmatized once to build it.
+
+      Args:
+          live_texts: Raw texts of the whole corpus after this call; cache entries of other
+              texts (changed or removed articles) are dropped before the cache is saved.
+      """
+      cleaned_contents = []
       for document in documents:
           # Save the original text in metadata
           document.metadata['original_text'] = document.page_content
+          cleaned_contents.append(self.processed_cache.get(document.page_content) if self.processed_cache else None)
 
+      misses = [i for i, cleaned_content in enumerate(cleaned_contents) if cleaned_content is None]
+      if self.lemma_table is not None and not self.lemma_table:
+          misses = list(range(len(documents)))
+      if misses:
           # Apply the clean_text function to the page content
-          cleaned_content = clean_text(document.page_content)
+          cleaned_misses = clean_texts([documents[i].page_content for i in misses], batch_size=batch_size,
+                                       workers=workers, lemma_table=self.lemma_table)
+          for i, cleaned_content in zip(misses, cleaned_misses):
+              cleaned_contents[i] = cleaned_content
+              if self.processed_cache:
+                  self.processed_cache.put(documents[i].page_content, cleaned_content)
+
+      if self.lemma_table is not None:
+          self.lemma_table.save()
+      if self.processed_cache:
+          if live_texts is not None:
+              self.processed_cache.prune(live_texts)
+          self.processed_cache.save()
+          print(f"Processed corpus cache: {len(documents) - len(misses)} hits, {len(misses)} re-processed")
+
+      # Create the processed dataset
+      processed_documents = [
+          {'page_content': cleaned_content, 'metadata': document.metadata}
+          for document, cleaned_content in zip(documents, cleaned_contents)
+      ]
+      return processed_documents
 
-          # Create a new processed document
-          processed_document = {
-              'page_content': cleaned_content,
-              'metadata': document.metadata
-          }
+    def create_embeddings(self, embedding_model_name):
+        """
+        Create the embeddings of the configured inference backend behind an LRU cache of query vectors,
+        or return the retriever's embeddings if they are already loaded.
+        """
+        if self.embeddings is not None:
+            return self.embeddings
+        embeddings = load_embeddings(embedding_model_name, self.embedding_backend, self.onnx_cache_dir)
+        # Vectors of the quantized backend differ slightly, so every backend has its own cache entries
+        cache_model_name = embedding_model_name if self.embedding_backend == "torch" else f"{embedding_model_name}:{self.embedding_backend}"
+        self.embeddings = CachedEmbeddings(
+            embeddings,
+            cache_model_name,
+            max_size=self.query_embedding_cache_size,
+            path=self.query_embedding_cache_path,
+        )
+        return self.embeddings
 
-          # Append the processed document to the new dataset
-          processed_documents.append(processed_document)
+    def load_dense_index(self, index_path, embedding_model_name, quantization=None, rescore_factor=10, reduced=False, rescore_reduced=True):
+        """
+        Memory-map the NumPy dense index, or return None (falling back to Chroma) if it is
+        missing or was exported from a different embedding model.
 
-      return processed_documents
+        Args:
+            quantization: None for an exact float32 scan, "int8" or "binary" to scan quantized
+                codes and rescore a shortlist of dense_k * rescore_factor chunks in float32.
+            reduced: Scan the reduced-dimension (PCA or truncated) vectors stored with the index,
+                rescoring the shortlist with the full vectors if rescore_reduced.
+        """
+        if not index_path or not os.path.exists(index_path):
+            print(f"Warning: Dense index not found at {index_path}, using Chroma. Export it with `python -m src.rag.dense_index`.")
+            return None
+        try:
+            dense_index = NumpyDenseIndex.load(self.hold_version(index_path), quantization=quantization, rescore_factor=rescore_factor,
+                                               reduced=reduced, rescore_reduced=rescore_reduced)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Cannot load dense index at {index_path} ({e}), using Chroma.")
+            return None
+        if dense_index.model_name != embedding_model_name:
+            print(f"Warning: Dense index at {index_path} was built with {dense_index.model_name}, using Chroma.")
+            return None
+        return dense_index
 
     def load_vectorstore(self,persist_directory,embedding_model_name):
         """
         Load a persisted vector store from disk.
         """
-        embeddings = HuggingFaceEmbeddings(model_name=embedding_model_name)
+        embeddings = self.create_embeddings(embedding_model_name)
+        # A published (symlinked) collection is opened at its version, unaffected by the next publish
+        persist_directory = self.hold_version(persist_directory)
         persist_cilent = chromadb.PersistentClient(path=persist_directory)
         vectorstore = Chroma(
             client=persist_cilent,
@@ -110,20 +469,19 @@ class HybridRetriever:
         )
         return vectorstore
 
-    def create_sparse_retriever(self, documents, k=5):
+    def create_sparse_retriever(self, documents, k=4, index_path=None):
         """
         Create a sparse retriever using BM25 algorithm.
 
         Args:
             documents: The documents to use for retrieval.
             k: The number of documents to retrieve.
+            index_path: Directory of a prebuilt BM25 index to memory-map instead of re-tokenizing.
 
         Returns:
-            A BM25Retriever instance.
+            A BM25IndexRetriever instance.
         """
-        bm25_retriever = BM25Retriever.from_documents(
-            documents=documents, search_kwargs={"k": k}
-        )
+        bm25_retriever = BM25IndexRetriever.from_documents(documents, k=k, index_path=self.hold_version(index_path) if index_path else None)
         return bm25_retriever
 
     def create_dense_retriever(self, vectorstore,docstore_path):
@@ -137,12 +495,12 @@ class HybridRetriever:
             A ParentDocumentRetriever instance.
 
         """
-        parent_splitter = RecursiveCharacterTextSplitter(chunk_size=2000)
-        child_splitter = RecursiveCharacterTextSplitter(chunk_size=400)
+        parent_splitter = RecursiveCharacterTextSplitter(chunk_size=PARENT_CHUNK_SIZE)
+        child_splitter = RecursiveCharacterTextSplitter(chunk_size=CHILD_CHUNK_SIZE)
 
         if docstore_path is not None:
-            fs = LocalFileStore(docstore_path)
-            store = create_kv_docstore(fs)
+            # A LocalFileStore directory or a packed SQLite file, behind the parent document cache
+            store = CachedDocstore(open_docstore(self.hold_version(docstore_path), read_only=True), self.docstore_cache_size)
 
             retriever = ParentDocumentRetriever(
               vectorstore=vectorstore,
@@ -152,7 +510,7 @@ class HybridRetriever:
             )
         else:
             fs = LocalFileStore("docstore")
-            store = create_kv_docstore(fs)
+            store = CachedDocstore(create_kv_docstore(fs), self.docstore_cache_size)
 
             retriever = ParentDocumentRetriever(
               vectorstore=vectorstore,
@@ -160,28 +518,360 @@ class HybridRetriever:
               child_splitter=child_splitter,
               docstore=store
           )
-            retriever.add_documents(self.documents)
+            retriever.add_documents(list(self.documents))
 
         return retriever
 
-    def create_ensemble_retriever(self, dense_retriever, sparse_retriever, bm25_weight, pc_weight):
+    @staticmethod
+    def split_parent_documents(documents, id_key="doc_id"):
+        """
+        Split processed articles like ParentDocumentRetriever.add_documents does: parent chunks
+        with new docstore ids, and their child chunks tagged with the parent id.
+
+        Returns:
+            tuple: The [(parent_id, parent Document)] pairs and the child Documents.
+        """
+        parent_splitter = RecursiveCharacterTextSplitter(chunk_size=PARENT_CHUNK_SIZE)
+        child_splitter = RecursiveCharacterTextSplitter(chunk_size=CHILD_CHUNK_SIZE)
+        parents, children = [], []
+        for parent in parent_splitter.split_documents(documents):
+            parent_id = str(uuid.uuid4())
+            for child in child_splitter.split_documents([parent]):
+                child.metadata[id_key] = parent_id
+                children.append(child)
+            parents.append((parent_id, parent))
+        return parents, children
+
+    def writable_docstore(self):
+        if not self._docstore_writable:
+            self.docstore = CachedDocstore(open_docstore(self.hold_version(self.docstore_path)), self.docstore_cache_size)
+            if self.dense is not None:
+                self.dense.docstore = self.docstore
+            self._docstore_writable = True
+        return self.docstore
+
+    def article_parent_ids(self, batch_size=256):
         """
-        Create an ensemble retriever that combines both dense and sparse retrievers.
+        Docstore ids of the parent chunks of every article, read from the docstore once.
+        """
+        if self._article_parent_ids is None:
+            parent_ids = {}
+            keys = list(self.docstore.yield_keys())
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                for key, document in zip(batch, self.docstore.store.mget(batch)):
+                    if document is not None:
+                        parent_ids.setdefault(article_key(document), []).append(key)
+            self._article_parent_ids = parent_ids
+        return self._article_parent_ids
+
+    def upsert_articles(self, articles, persist=True):
+        """
+        Add new articles and replace changed ones without rebuilding the retriever.
+
+        An article replaces the corpus article with the same (law_short, article_number). Only
+        the given articles are lemmatized, tokenized and embedded; see apply_corpus_changes.
 
         Args:
-            dense_retriever: The dense retriever to use.
-            sparse_retriever: The sparse retriever to use.
-            bm25_weight: Weight for the BM25 retriever.
-            pc_weight: Weight for the dense retriever.
+            articles: Dictionaries with page_content and metadata, like the corpus JSON items.
+            persist: Also write the corpus JSON and the on-disk BM25 and dense indexes.
 
         Returns:
-            An EnsembleRetriever instance.
+            dict: Number of articles added, replaced and removed, and the new corpus_version.
         """
-        ensemble = EnsembleRetriever(
-            retrievers=[dense_retriever, sparse_retriever],
-            weights=[bm25_weight, pc_weight],
-        )
-        return ensemble
+        return self.apply_corpus_changes(upserts=articles, persist=persist)
+
+    def remove_articles(self, keys, persist=True):
+        """
+        Remove articles by (law_short, article_number) key; unknown keys are ignored.
+
+        Returns:
+            dict: Number of articles added, replaced and removed, and the new corpus_version.
+        """
+        return self.apply_corpus_changes(removals=keys, persist=persist)
+
+    def apply_corpus_changes(self, upserts=(), removals=(), persist=True):
+        """
+        Update the sparse index, dense index, docstore and article graph in place for a few
+        changed articles.
+
+        Every structure is rebuilt beside the one in use and swapped in with a single
+        assignment, so concurrent queries see either the old or the new corpus of each branch.
+        Updates are serialized. Cached rerank scores are invalidated by the new corpus_version.
+        """
+        with self._update_lock:
+            documents = [Document(page_content=item['page_content'], metadata=dict(item['metadata'])) for item in upserts]
+            removal_keys = {(law_short, str(article_number)) for law_short, article_number in removals}
+            positions = {}
+            for row in range(len(self.corpus)):
+                positions.setdefault(self.corpus.key(row), []).append(row)
+
+            # Corpus positions: an upsert replaces the first copy of its article, other copies are dropped
+            replaced, removed, appended = {}, set(), []
+            processed_replaced, processed_appended = {}, []
+            upserted = {}
+            for document in documents:
+                upserted[article_key(document)] = document
+            changed_keys = set(upserted) | removal_keys
+            live_texts = [self.corpus.raw_texts[row] for row in range(len(self.corpus)) if self.corpus.key(row) not in changed_keys]
+            live_texts += [document.page_content for document in upserted.values()]
+            self.open_processed_cache()
+            processed_documents = [Document(page_content=item['page_content'], metadata=item['metadata'])
+                                   for item in self.process_dataset(list(upserted.values()), live_texts=live_texts)]
+            for (key, document), processed in zip(upserted.items(), processed_documents):
+                if key in positions:
+                    first, *duplicates = positions[key]
+                    replaced[first] = document
+                    processed_replaced[first] = processed
+                    removed.update(duplicates)
+                else:
+                    appended.append(document)
+                    processed_appended.append(processed)
+            for key in removal_keys - set(upserted):
+                removed.update(positions.get(key, []))
+
+            # Dense branch: new parents are written before the index points at them, and the
+            # stale parents deleted after
+            parent_ids = self.article_parent_ids()
+            stale_parent_ids = [parent_id for key in changed_keys for parent_id in parent_ids.get(key, [])]
+            parents, children = self.split_parent_documents(processed_documents)
+            docstore = self.writable_docstore()
+            if parents:
+                docstore.mset(parents)
+            if self.dense_index is not None:
+                embeddings = self.embeddings.embed_documents([child.page_content for child in children]) if children else None
+                self.dense_index = self.dense_index.with_changes(
+                    stale_parent_ids, embeddings, [str(uuid.uuid4()) for _ in children],
+                    [child.metadata["doc_id"] for child in children])
+            else:
+                if children:
+                    self.vectorstore.add_documents(children)
+                if stale_parent_ids:
+                    stale_child_ids = self.vectorstore.get(where={self.dense.id_key: {"$in": stale_parent_ids}}, include=[])["ids"]
+                    if stale_child_ids:
+                        self.vectorstore.delete(ids=stale_child_ids)
+            if stale_parent_ids:
+                docstore.mdelete(stale_parent_ids)
+            for key in changed_keys:
+                parent_ids.pop(key, None)
+            for parent_id, parent in parents:
+                parent_ids.setdefault(article_key(parent), []).append(parent_id)
+
+            # Corpus store, sparse branch and article graph, from the updated raw articles
+            rows = [row for row in range(len(self.corpus)) if row not in removed]
+            corpus = CorpusStore.from_documents(
+                [replaced[row] if row in replaced else self.corpus.document(row) for row in rows] + appended,
+                [processed_replaced[row].page_content if row in processed_replaced else self.corpus.processed_texts[row] for row in rows]
+                + [doc.page_content for doc in processed_appended])
+            self.sparse = self.sparse.with_changes(replaced=replaced, removed=removed, appended=appended, docs=corpus.documents())
+            self.corpus = corpus
+            self.documents = corpus.documents(processed=True)
+            self.article_graph = ArticleGraph(corpus.documents())
+            self.laws = sorted({law for law, _ in self.article_graph.keys})
+            self.corpus_version = corpus_fingerprint(corpus.raw_texts)
+            self.rerank_cache.clear()
+
+            # Only the new texts are tokenized, and the ids of the replaced and removed ones dropped
+            new_texts = [doc.metadata["original_text"] for doc in upserted.values()]
+            for reranker in (self.reranker, self.cascade_reranker):
+                if reranker is not None:
+                    reranker.text_ids(new_texts)
+                    reranker.prune_text_ids(corpus.raw_texts)
+            self.reranker.save_token_cache()
+
+            if persist:
+                self.save_corpus()
+            print(f"Corpus updated: {len(appended)} added, {len(replaced)} replaced, {len(removed)} removed")
+            return {"added": len(appended), "replaced": len(replaced), "removed": len(removed),
+                    "corpus_version": self.corpus_version}
+
+    def save_corpus(self):
+        """
+        Write the corpus artifact and JSON (whichever the retriever has), the BM25 index and the NumPy dense index of the
+        current corpus, each replacing the previous file or directory atomically.
+        """
+        items = [{"page_content": self.corpus.raw_texts[row], "metadata": self.corpus.metadata(row, original_text=False)}
+                 for row in range(len(self.corpus))]
+        if self.corpus_artifact_path:
+            write_corpus_artifact(self.corpus_artifact_path, items, self.corpus.processed_texts,
+                                  self.reranker.tokenizer if self.artifact_tokenizer == self.reranker.tokenizer_key else None,
+                                  self.lemma_table, self.documents_path)
+        if self.documents_path:
+            with atomic_write(self.documents_path) as f:
+                json.dump(items, f, ensure_ascii=False, indent=2)
+        if self.sparse_index_path:
+            self.sparse.index.save(self.sparse_index_path, fingerprint=self.corpus_version,
+                                   preprocess=self.sparse.preprocess_func.__name__)
+        if self.dense_index is not None and self.dense_index_path:
+            self.dense_index.save(self.dense_index_path)
+
+    def _timed_call(self, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - start
+
+    def _submit_branch(self, func, query):
+        try:
+            return self.retrieval_executor.submit(self._timed_call, func, query)
+        except RuntimeError:
+            # The retriever was closed while a caller that did not retain it was querying it
+            future = Future()
+            future.set_result(self._timed_call(func, query))
+            return future
+
+    def hold_version(self, path):
+        """
+        Resolve an index path to its current version, leased until close() so a publish (by
+        this or another process) does not remove the version while it is loaded.
+        """
+        version, lease = lease_version(path)
+        self.version_leases.append(lease)
+        return version
+
+    def retain(self):
+        """
+        Mark the retriever as used by a request, so close() waits for the request to release it.
+        """
+        with self._users_lock:
+            self._users += 1
+        return self
+
+    def release(self):
+        with self._users_lock:
+            self._users -= 1
+            idle = self._closing and self._users == 0
+        if idle:
+            self._shutdown()
+
+    def close(self):
+        """
+        Shut down the retrieval thread pool once the retriever is replaced, save the query
+        embedding and reranker token caches so entries added since their last save are kept, and
+        release the leases on the index versions it loaded, which the next publish removes.
+        Requests that retained the retriever finish on the thread pool first: the shutdown
+        happens when the last of them releases it.
+        """
+        with self._users_lock:
+            self._closing = True
+            idle = self._users == 0
+        if idle:
+            self._shutdown()
+
+    def _shutdown(self):
+        with self._users_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.retrieval_executor.shutdown(wait=True)
+        if self.embeddings is not None:
+            self.embeddings.close()
+        if self.reranker is not None:
+            self.reranker.save_token_cache()
+        for lease in self.version_leases:
+            lease.release()
+        self.version_leases = []
+
+    def dense_search_with_scores(self, query):
+        """
+        Search the dense_k closest child chunks and return their parent documents, keeping the
+        score of the best matching child. The NumPy backend scores by cosine similarity,
+        Chroma by its relevance score.
+
+        Returns:
+            list[tuple[Document, float]]: Parent documents with their scores, best first.
+        """
+        if self.dense_index is not None:
+            rows, scores = self.dense_index.search(self.embeddings.embed_query(query), self.dense_k)
+            children = [(str(self.dense_index.parent_ids[row]), float(score)) for row, score in zip(rows, scores)]
+        else:
+            sub_docs = self.vectorstore.similarity_search_with_relevance_scores(query, k=self.dense_k)
+            children = [(sub_doc.metadata.get(self.dense.id_key), score) for sub_doc, score in sub_docs]
+        # Keep the order of the first (best) child of each parent, like ParentDocumentRetriever
+        parent_scores = {}
+        for parent_id, score in children:
+            if parent_id is not None and parent_id not in parent_scores:
+                parent_scores[parent_id] = score
+        parents = self.docstore.mget(list(parent_scores))
+        return [(doc, score) for doc, score in zip(parents, parent_scores.values()) if doc is not None]
+
+    def retrieve_candidates(self, processed_query):
+        """
+        Run the dense and sparse retrievers concurrently and fuse their rankings.
+
+        Args:
+            processed_query: The preprocessed (lemmatized and normalized) query.
+
+        Returns:
+            list[dict]: The fused candidates, best first, with their "document", "fused_score",
+                "dense_score" and "sparse_score".
+        """
+        start = time.perf_counter()
+        dense_future = self._submit_branch(self.dense_search_with_scores, processed_query)
+        sparse_future = self._submit_branch(self.sparse.search_with_scores, processed_query)
+        dense_results, dense_time = dense_future.result()
+        sparse_results, sparse_time = sparse_future.result()
+        fusion_start = time.perf_counter()
+        results = fuse_rankings({"dense": dense_results, "sparse": sparse_results}, self.fusion_weights,
+                                method=self.fusion, rrf_c=self.rrf_c)
+        end = time.perf_counter()
+        self._record_timings({
+            "dense": dense_time,
+            "sparse": sparse_time,
+            "fusion": end - fusion_start,
+            "total": end - start,
+        })
+        return results
+
+    def _record_timings(self, timings):
+        with self._timing_lock:
+            self.last_timings = timings
+            self._timed_queries += 1
+            for name, seconds in timings.items():
+                self._timing_totals[name] = self._timing_totals.get(name, 0.0) + seconds
+
+    def retrieval_timings(self):
+        """
+        Per-branch retrieval timings in milliseconds, for the last query and averaged over all queries.
+        """
+        with self._timing_lock:
+            count = self._timed_queries
+            return {
+                "queries": count,
+                "last_ms": {name: seconds * 1000 for name, seconds in self.last_timings.items()},
+                "mean_ms": {name: total * 1000 / count for name, total in self._timing_totals.items()} if count else {},
+            }
+
+    def cache_stats(self):
+        """
+        Hit-rate metrics of the retrieval caches.
+        """
+        return {
+            "query_embeddings": self.embeddings.stats(),
+            "rerank_scores": self.rerank_cache.stats(),
+            "parent_documents": self.docstore.stats() if isinstance(self.docstore, CachedDocstore) else None,
+            "query_lemmas": self.lemma_table.stats() if self.lemma_table is not None else None,
+        }
+
+    def memory_report(self):
+        """
+        Python heap and memory-mapped bytes of every retrieval component (see memory_report).
+        """
+        docstore_cache = self.docstore.cache if isinstance(self.docstore, CachedDocstore) else None
+        embedding_cache = getattr(self.embeddings, "cache", None)
+        return memory_report([
+            ("corpus", self.corpus),
+            ("raw_documents", self.sparse.docs),
+            ("processed_documents", self.documents),
+            ("article_graph", self.article_graph),
+            ("bm25_index", self.sparse.index),
+            ("dense_index", self.dense_index),
+            ("reranker_token_ids", self.reranker.text_token_ids),
+            ("rerank_cache", self.rerank_cache),
+            ("query_embedding_cache", embedding_cache),
+            ("docstore_cache", docstore_cache),
+            ("processed_cache", self.processed_cache),
+            ("lemma_table", self.lemma_table),
+        ])
 
     def normalize_scores(self,scores):
         min_score = min(scores)
@@ -189,30 +879,69 @@ class HybridRetriever:
         normalized_scores = [(score - min_score) / (max_score - min_score) if max_score > min_score else 0 for score in scores]
         return normalized_scores
     
+    def cached_scores(self, reranker, stage, query, documents):
+        """
+        Cross-encoder scores of (query, document) pairs, reusing cached scores so that only the
+        other pairs reach the model.
+
+        Args:
+            reranker (CrossEncoderReranker): The model to score with.
+            stage (str): Name of the model's stage, part of the cache key.
+            query (str): The query string.
+            documents (list[Document]): The documents to score.
+
+        Returns:
+            list[float]: The raw score of every document, in the order of documents.
+        """
+        query_key = normalize_query_key(query)
+        cache_keys = [(self.corpus_version, stage, query_key) + article_key(doc) for doc in documents]
+        scores = [self.rerank_cache.get(key) for key in cache_keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            # Score (query, document) pairs in length-bucketed micro-batches
+            fresh_scores = reranker.score(query, [documents[i].metadata["original_text"] for i in missing])
+            for i, score in zip(missing, fresh_scores):
+                scores[i] = score
+                self.rerank_cache.put(cache_keys[i], score)
+        return scores
+
+    def cascade_prune(self, query, documents):
+        """
+        First stage of the rerank cascade: keep the cascade_depth most promising documents.
+
+        The "retrieval" stage trusts the order the documents were retrieved in (their fused
+        score) and the "cross_encoder" stage ranks them with the small cross-encoder. Without a
+        cascade, or with no more documents than cascade_depth, all documents are kept.
+
+        Returns:
+            list[Document]: The kept documents, best first.
+        """
+        if self.rerank_cascade is None or len(documents) <= self.cascade_depth:
+            return documents
+        if self.rerank_cascade == "retrieval":
+            return documents[:self.cascade_depth]
+        scores = self.cached_scores(self.cascade_reranker, "cascade", query, documents)
+        order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+        return [documents[i] for i in order[:self.cascade_depth]]
+
     def rerank(self,query, documents, rank_diff_threshold=0.2):
         """
         Rerank a list of Document objects based on their relevance to the query.
 
         Args:
             query (str): The query string.
-            documents (list[Document]): A list of Document objects to rerank.
+            documents (list[Document]): A list of Document objects to rerank, in retrieval order.
             rank_diff_threshold (float): The threshold for rank difference to stop reranking.
 
         Returns:
             list[Document]: A list of reranked Document objects.
         """
-        # Extract the text content from the Document objects
-        document_texts = [doc.metadata["original_text"] for doc in documents]
-
-        # Create (query, document) pairs using only the text content
-        pairs = [[query, doc_text] for doc_text in document_texts]
-
-        with torch.no_grad():
-            inputs = self.tokenizer(pairs, padding=True, truncation=True, return_tensors='pt', max_length=512)
-            scores = self.model(**inputs, return_dict=True).logits.view(-1).float()
+        # Only the candidates the cascade's first stage keeps reach the large cross-encoder
+        documents = self.cascade_prune(query, documents)
+        scores = self.cached_scores(self.reranker, "rerank", query, documents)
 
         # Sort documents by raw score descending
-        scored_docs = sorted(zip(documents, scores.tolist()), key=lambda x: x[1], reverse=True)
+        scored_docs = sorted(zip(documents, scores), key=lambda x: x[1], reverse=True)
 
         # Normalize scores to 0-1
         raw_scores = [score for _, score in scored_docs]
@@ -223,41 +952,25 @@ class HybridRetriever:
         selected_docs = []
         for i in range(len(scored_docs)):
             doc, score = scored_docs[i]
-            doc_with_linked_articles = self.get_linked_articles(doc)
-            selected_docs.append(doc_with_linked_articles) 
+            selected_docs.append(doc)
 
             # Stop if rank difference is large
             if i < len(scored_docs) - 1:
                 if score - scored_docs[i + 1][1] > rank_diff_threshold:
                     break
 
-        return selected_docs
-    
-    def get_linked_articles(self,document):
-        law = document.metadata.get("law_short")
-        linked_articles = document.metadata.get("linked_articles")
+        return self.get_linked_articles(selected_docs)
+
+    def get_linked_articles(self, documents):
+        """
+        Rows of article texts for the given documents, each followed by the articles it links to
+        (up to link_hops links away), without repeating an article across rows.
+        """
+        return self.article_graph.expand([article_key(doc) for doc in documents], self.link_hops)
 
-        row = [document.metadata.get("original_text")] 
-        if linked_articles:
-            try:
-                articles_list = ast.literal_eval(linked_articles)
-                for article in articles_list:
-                    article_str = str(article)
-                    linked_key = (article_str,law)
-
-                    linked_doc = self.doc_lookup.get(linked_key)
-                    if linked_doc:
-                        row.append(linked_doc.metadata.get("original_text"))
-                    else:
-                        print(f"Warning: Linked document not found for {linked_key}")
-
-            except Exception as e:
-                print(f"Error parsing linked_articles: {linked_articles}\n{e}")
-        return row
-     
     def retrieve_documents(self, query):
         """
-        Retrieve documents using the ensemble retriever.
+        Retrieve documents with hybrid dense/sparse retrieval, fusion and reranking.
 
         Args:
             query: The query string to search for.
@@ -267,15 +980,19 @@ class HybridRetriever:
             A list of retrieved documents.
         """
         result = []
-        lookups = extract_article_lookup(query)
+        lookups = extract_article_lookup(query, self.laws)
         if lookups is not None:
-            for lookup in lookups:
-                doc =self.doc_lookup.get(lookup)
-                doc_with_linked_articles = self.get_linked_articles(doc)
-                result.append(doc_with_linked_articles)
+            # Citation fast path: no BM25, embeddings or reranker. Articles missing from the
+            # corpus are left out, so the generator reports them as unavailable
+            result = self.article_graph.expand([(law_short, article_number) for article_number, law_short in lookups],
+                                               self.citation_link_hops)
         else:
-            processed_query = clean_text(query)
-            results = self.ensemble_retriever.get_relevant_documents(processed_query)
-            unique_documents ={doc.metadata['article_number']: doc for doc in results}.values()
-            result = self.rerank(query, unique_documents)
+            if self.lemma_table is not None:
+                processed_query = clean_query(query, self.lemma_table)
+            else:
+                ensure_nlp_tools()
+                processed_query = clean_text(query)
+            # Candidates are already unique per article; only the best fused ones are reranked
+            candidates = self.retrieve_candidates(processed_query)[:self.max_rerank_candidates]
+            result = self.rerank(query, [candidate["document"] for candidate in candidates])
         return result
\ No newline at end of file
@@ -0,0 +1,73 @@
+import threading
+import time
+from datetime import datetime
+
+
+class IndexRebuild:
+    def __init__(self, build, swap):
+        """
+        Blue/green rebuild of the retrieval indexes in a background thread.
+
+        The new retriever is built next to the live one, which keeps serving requests, and is
+        handed to swap only once it is complete. A failed build leaves the live retriever in
+        place. One rebuild runs at a time.
+
+        Args:
+            build: Called in the background thread; returns the new retriever.
+            swap: Called with the new retriever to make it live.
+        """
+        self.build = build
+        self.swap = swap
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = {"state": "idle", "started_at": None, "finished_at": None, "seconds": None, "error": None, "swaps": 0}
+
+    def start(self):
+        """
+        Start a rebuild in the background.
+
+        Returns:
+            bool: False if a rebuild is already running.
+        """
+        with self._lock:
+            if self._status["state"] == "running":
+                return False
+            self._status.update(state="running", started_at=datetime.now().isoformat(), finished_at=None,
+                                seconds=None, error=None)
+            self._thread = threading.Thread(target=self._run, name="index-rebuild", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            retriever = self.build()
+            self.swap(retriever)
+        except Exception as e:
+            print(f"Warning: Index rebuild failed, the live retriever is kept: {e}")
+            state, error = "failed", f"{type(e).__name__}: {e}"
+        else:
+            state, error = "succeeded", None
+        with self._lock:
+            self._status.update(state=state, error=error, finished_at=datetime.now().isoformat(),
+                                seconds=time.perf_counter() - start)
+            if state == "succeeded":
+                self._status["swaps"] += 1
+
+    def wait(self, timeout=None):
+        """
+        Wait for the running rebuild, if any. Returns False if it is still running after timeout.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def status(self):
+        """
+        State of the last rebuild ("idle", "running", "succeeded" or "failed"), its start and end
+        times, duration in seconds, error, and the number of successful swaps.
+        """
+        with self._lock:
+            return dict(self._status)
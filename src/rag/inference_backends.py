@@ -0,0 +1,258 @@
+import os
+import re
+import json
+from types import SimpleNamespace
+import numpy as np
+import torch
+from langchain_core.embeddings import Embeddings
+from transformers import AutoTokenizer
+
+INFERENCE_BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_OPSET = 17
+
+
+class _OutputOnly(torch.nn.Module):
+    # Exposes a single tensor output of a HuggingFace model, which torch.onnx can trace
+    def __init__(self, model, output_name):
+        super().__init__()
+        self.model = model
+        self.output_name = output_name
+
+    def forward(self, input_ids, attention_mask, token_type_ids=None):
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if token_type_ids is not None:
+            inputs["token_type_ids"] = token_type_ids
+        return getattr(self.model(**inputs, return_dict=True), self.output_name)
+
+
+def onnx_model_dir(cache_dir, model_name):
+    return os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9._-]+", "--", model_name))
+
+
+def export_onnx(model, path, input_names, output_name):
+    """
+    Export a HuggingFace model to ONNX with dynamic batch and sequence axes.
+
+    Args:
+        model: The PyTorch model.
+        path: Output .onnx file.
+        input_names: Model inputs to export, e.g. the tokenizer's model_input_names.
+        output_name: Output of the model to expose, e.g. "logits" or "last_hidden_state".
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    dummy = {name: torch.ones((1, 8), dtype=torch.long) for name in input_names}
+    if "token_type_ids" in dummy:
+        dummy["token_type_ids"] = torch.zeros((1, 8), dtype=torch.long)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes[output_name] = {0: "batch"}
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(_OutputOnly(model.eval(), output_name), (), tmp_path, kwargs=dummy,
+                          input_names=list(input_names), output_names=[output_name],
+                          dynamic_axes=dynamic_axes, opset_version=ONNX_OPSET, dynamo=False)
+    os.replace(tmp_path, path)
+
+
+def quantize_onnx_int8(path, int8_path):
+    """
+    Dynamically quantize the weights of an ONNX model to int8 (activations stay float and are
+    quantized on the fly), the CPU-friendly setting for transformer encoders.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_path = f"{int8_path}.{os.getpid()}.tmp"
+    quantize_dynamic(path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, int8_path)
+
+
+def prepare_onnx_model(model_name, backend, cache_dir, load_model, input_names, output_name):
+    """
+    Path of the ONNX model of a backend, exporting (and quantizing) it on first use.
+
+    Args:
+        model_name: Name the exported files are stored under in cache_dir.
+        backend: "onnx" or "onnx-int8".
+        cache_dir: Directory of the exported models.
+        load_model: Called to get the PyTorch model when it has to be exported.
+        input_names, output_name: Passed to export_onnx.
+
+    Returns:
+        str: Path of the .onnx file to run.
+    """
+    model_dir = onnx_model_dir(cache_dir, model_name)
+    path = os.path.join(model_dir, "model.onnx")
+    if not os.path.exists(path):
+        print(f"Exporting {model_name} to {path}")
+        export_onnx(load_model(), path, input_names, output_name)
+    if backend == "onnx-int8":
+        int8_path = os.path.join(model_dir, "model-int8.onnx")
+        if not os.path.exists(int8_path):
+            print(f"Quantizing {path} to {int8_path}")
+            quantize_onnx_int8(path, int8_path)
+        path = int8_path
+    return path
+
+
+def create_session(path, num_threads=None):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+class OnnxSequenceClassifier:
+    def __init__(self, path, num_threads=None):
+        """
+        An exported sequence classifier run by ONNX Runtime, called like the PyTorch model
+        (model(**inputs).logits) so CrossEncoderReranker can use either.
+        """
+        self.path = path
+        self.session = create_session(path, num_threads)
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    def eval(self):
+        return self
+
+    def __call__(self, return_dict=True, **inputs):
+        feed = {name: np.asarray(inputs[name], dtype=np.int64) for name in self.input_names}
+        logits = self.session.run(None, feed)[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+
+def load_sequence_classifier(model_name, backend="torch", cache_dir="data/onnx", model=None, input_names=("input_ids", "attention_mask"),
+                             num_threads=None):
+    """
+    Load a cross-encoder for the given inference backend.
+
+    Args:
+        model_name: HuggingFace model to load, and the name exported files are stored under.
+        backend: One of INFERENCE_BACKENDS.
+        cache_dir: Directory of the exported ONNX models.
+        model: Already loaded PyTorch model to use (or export) instead of loading model_name.
+        input_names: Inputs of the model, from its tokenizer.
+        num_threads: ONNX Runtime intra-op threads; None lets it decide.
+
+    Returns:
+        The PyTorch model, or an OnnxSequenceClassifier.
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {INFERENCE_BACKENDS}")
+
+    def load_model():
+        if model is not None:
+            return model
+        from transformers import AutoModelForSequenceClassification
+        return AutoModelForSequenceClassification.from_pretrained(model_name)
+
+    if backend == "torch":
+        return load_model()
+    path = prepare_onnx_model(model_name, backend, cache_dir, load_model, input_names, "logits")
+    return OnnxSequenceClassifier(path, num_threads)
+
+
+def sentence_embedding_config(model):
+    """
+    Pooling mode, normalization and maximum length of a SentenceTransformer.
+    """
+    pooling_module = next((module for module in model if type(module).__name__ == "Pooling"), None)
+    pooling = "cls" if pooling_module is not None and pooling_module.get_pooling_mode_str() == "cls" else "mean"
+    normalize = any(type(module).__name__ == "Normalize" for module in model)
+    return {"pooling": pooling, "normalize": normalize, "max_length": model.max_seq_length}
+
+
+class OnnxSentenceEmbeddings(Embeddings):
+    def __init__(self, path, tokenizer, pooling="mean", normalize=True, max_length=512, batch_size=32, num_threads=None):
+        """
+        Sentence embeddings from an exported transformer run by ONNX Runtime, pooled and
+        normalized like the SentenceTransformer it was exported from.
+
+        Args:
+            path: The .onnx file, exposing last_hidden_state.
+            tokenizer: The model's tokenizer.
+            pooling: "mean" or "cls" pooling of the token vectors.
+            normalize: Whether vectors are scaled to unit length.
+            max_length: Maximum tokens per text; longer texts are truncated.
+            batch_size: Texts per forward pass.
+            num_threads: ONNX Runtime intra-op threads; None lets it decide.
+        """
+        if pooling not in ("mean", "cls"):
+            raise ValueError(f"Unsupported pooling '{pooling}', expected 'mean' or 'cls'")
+        self.path = path
+        self.tokenizer = tokenizer
+        self.pooling = pooling
+        self.normalize = normalize
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.session = create_session(path, num_threads)
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    def encode(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            inputs = self.tokenizer(texts[start:start + self.batch_size], padding=True, truncation=True,
+                                    max_length=self.max_length, return_tensors='np')
+            feed = {name: inputs[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feed)[0]
+            if self.pooling == "cls":
+                pooled = hidden[:, 0]
+            else:
+                mask = inputs["attention_mask"][..., None].astype(hidden.dtype)
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.append(pooled.astype(np.float32))
+        return np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts):
+        return self.encode(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
+
+
+def load_embeddings(model_name, backend="torch", cache_dir="data/onnx", sentence_transformer=None, num_threads=None):
+    """
+    Load a query/document embedding model for the given inference backend.
+
+    Args:
+        model_name: SentenceTransformer model to load, and the name exported files are stored under.
+        backend: One of INFERENCE_BACKENDS.
+        cache_dir: Directory of the exported ONNX models.
+        sentence_transformer: Already loaded SentenceTransformer to use (or export) instead.
+        num_threads: ONNX Runtime intra-op threads; None lets it decide.
+
+    Returns:
+        Embeddings: HuggingFaceEmbeddings for "torch", OnnxSentenceEmbeddings otherwise.
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {INFERENCE_BACKENDS}")
+    if backend == "torch":
+        from langchain.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=model_name)
+
+    def load_model():
+        nonlocal sentence_transformer
+        if sentence_transformer is None:
+            from sentence_transformers import SentenceTransformer
+            sentence_transformer = SentenceTransformer(model_name, device="cpu")
+        return sentence_transformer
+
+    # The transformer module alone is exported; pooling and normalization run in NumPy. The
+    # tokenizer and pooling settings are saved next to it so later loads skip the PyTorch model
+    model_dir = onnx_model_dir(cache_dir, model_name)
+    config_path = os.path.join(model_dir, "embedding_config.json")
+    if not os.path.exists(config_path):
+        model = load_model()
+        os.makedirs(model_dir, exist_ok=True)
+        model.tokenizer.save_pretrained(model_dir)
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(sentence_embedding_config(model), f)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    path = prepare_onnx_model(model_name, backend, cache_dir, lambda: load_model()[0].auto_model,
+                              tokenizer.model_input_names, "last_hidden_state")
+    return OnnxSentenceEmbeddings(path, tokenizer, num_threads=num_threads, **config)
@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+from collections import Counter
+from src.rag.atomic_files import atomic_write
+from src.rag.preprocessing_pipline import PREPROCESSING_VERSION
+
+
+class LemmaTable:
+    def __init__(self, path=None, version=PREPROCESSING_VERSION):
+        """
+        Word -> lemma memo table built from the Stanza output of the processed corpus.
+
+        Stanza may lemmatize the same surface token differently depending on context, so the
+        table keeps every observed (token, lemma) count and resolves a token to its most
+        frequent lemma.
+
+        Args:
+            path: JSON file the table is persisted to. None keeps it in memory only.
+            version: Preprocessing version the lemmas were produced with.
+        """
+        self.path = path
+        self.version = version
+        self.counts = {}
+        self.table = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def __len__(self):
+        return len(self.table)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Ignoring unreadable lemma table {self.path}: {e}")
+            return
+        if payload.get("version") != self.version:
+            return
+        self.counts = payload.get("counts", {})
+        self.table = {token: max(lemmas, key=lemmas.get) for token, lemmas in self.counts.items()}
+
+    def observe(self, token_lemma_counts):
+        """
+        Merge {(token, lemma): count} observations from a Stanza pass into the table.
+        """
+        with self._lock:
+            for (token, lemma), count in token_lemma_counts.items():
+                lemmas = self.counts.setdefault(token, {})
+                lemmas[lemma] = lemmas.get(lemma, 0) + count
+                self.table[token] = max(lemmas, key=lemmas.get)
+            if token_lemma_counts:
+                self._dirty = True
+
+    def update(self, counts):
+        """
+        Merge {token: {lemma: count}} counts, e.g. those stored with a corpus artifact.
+        """
+        self.observe(Counter({(token, lemma): count for token, lemmas in counts.items() for lemma, count in lemmas.items()}))
+
+    def lookup(self, token):
+        lemma = self.table.get(token)
+        with self._lock:
+            if lemma is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return lemma
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.table),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            with atomic_write(self.path) as f:
+                json.dump({"version": self.version, "counts": self.counts}, f, ensure_ascii=False)
+            self._dirty = False
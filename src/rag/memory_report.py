@@ -0,0 +1,133 @@
+import os
+import sys
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+import numpy as np
+
+# Shared code objects, not part of any component's data
+_SKIPPED_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+
+def _mapped_root(array):
+    # Outermost memory-mapped array this array is a view of, if any
+    root = None
+    while isinstance(array, np.ndarray):
+        if isinstance(array, np.memmap):
+            root = array
+        array = array.base
+    return root
+
+
+def _slot_values(obj):
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if hasattr(obj, name):
+                yield getattr(obj, name)
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Bytes held by an object and everything it references, split into Python heap bytes and
+    bytes of memory-mapped files (shared through the page cache, resident only once read).
+
+    Objects already in seen are not counted again, so a string shared by two components
+    counts once, for the first.
+
+    Returns:
+        tuple[int, int]: The heap and memory-mapped bytes.
+    """
+    seen = set() if seen is None else seen
+    heap = mapped = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if obj is None or id(obj) in seen or isinstance(obj, _SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+        heap += sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, bytearray, int, float, bool)):
+            continue
+        if isinstance(obj, np.ndarray):
+            root = _mapped_root(obj)
+            if root is not None:
+                if id(root.base) not in seen:
+                    # Counted per mapped file, however many views of it exist
+                    seen.add(id(root.base))
+                    mapped += root.nbytes
+            elif obj.base is not None:
+                stack.append(obj.base)
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+            continue
+        if isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+            continue
+        if hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+        stack.extend(_slot_values(obj))
+    return heap, mapped
+
+
+def memory_report(components):
+    """
+    Size of every component of a process, in the given order.
+
+    Memory shared between components is attributed to the first one that references it, so
+    the sizes add up to the total without double counting.
+
+    Args:
+        components: (name, object) pairs; None objects are reported as empty.
+
+    Returns:
+        dict: Component name -> {"heap_bytes", "mapped_bytes"}.
+    """
+    seen = set()
+    report = {}
+    for name, obj in components:
+        heap, mapped = deep_sizeof(obj, seen)
+        report[name] = {"heap_bytes": heap, "mapped_bytes": mapped}
+    return report
+
+
+def resident_set_size():
+    """
+    Resident memory of the current process in bytes, or None where /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def format_memory_report(report, before=None):
+    """
+    Table of a memory_report, with the heap size of every component in a before report
+    (e.g. of the previous representation) when given.
+    """
+    names = list(before or {}) + [name for name in report if name not in (before or {})]
+    header = f"{'component':<24} {'heap MB':>9} {'mapped MB':>10}"
+    if before is not None:
+        header += f" {'before MB':>10} {'change':>8}"
+    lines = [header]
+
+    def megabytes(value):
+        return value / 2**20
+
+    for name in names + ["total"]:
+        if name == "total":
+            entry = {key: sum(item[key] for item in report.values()) for key in ("heap_bytes", "mapped_bytes")}
+            previous = {key: sum(item[key] for item in before.values()) for key in ("heap_bytes", "mapped_bytes")} if before else None
+        else:
+            entry = report.get(name, {"heap_bytes": 0, "mapped_bytes": 0})
+            previous = before.get(name, {"heap_bytes": 0, "mapped_bytes": 0}) if before is not None else None
+        line = f"{name:<24} {megabytes(entry['heap_bytes']):>9.2f} {megabytes(entry['mapped_bytes']):>10.2f}"
+        if previous is not None:
+            if previous['heap_bytes']:
+                change = f"{(entry['heap_bytes'] - previous['heap_bytes']) / previous['heap_bytes']:+.1%}"
+            else:
+                change = "new" if entry['heap_bytes'] else "-"
+            line += f" {megabytes(previous['heap_bytes']):>10.2f} {change:>8}"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import argparse
+import threading
+from langchain_core.stores import BaseStore
+from langchain.storage import LocalFileStore
+from langchain.storage._lc_store import create_kv_docstore
+from src.rag.artifact_versions import resolve_version, staged_version
+
+# Keys per SELECT ... IN (...), below SQLite's default limit of bound parameters
+MGET_BATCH = 500
+# Bytes of the database file SQLite memory-maps for reads
+MMAP_SIZE = 256 * 2**20
+PACKED_DOCSTORE_SUFFIXES = (".sqlite", ".db")
+# Default docstore, and the LocalFileStore directory it is migrated from
+DEFAULT_DOCSTORE_PATH = "data/docstore.sqlite"
+LEGACY_DOCSTORE_PATH = "data/docstore"
+
+
+class PackedByteStore(BaseStore):
+    def __init__(self, path, read_only=False):
+        """
+        Key -> bytes store packed into one SQLite file, a drop-in replacement for LocalFileStore.
+
+        Values are kept in a table clustered on the key and the file is memory-mapped, so a bulk
+        mget is one indexed query instead of an open/read per key.
+
+        Args:
+            path: The SQLite database file; created if missing (unless read_only).
+            read_only: Open the file read-only, e.g. for API workers sharing it.
+        """
+        self.path = path
+        if read_only:
+            self.connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL) WITHOUT ROWID")
+            self.connection.commit()
+        self.connection.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        # One connection is shared by the retrieval threads
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def mget(self, keys):
+        values = {}
+        with self._lock:
+            for start in range(0, len(keys), MGET_BATCH):
+                batch = keys[start:start + MGET_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                values.update(self.connection.execute(f"SELECT key, value FROM entries WHERE key IN ({placeholders})", batch))
+        return [values.get(key) for key in keys]
+
+    def mset(self, key_value_pairs):
+        with self._lock, self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)", key_value_pairs)
+
+    def mdelete(self, keys):
+        with self._lock, self.connection:
+            self.connection.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+
+    def yield_keys(self, prefix=None):
+        with self._lock:
+            if prefix is None:
+                keys = [row[0] for row in self.connection.execute("SELECT key FROM entries ORDER BY key")]
+            else:
+                keys = [row[0] for row in self.connection.execute("SELECT key FROM entries WHERE substr(key, 1, ?) = ? ORDER BY key",
+                                                                  (len(prefix), prefix))]
+        yield from keys
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+def is_packed_docstore(path):
+    return os.path.isfile(path) or path.endswith(PACKED_DOCSTORE_SUFFIXES)
+
+
+def open_docstore(path, read_only=False):
+    """
+    Document store of a docstore path: a packed SQLite file (.sqlite/.db, or any existing file)
+    or a LocalFileStore directory. Both hold the same serialized Documents. A published
+    (symlinked) docstore is opened at its current version.
+    """
+    path = resolve_version(path)
+    if is_packed_docstore(path):
+        if read_only and not os.path.exists(path):
+            raise FileNotFoundError(f"Packed docstore {path} not found; create it with `python -m src.rag.packed_docstore --output {path}`")
+        return create_kv_docstore(PackedByteStore(path, read_only=read_only))
+    return create_kv_docstore(LocalFileStore(path))
+
+
+def default_docstore_path(packed_path=DEFAULT_DOCSTORE_PATH, legacy_path=LEGACY_DOCSTORE_PATH):
+    """
+    The packed docstore, unless only the LocalFileStore directory exists (the migration has
+    not been run yet), in which case the directory is used as before.
+    """
+    if not os.path.exists(packed_path) and os.path.isdir(legacy_path):
+        print(f"Warning: Using the docstore directory {legacy_path}; pack it with `python -m src.rag.packed_docstore` for faster loads")
+        return legacy_path
+    return packed_path
+
+
+def migrate_file_store(source_dir, output_path, batch_size=256):
+    """
+    Copy every entry of a LocalFileStore directory into a packed SQLite docstore.
+
+    The serialized Documents are copied as-is, so both stores return the same Documents. The
+    database is written to a new version of output_path and published once complete (see
+    artifact_versions).
+
+    Returns:
+        int: Number of entries copied.
+    """
+    source = LocalFileStore(source_dir)
+    keys = sorted(source.yield_keys())
+    with staged_version(output_path) as version:
+        target = PackedByteStore(version)
+        try:
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                target.mset([(key, value) for key, value in zip(batch, source.mget(batch)) if value is not None])
+        finally:
+            target.close()
+    return len(keys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack a LocalFileStore docstore directory into the single-file SQLite docstore.")
+    parser.add_argument('--source', type=str, default=LEGACY_DOCSTORE_PATH, help='LocalFileStore directory to migrate.')
+    parser.add_argument('--output', type=str, default=DEFAULT_DOCSTORE_PATH, help='SQLite file to write.')
+    args = parser.parse_args()
+    count = migrate_file_store(args.source, args.output)
+    print(f"Packed {count} documents from {args.source} into {args.output}")
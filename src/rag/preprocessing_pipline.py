@@ -1,13 +1,26 @@
 import re
 import nltk
-import pyarabic.araby as araby
 import stanza
+import threading
+import os
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from src.rag.arabic_normalization import normalize_arabic, collapse_whitespace
+from src.rag.citation_parser import parse_article_citations
 
+# Bump whenever clean_text output changes so cached corpora are re-processed
+PREPROCESSING_VERSION = "1"
 
-def setup_nlp_tools():
+
+def download_nlp_models():
     nltk.download('punkt')
     stanza.download('ar')  # Download Arabic models for Stanza
 
+
+def setup_nlp_tools():
+    download_nlp_models()
+
     # Initialize the Stanza pipeline during setup
     global _ar_nlp
     _ar_nlp = stanza.Pipeline('ar')
@@ -21,58 +34,147 @@ def get_ar_nlp():
         raise RuntimeError("Stanza pipeline is not initialized. Call setup_nlp_tools() first.")
     return _ar_nlp
 
+_setup_lock = threading.Lock()
+def ensure_nlp_tools():
+    """Initialize the Stanza pipeline on first use instead of at startup."""
+    if _ar_nlp is None:
+        with _setup_lock:
+            if _ar_nlp is None:
+                setup_nlp_tools()
+    return _ar_nlp
+
 def normalizeArabic(text):
-    text = text.strip()
-    text = re.sub("[إأٱآا]", "ا", text)
-    text = re.sub("ى", "ي", text)
-    text = re.sub("ؤ", "ء", text)
-    text = re.sub("ئ", "ء", text)
-    text = re.sub("ة", "ه", text)
-    noise = re.compile(""" ّ    | # Tashdid
-                             َ    | # Fatha
-                             ً    | # Tanwin Fath
-                             ُ    | # Damma
-                             ٌ    | # Tanwin Damm
-                             ِ    | # Kasra
-                             ٍ    | # Tanwin Kasr
-                             ْ    | # Sukun
-                             ـ     # Tatwil/Kashida
-                         """, re.VERBOSE)
-    text = re.sub(noise, '', text)
-    text = re.sub(r'(.)\1+', r"\1\1", text) # Remove longation
-    return araby.strip_tashkeel(text)
+    return normalize_arabic(text)
+
 
+def _join_lemmas(doc):
+    return ' '.join(word.lemma for sentence in doc.sentences for word in sentence.words)
 
 def lemmatize_text(text):
     nlp = get_ar_nlp()
     doc = nlp(text)
-    lemmas = [word.lemma for sentence in doc.sentences for word in sentence.words]
-    return ' '.join(lemmas)
+    return _join_lemmas(doc)
+
+def _count_token_lemmas(doc, lemma_counts):
+    # Stanza splits clitics into several words, so a surface token maps to all of their lemmas
+    for sentence in doc.sentences:
+        for token in sentence.tokens:
+            lemma_counts[(token.text, ' '.join(word.lemma for word in token.words))] += 1
+
+def lemmatize_texts(texts, batch_size=32, lemma_counts=None):
+    """
+    Lemmatize many texts, feeding Stanza multi-document batches instead of one call per text.
+
+    Each text is still its own stanza.Document, so the output matches lemmatize_text exactly.
+    If lemma_counts (a Counter) is given, (token, lemma) observations are added to it.
+    """
+    nlp = get_ar_nlp()
+    lemmatized = []
+    for start in range(0, len(texts), batch_size):
+        batch = [stanza.Document([], text=text) for text in texts[start:start + batch_size]]
+        for doc in nlp(batch):
+            lemmatized.append(_join_lemmas(doc))
+            if lemma_counts is not None:
+                _count_token_lemmas(doc, lemma_counts)
+    return lemmatized
+
+def _normalize_lemmatized(text):
+    # Remove Tashkeel
+    text = normalize_arabic(text)
+
+    # remove extra whitespace
+    return collapse_whitespace(text)
 
 def clean_text(text):
     # Lemmatizing
     text = lemmatize_text(text)
+    return _normalize_lemmatized(text)
 
-    # Remove Tashkeel
-    text = normalizeArabic(text)
+def _init_worker(torch_threads):
+    # Each worker owns a pipeline; models were already downloaded by the parent
+    import torch
+    torch.set_num_threads(torch_threads)
+    global _ar_nlp
+    _ar_nlp = stanza.Pipeline('ar', download_method=None)
 
-    # remove extra whitespace
-    text = re.sub('\s+', ' ', text)
-    return text
+def _clean_batch(texts, collect_lemmas=False):
+    lemma_counts = Counter() if collect_lemmas else None
+    lemmatized = lemmatize_texts(texts, batch_size=len(texts) or 1, lemma_counts=lemma_counts)
+    return [_normalize_lemmatized(text) for text in lemmatized], lemma_counts
+
+def clean_texts(texts, batch_size=32, workers=1, lemma_table=None):
+    """
+    Bulk version of clean_text.
+
+    Args:
+        texts: Iterable of raw texts.
+        batch_size: Number of documents passed to Stanza per call.
+        workers: Number of processes to fan the batches out to. 1 runs in-process.
+        lemma_table: Optional LemmaTable that records the word -> lemma pairs seen in the texts.
+
+    Returns:
+        list[str]: Cleaned texts in input order, identical to [clean_text(t) for t in texts].
+    """
+    texts = list(texts)
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+    collect_lemmas = [lemma_table is not None] * len(batches)
+    if workers > 1 and len(batches) > 1:
+        download_nlp_models()
+        torch_threads = max(1, (os.cpu_count() or 1) // workers)
+        # spawn, not fork: forking a process that already holds torch threads can deadlock
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches)),
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(torch_threads,)) as executor:
+            results = list(executor.map(_clean_batch, batches, collect_lemmas))
+    else:
+        ensure_nlp_tools()
+        results = [_clean_batch(batch, collect) for batch, collect in zip(batches, collect_lemmas)]
+
+    cleaned = []
+    for cleaned_batch, lemma_counts in results:
+        cleaned.extend(cleaned_batch)
+        if lemma_table is not None:
+            lemma_table.observe(lemma_counts)
+    return cleaned
+
+# Approximates Stanza's tokenizer: words (with any diacritics) and single punctuation marks
+_QUERY_TOKEN_RE = re.compile(r'[\w\u064B-\u0652\u0670\u0640]+|[^\w\s]')
+
+def clean_query(text, lemma_table):
+    """
+    Fast clean_text for queries: known words are lemmatized by a LemmaTable lookup and only
+    runs of out-of-vocabulary tokens go through the Stanza pipeline.
+
+    Args:
+        text: The raw query.
+        lemma_table: A LemmaTable built while the corpus was processed.
+
+    Returns:
+        str: The cleaned query, in the same form clean_text produces.
+    """
+    lemmas = []
+    oov_run = []
 
-def extract_article_lookup(prompt):
-    results = []
+    def flush_oov_run():
+        if oov_run:
+            nlp = ensure_nlp_tools()
+            lemmas.append(_join_lemmas(nlp(' '.join(oov_run))))
+            oov_run.clear()
 
-    # Pattern to match: المادة 12 و13 من قانون العمل
-    group_pattern = re.finditer(
-        r'(?:ال)?مادة\s*((?:\d+\s*(?:و|و\s*)?)*)\s*(?:من)?\s*قانون\s*(\w+)', prompt
-    )
+    for token in _QUERY_TOKEN_RE.findall(text):
+        lemma = lemma_table.lookup(token)
+        if lemma is None:
+            oov_run.append(token)
+        else:
+            flush_oov_run()
+            lemmas.append(lemma)
+    flush_oov_run()
 
-    for match in group_pattern:
-        article_numbers_str = match.group(1)  # e.g., "12 و13"
-        law_short = match.group(2)            # e.g., "العمل"
-        article_numbers = re.findall(r'\d+', article_numbers_str)
-        for num in article_numbers:
-            results.append((num, law_short))
+    return _normalize_lemmatized(' '.join(lemmas))
 
-    return results if results else None
\ No newline at end of file
+def extract_article_lookup(prompt, laws=None):
+    """
+    (article_number, law_short) pairs of the articles a prompt cites, or None (see
+    citation_parser.parse_article_citations).
+    """
+    return parse_article_citations(prompt, laws)
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import threading
+import torch
+from transformers import AutoTokenizer
+from src.rag.atomic_files import atomic_write
+from src.rag.inference_backends import load_sequence_classifier
+
+
+def plan_batches(lengths, max_batch_size=16, max_batch_tokens=2048):
+    """
+    Group pairs of similar token length into micro-batches.
+
+    Pairs are sorted by length and cut into consecutive batches so that no batch holds more
+    than max_batch_size pairs or more than max_batch_tokens tokens once padded to its longest
+    pair.
+
+    Args:
+        lengths: Token length of every pair.
+        max_batch_size: Maximum number of pairs per batch.
+        max_batch_tokens: Maximum padded size (pairs x longest pair) of a batch.
+
+    Returns:
+        list[list[int]]: Indices into lengths of every batch, shortest pairs first.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    batch = []
+    for i in order:
+        # Sorted ascending, so the pair being added is the longest of its batch
+        if batch and (len(batch) == max_batch_size or (len(batch) + 1) * lengths[i] > max_batch_tokens):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def truncate_longest_first(first, second, max_tokens):
+    """
+    Truncate a pair of token id lists to max_tokens in total, exactly like the "longest_first"
+    strategy of HuggingFace fast tokenizers: the shorter sequence keeps up to half the budget
+    and the longer one (the second on ties) gets the rest.
+    """
+    if len(first) + len(second) <= max_tokens:
+        return first, second
+    if len(first) > len(second):
+        n_second = min(len(second), max_tokens // 2)
+        return first[:max_tokens - n_second], second[:n_second]
+    n_first = min(len(first), max_tokens // 2)
+    return first[:n_first], second[:max_tokens - n_first]
+
+
+def padded_tokens(lengths, batches):
+    """
+    Number of tokens (real plus padding) the model processes for the given batches.
+    """
+    return sum(len(batch) * max(lengths[i] for i in batch) for batch in batches)
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name="BAAI/bge-reranker-v2-m3", max_length=512, max_batch_size=16, max_batch_tokens=2048,
+                 tokenizer=None, model=None, token_cache_path=None, backend="torch", onnx_cache_dir="data/onnx"):
+        """
+        Cross-encoder scoring of (query, text) pairs in length-bucketed micro-batches.
+
+        Texts are tokenized once and their token ids cached, so a pair is built from the cached
+        text ids and the freshly tokenized query under the model's pair template. Pairs are
+        sorted by token length and run in micro-batches padded only to their own longest pair,
+        and the scores are returned in the original order.
+
+        Args:
+            model_name: HuggingFace cross-encoder to load when no model is given.
+            max_length: Maximum tokens per pair; longer pairs are truncated.
+            max_batch_size: Maximum number of pairs per forward pass.
+            max_batch_tokens: Maximum padded tokens per forward pass.
+            tokenizer, model: Already loaded tokenizer and model to use instead.
+            token_cache_path: JSON file the text token ids are persisted to. None keeps them in memory only.
+            backend: Inference backend, "torch", "onnx" or "onnx-int8" (see inference_backends).
+            onnx_cache_dir: Directory the ONNX exports are stored in.
+        """
+        self.model_name = model_name
+        self.max_length = max_length
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.tokenizer = tokenizer or AutoTokenizer.from_pretrained(model_name)
+        self.backend = backend
+        self.model = load_sequence_classifier(model_name, backend, onnx_cache_dir, model=model,
+                                              input_names=self.tokenizer.model_input_names)
+        self.model.eval()  # Set the model to evaluation mode
+        self.real_tokens = 0
+        self.padded_tokens = 0
+        self._stats_lock = threading.Lock()
+        self.token_cache_path = token_cache_path
+        self.tokenizer_key = f"{self.tokenizer.name_or_path}:{len(self.tokenizer)}"
+        self.text_token_ids = {}
+        self._token_lock = threading.Lock()
+        self._token_cache_dirty = False
+        self._load_token_cache()
+
+    @staticmethod
+    def text_key(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _load_token_cache(self):
+        if not self.token_cache_path or not os.path.exists(self.token_cache_path):
+            return
+        try:
+            with open(self.token_cache_path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Ignoring unreadable reranker token cache {self.token_cache_path}: {e}")
+            return
+        if payload.get("tokenizer") == self.tokenizer_key:
+            self.text_token_ids = payload.get("entries", {})
+
+    def save_token_cache(self):
+        """
+        Atomically write the cached text token ids to disk if new texts were tokenized.
+        """
+        if not self.token_cache_path or not self._token_cache_dirty:
+            return
+        with self._token_lock:
+            with atomic_write(self.token_cache_path) as f:
+                entries = {key: ids if isinstance(ids, list) else ids.tolist() for key, ids in self.text_token_ids.items()}
+                json.dump({"tokenizer": self.tokenizer_key, "entries": entries}, f)
+            self._token_cache_dirty = False
+
+    def add_text_ids(self, texts, token_ids, tokenizer_key):
+        """
+        Use precomputed token ids (e.g. the memory-mapped ids of a corpus artifact) for the
+        given texts, if they were produced by this reranker's tokenizer.
+
+        Returns:
+            bool: Whether the ids were used.
+        """
+        if tokenizer_key != self.tokenizer_key:
+            return False
+        with self._token_lock:
+            self.text_token_ids.update(zip((self.text_key(text) for text in texts), token_ids))
+        return True
+
+    def prune_text_ids(self, texts):
+        """
+        Drop the cached token ids of every text but the given ones (e.g. of articles changed or
+        removed since they were tokenized); the token cache file is rewritten on the next save.
+
+        Returns:
+            int: Number of entries dropped.
+        """
+        keep = {self.text_key(text) for text in texts}
+        with self._token_lock:
+            stale = [key for key in self.text_token_ids if key not in keep]
+            for key in stale:
+                del self.text_token_ids[key]
+            if stale:
+                self._token_cache_dirty = True
+        return len(stale)
+
+    def text_ids(self, texts):
+        """
+        Token ids of every text without special tokens, tokenizing (in one batch) and caching
+        the texts not seen before.
+        """
+        keys = [self.text_key(text) for text in texts]
+        missing = {key: text for key, text in zip(keys, texts) if key not in self.text_token_ids}
+        if missing:
+            encodings = self.tokenizer(list(missing.values()), add_special_tokens=False)["input_ids"]
+            with self._token_lock:
+                self.text_token_ids.update(zip(missing, encodings))
+                self._token_cache_dirty = True
+        # Precomputed ids may be array views, the tokenizer's pair template needs lists
+        return [ids if isinstance(ids, list) else ids.tolist() for ids in (self.text_token_ids[key] for key in keys)]
+
+    def encode(self, query, texts):
+        """
+        Build the (query, text) pair features from the cached text ids without padding.
+
+        Returns:
+            list[dict]: The model input features of every pair.
+        """
+        query_ids = self.tokenizer(query, add_special_tokens=False)["input_ids"]
+        budget = self.max_length - self.tokenizer.num_special_tokens_to_add(pair=True)
+        with_token_types = "token_type_ids" in self.tokenizer.model_input_names
+        features = []
+        for ids in self.text_ids(texts):
+            first, second = truncate_longest_first(query_ids, ids, budget)
+            input_ids = self.tokenizer.build_inputs_with_special_tokens(first, second)
+            feature = {"input_ids": input_ids, "attention_mask": [1] * len(input_ids)}
+            if with_token_types:
+                feature["token_type_ids"] = self.tokenizer.create_token_type_ids_from_sequences(first, second)
+            features.append(feature)
+        return features
+
+    def score(self, query, texts):
+        """
+        Score every text against the query.
+
+        Args:
+            query: The query string.
+            texts: The texts to score.
+
+        Returns:
+            list[float]: The raw relevance logit of every text, in the order of texts.
+        """
+        if not texts:
+            return []
+        features = self.encode(query, texts)
+        return self.score_features(features)
+
+    def score_features(self, features):
+        lengths = [len(feature["input_ids"]) for feature in features]
+        batches = plan_batches(lengths, self.max_batch_size, self.max_batch_tokens)
+        scores = [0.0] * len(features)
+        with torch.no_grad():
+            for batch in batches:
+                inputs = self.tokenizer.pad([features[i] for i in batch], padding=True, return_tensors='pt')
+                logits = self.model(**inputs, return_dict=True).logits.view(-1).float()
+                for i, logit in zip(batch, logits.tolist()):
+                    scores[i] = logit
+        with self._stats_lock:
+            self.real_tokens += sum(lengths)
+            self.padded_tokens += padded_tokens(lengths, batches)
+        return scores
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "real_tokens": self.real_tokens,
+                "padded_tokens": self.padded_tokens,
+                "padding_ratio": 1 - self.real_tokens / self.padded_tokens if self.padded_tokens else 0.0,
+            }
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import random
+import argparse
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from src.rag.bm25_index import BM25Index
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def load_tokenized_corpus(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [item['page_content'].split() for item in json.load(f)]
+
+
+def load_queries(path, limit):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [sample['user_input'].split() for sample in json.load(f)[:limit]]
+
+
+def expand_corpus(corpus, scale, seed=0):
+    """
+    Grow the corpus to `scale` times its size. Copies beyond the originals are synthetic
+    articles mixing the tokens of two random articles, so term statistics stay realistic.
+    """
+    rng = random.Random(seed)
+    expanded = list(corpus)
+    for _ in range(len(corpus) * (scale - 1)):
+        first, second = rng.choice(corpus), rng.choice(corpus)
+        tokens = first + second
+        expanded.append(rng.sample(tokens, k=max(1, len(tokens) // 2)))
+    return expanded
+
+
+def top_k_agrees(reference_scores, expected_ids, actual_ids):
+    # Duplicated synthetic articles tie exactly, so compare the scores of the selected sets
+    return np.allclose(np.sort(reference_scores[expected_ids]), np.sort(reference_scores[actual_ids]), rtol=1e-5)
+
+
+def time_queries(search, queries):
+    start = time.perf_counter()
+    results = [search(query) for query in queries]
+    return (time.perf_counter() - start) / len(queries) * 1000, results
+
+
+def truncate_queries(queries, vocabulary, num_terms):
+    # The first num_terms distinct known tokens of every question, for keyword-style queries
+    if not num_terms:
+        return queries
+    truncated = []
+    for query in queries:
+        known = list(dict.fromkeys(token for token in query if token in vocabulary))
+        truncated.append(known[:num_terms])
+    return truncated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sparse BM25Index against rank_bm25 on expanded corpora.")
+    parser.add_argument('--corpus', type=str, default=os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"))
+    parser.add_argument('--queries', type=str, default=os.path.join(REPO_ROOT, "data/labour_law_evaluation/data_samples_mid.json"))
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help='Corpus size multipliers.')
+    parser.add_argument('--query_terms', type=int, nargs='+', default=[0],
+                        help='Query lengths in distinct terms to time (0 keeps the whole question).')
+    parser.add_argument('--num_queries', type=int, default=50)
+    parser.add_argument('--k', type=int, default=4)
+    parser.add_argument('--skip_reference', action='store_true', help='Skip rank_bm25, which gets very slow on large scales.')
+    args = parser.parse_args()
+
+    corpus = load_tokenized_corpus(args.corpus)
+    questions = load_queries(args.queries, args.num_queries)
+
+    print(f"{'scale':>5} {'docs':>8} {'terms':>5} | {'build rank_bm25':>15} {'build index':>11} | "
+          f"{'rank_bm25 ms/q':>14} {'exhaustive ms/q':>15} {'maxscore ms/q':>13} {'auto ms/q':>9} | "
+          f"{'top-k agree':>11} {'maxscore exact':>14}")
+    for scale in args.scales:
+        docs = expand_corpus(corpus, scale)
+
+        start = time.perf_counter()
+        index = BM25Index.from_tokenized(docs)
+        index_build = time.perf_counter() - start
+
+        reference = None
+        reference_build = float('nan')
+        if not args.skip_reference:
+            start = time.perf_counter()
+            reference = BM25Okapi(docs)
+            reference_build = time.perf_counter() - start
+
+        for num_terms in args.query_terms:
+            queries = truncate_queries(questions, index.vocabulary, num_terms)
+            exhaustive_ms, exhaustive_results = time_queries(lambda query: index.search(query, args.k, method="exhaustive"), queries)
+            maxscore_ms, maxscore_results = time_queries(lambda query: index.search(query, args.k, method="maxscore"), queries)
+            auto_ms, _ = time_queries(lambda query: index.search(query, args.k), queries)
+            # MaxScore must return the very same documents and scores as exhaustive scoring
+            exact = sum(np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1])
+                        for a, b in zip(exhaustive_results, maxscore_results)) / len(queries)
+
+            reference_ms = agree = float('nan')
+            if reference is not None:
+                reference_ms, reference_results = time_queries(
+                    lambda query: np.argsort(reference.get_scores(query))[::-1][:args.k], queries)
+                agree = sum(top_k_agrees(reference.get_scores(query), a, b[0])
+                            for query, a, b in zip(queries, reference_results, exhaustive_results)) / len(queries)
+
+            print(f"{scale:>5} {len(docs):>8} {num_terms or 'all':>5} | {reference_build:>14.2f}s {index_build:>10.2f}s | "
+                  f"{reference_ms:>14.2f} {exhaustive_ms:>15.3f} {maxscore_ms:>13.3f} {auto_ms:>9.3f} | "
+                  f"{agree:>11.0%} {exact:>14.0%}")
+
+
+if __name__ == "__main__":
+    main()
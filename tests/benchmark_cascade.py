@@ -0,0 +1,77 @@
+import os
+import json
+import time
+import argparse
+import torch
+
+from src.rag.reranker import CrossEncoderReranker
+from benchmark_reranker import load_retrieval_outputs
+from tiny_models import build_tiny_tokenizer, build_tiny_cross_encoder
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def ranked(scores):
+    return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+
+
+def run_cascade(stage, depth, small, large, query, texts):
+    """
+    Final ranking (candidate indices, best first) of one query under a cascade stage and depth.
+    """
+    if stage == "retrieval":
+        kept = list(range(min(depth, len(texts))))
+    else:
+        kept = ranked(small.score(query, texts))[:depth]
+    scores = large.score(query, [texts[i] for i in kept])
+    return [kept[i] for i in ranked(scores)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and ranking quality of the two-stage rerank cascade against full reranking.")
+    parser.add_argument('--documents', type=str, default=os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"))
+    parser.add_argument('--queries', type=str, default=os.path.join(REPO_ROOT, "data/labour_law_evaluation/data_samples_mid.json"))
+    parser.add_argument('--model', type=str, default="BAAI/bge-reranker-v2-m3", help='Large cross-encoder.')
+    parser.add_argument('--cascade_model', type=str, default="cross-encoder/mmarco-mMiniLMv2-L12-H384-v1", help='Small first-stage cross-encoder.')
+    parser.add_argument('--tiny', action='store_true', help='Use small randomly initialized cross-encoders (offline).')
+    parser.add_argument('--num_queries', type=int, default=30)
+    parser.add_argument('--candidates', type=int, default=8, help='Candidates per query before the cascade.')
+    parser.add_argument('--depths', type=int, nargs='+', default=[2, 3, 4, 6], help='Candidates kept for the large model.')
+    parser.add_argument('--top', type=int, default=3, help='Cutoff of the recall against the full ranking.')
+    args = parser.parse_args()
+
+    torch.set_num_threads(os.cpu_count())
+    outputs = load_retrieval_outputs(args.documents, args.queries, args.num_queries, args.candidates)
+    if args.tiny:
+        with open(args.documents, 'r', encoding='utf-8') as f:
+            tokenizer = build_tiny_tokenizer([item['page_content'] for item in json.load(f)], vocab_size=8000)
+        large = CrossEncoderReranker(tokenizer=tokenizer, model=build_tiny_cross_encoder(tokenizer, hidden_size=256, num_layers=4))
+        small = CrossEncoderReranker(tokenizer=tokenizer, model=build_tiny_cross_encoder(tokenizer, hidden_size=64, num_layers=1, seed=1))
+    else:
+        large = CrossEncoderReranker(args.model)
+        small = CrossEncoderReranker(args.cascade_model)
+    # Article token ids are precomputed at startup in the retriever, so they are not timed here
+    all_texts = [text for _, texts in outputs for text in texts]
+    large.text_ids(all_texts)
+    small.text_ids(all_texts)
+
+    start = time.perf_counter()
+    reference = [ranked(large.score(query, texts)) for query, texts in outputs]
+    full_ms = (time.perf_counter() - start) / len(outputs) * 1000
+
+    print(f"{len(outputs)} queries x {args.candidates} candidates, quality against the full large-model ranking")
+    print(f"{'stage':<14} {'depth':>5} {'ms/query':>9} {'saved':>7} {'top-1':>6} {'recall@' + str(args.top):>9}")
+    print(f"{'none':<14} {args.candidates:>5} {full_ms:>9.1f} {0.0:>7.1%} {1.0:>6.3f} {1.0:>9.3f}")
+    for stage in ("retrieval", "cross_encoder"):
+        for depth in args.depths:
+            start = time.perf_counter()
+            rankings = [run_cascade(stage, depth, small, large, query, texts) for query, texts in outputs]
+            ms = (time.perf_counter() - start) / len(outputs) * 1000
+            top1 = sum(ranking[0] == expected[0] for ranking, expected in zip(rankings, reference)) / len(outputs)
+            recall = sum(len(set(ranking[:args.top]) & set(expected[:args.top])) / min(args.top, len(expected))
+                         for ranking, expected in zip(rankings, reference)) / len(outputs)
+            print(f"{stage:<14} {depth:>5} {ms:>9.1f} {1 - ms / full_ms:>7.1%} {top1:>6.3f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import re
+import json
+import time
+import random
+import argparse
+from langchain.schema import Document
+
+from src.rag.article_graph import ArticleGraph
+from src.rag.citation_parser import parse_article_citations
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+TEMPLATES = [
+    "ما نص المادة {a} من قانون {law}؟",
+    "اذكر المادتين {a} و{b} من قانون {law}",
+    "ما هي المواد من {a} إلى {c} من قانون {law}؟",
+    "وفقاً للمادة {a} من قانون {law}، ما هي حقوق العامل؟",
+]
+
+
+def previous_lookup(prompt):
+    # The regex extract_article_lookup used before the citation parser
+    results = []
+    for match in re.finditer(r'(?:ال)?مادة\s*((?:\d+\s*(?:و|و\s*)?)*)\s*(?:من)?\s*قانون\s*(\w+)', prompt):
+        results.extend((num, match.group(2)) for num in re.findall(r'\d+', match.group(1)))
+    return results if results else None
+
+
+def citation_queries(graph, num_queries, seed=0):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(num_queries):
+        law, number = rng.choice(graph.keys)
+        a = int(number)
+        query = rng.choice(TEMPLATES).format(a=a, b=a + 1, c=a + 4, law=law)
+        if rng.random() < 0.3:
+            query = query.translate(str.maketrans("0123456789", "٠١٢٣٤٥٦٧٨٩"))
+        queries.append(query)
+    return queries
+
+
+def time_per_query(func, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [func(query) for query in queries]
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1e6, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of the citation fast path (parse + direct article fetch).")
+    parser.add_argument('--documents', type=str, default=os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"))
+    parser.add_argument('--num_queries', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.documents, 'r', encoding='utf-8') as f:
+        documents = [Document(page_content=item['page_content'], metadata=item['metadata']) for item in json.load(f)]
+    start = time.perf_counter()
+    graph = ArticleGraph(documents)
+    print(f"Built the article graph of {len(graph)} articles in {(time.perf_counter() - start) * 1000:.1f} ms")
+    laws = sorted({law for law, _ in graph.keys})
+    queries = citation_queries(graph, args.num_queries)
+
+    previous_us, previous = time_per_query(previous_lookup, queries, args.repeat)
+    parse_us, citations = time_per_query(lambda query: parse_article_citations(query, laws), queries, args.repeat)
+    keys = [[(law, number) for number, law in found or []] for found in citations]
+    print(f"{len(queries)} citation queries, {sum(found is not None for found in previous)} recognized by the previous regex, "
+          f"{sum(found is not None for found in citations)} by the citation parser")
+    print(f"{'step':<22} {'us/query':>9} {'context chars':>14}")
+    print(f"{'previous regex':<22} {previous_us:>9.1f} {'-':>14}")
+    print(f"{'citation parser':<22} {parse_us:>9.1f} {'-':>14}")
+    for hops in (0, 1):
+        fetch_us, contexts = time_per_query(lambda query_keys: graph.expand(query_keys, hops), keys, args.repeat)
+        chars = sum(len(text) for rows in contexts for row in rows for text in row) / len(contexts)
+        print(f"{'fetch, ' + str(hops) + ' link hops':<22} {fetch_us:>9.1f} {chars:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import io
+import os
+import json
+import contextlib
+import time
+import shutil
+import tempfile
+import argparse
+import tracemalloc
+
+from langchain.schema import Document
+from src.rag.article_graph import ArticleGraph
+from src.rag.bm25_index import corpus_fingerprint
+from collections import Counter
+from src.rag.corpus_artifact import CorpusArtifact, write_corpus_artifact
+from src.rag.corpus_cache import ProcessedCorpusCache
+from src.rag.hybrid_retrieval import HybridRetriever
+from src.rag.lemma_table import LemmaTable
+from src.rag.memory_report import resident_set_size
+from src.rag.preprocessing_pipline import PREPROCESSING_VERSION
+from src.rag.reranker import CrossEncoderReranker
+from tiny_models import build_tiny_tokenizer, build_tiny_cross_encoder, build_tiny_retriever
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def load_from_json(documents_path, cache_dir, reranker):
+    # The corpus part of HybridRetriever.__init__ before the artifact: JSON, processed cache
+    # lookups, Documents built twice, graph parsing and tokenization of every article
+    with open(documents_path, 'r', encoding='utf-8') as f:
+        documents = [Document(page_content=item['page_content'], metadata=item['metadata']) for item in json.load(f)]
+    retriever = HybridRetriever.__new__(HybridRetriever)
+    retriever.processed_cache = ProcessedCorpusCache(cache_dir)
+    retriever.lemma_table = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        processed = [Document(page_content=item['page_content'], metadata=item['metadata'])
+                     for item in retriever.process_dataset(documents)]
+        graph = ArticleGraph(documents)
+    version = corpus_fingerprint([doc.page_content for doc in documents])
+    reranker.text_ids([doc.metadata["original_text"] for doc in documents])
+    return documents, processed, graph, version, retriever.processed_cache
+
+
+def load_from_artifact(artifact_path, reranker):
+    artifact = CorpusArtifact.load(artifact_path)
+    documents, processed = artifact.documents()
+    graph = artifact.article_graph()
+    reranker.add_text_ids(artifact.raw_texts, artifact.text_token_ids(), artifact.meta["tokenizer"])
+    reranker.text_ids(artifact.raw_texts)
+    return documents, processed, graph, artifact.fingerprint, artifact
+
+
+def measure(load, make_reranker, repeats):
+    times = []
+    for _ in range(repeats):
+        reranker = make_reranker()
+        start = time.perf_counter()
+        load(reranker)
+        times.append(time.perf_counter() - start)
+    reranker = make_reranker()
+    tracemalloc.start()
+    result = load(reranker)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return sorted(times)[len(times) // 2] * 1000, retained / 2**20, peak / 2**20
+
+
+def measure_retriever(make_options, repeats):
+    """
+    Median startup time of a whole HybridRetriever, the heap it retains (tracemalloc) and the
+    heap and memory-mapped bytes of its corpus and article graph (memory_report).
+    """
+    times = []
+    for _ in range(repeats):
+        options = make_options()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            HybridRetriever(**options).close()
+        times.append(time.perf_counter() - start)
+    options = make_options()
+    rss = resident_set_size()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        retriever = HybridRetriever(**options)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    rss_growth = resident_set_size() - rss if rss is not None else 0
+    report = retriever.memory_report()
+    heap = sum(report[name]["heap_bytes"] for name in ("corpus", "article_graph"))
+    mapped = sum(report[name]["mapped_bytes"] for name in ("corpus", "article_graph"))
+    retriever.close()
+    return sorted(times)[len(times) // 2] * 1000, retained / 2**20, rss_growth / 2**20, heap / 2**20, mapped / 2**20
+
+
+def benchmark_retriever_startup(items, texts, tokenizer, model, tmp_dir, repeats):
+    # Tiny NumPy-backend retriever (fake embedder, tiny reranker) over the whole corpus, started
+    # from the JSON with a warm processed cache and lemma table, and from the artifact with an
+    # empty lemma table that the artifact fills
+    with contextlib.redirect_stdout(io.StringIO()):
+        base = build_tiny_retriever(os.path.join(tmp_dir, "retriever"), items,
+                                    reranker=CrossEncoderReranker(tokenizer=tokenizer, model=model))
+    base.close()
+    # Identity lemmas, standing in for the table Stanza fills
+    lemma_table = LemmaTable(os.path.join(tmp_dir, "retriever", "processed", f"lemma_table_v{PREPROCESSING_VERSION}.json"))
+    lemma_table.observe(Counter((token, token) for text in texts for token in text.split()))
+    lemma_table.save()
+    artifact_path = os.path.join(tmp_dir, "retriever-corpus")
+    with contextlib.redirect_stdout(io.StringIO()):
+        write_corpus_artifact(artifact_path, items, texts, tokenizer, lemma_table)
+
+    def make_options(documents, processed_cache_dir):
+        empty_dir = tempfile.mkdtemp(dir=tmp_dir)
+        return {
+            "documents": documents,
+            "embedding_model_name": "fake-embeddings",
+            "dense_backend": "numpy",
+            "docstore_path": base.docstore_path,
+            "dense_index_path": base.dense_index_path,
+            "sparse_index_path": None,
+            "processed_cache_dir": processed_cache_dir or empty_dir,
+            "query_lemma_lookup": True,
+            "retrieval_workers": 2,
+            "embeddings": base.embeddings,
+            "reranker": CrossEncoderReranker(tokenizer=tokenizer, model=model),
+        }
+
+    print(f"\nHybridRetriever startup ({len(items)} articles)")
+    print(f"{'source':<10} {'ms':>8} {'retained MB':>12} {'RSS MB':>8} {'corpus heap MB':>15} {'corpus mapped MB':>17}")
+    for name, documents, cache_dir in (("json", base.documents_path, os.path.join(tmp_dir, "retriever", "processed")),
+                                       ("artifact", artifact_path, None)):
+        results = measure_retriever(lambda: make_options(documents, cache_dir), repeats)
+        print(f"{name:<10} {results[0]:>8.1f} {results[1]:>12.2f} {results[2]:>8.2f} {results[3]:>15.2f} {results[4]:>17.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time and memory of loading the corpus from JSON against the compiled corpus artifact.")
+    parser.add_argument('--documents', type=str, default=os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"))
+    parser.add_argument('--repeats', type=int, default=7)
+    args = parser.parse_args()
+
+    with open(args.documents, 'r', encoding='utf-8') as f:
+        items = json.load(f)
+    texts = [item['page_content'] for item in items]
+    # Offline stand-ins: the raw texts as processed texts and a tokenizer trained on the corpus
+    tokenizer = build_tiny_tokenizer(texts, vocab_size=8000)
+    model = build_tiny_cross_encoder(tokenizer)
+
+    def make_reranker():
+        return CrossEncoderReranker(tokenizer=tokenizer, model=model)
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        cache = ProcessedCorpusCache(os.path.join(tmp_dir, "processed"))
+        for text in texts:
+            cache.put(text, text)
+        cache.save()
+        artifact_path = os.path.join(tmp_dir, "corpus")
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_corpus_artifact(artifact_path, items, texts, tokenizer)
+        size = sum(os.path.getsize(os.path.join(artifact_path, name)) for name in os.listdir(artifact_path))
+        print(f"{len(items)} articles: JSON {os.path.getsize(args.documents) / 2**20:.2f} MB, artifact {size / 2**20:.2f} MB")
+
+        print(f"{'source':<10} {'ms':>8} {'retained MB':>12} {'peak MB':>8}")
+        for name, load in (("json", lambda reranker: load_from_json(args.documents, cache.cache_dir, reranker)),
+                           ("artifact", lambda reranker: load_from_artifact(artifact_path, reranker))):
+            ms, retained, peak = measure(load, make_reranker, args.repeats)
+            print(f"{name:<10} {ms:>8.1f} {retained:>12.2f} {peak:>8.2f}")
+
+        benchmark_retriever_startup(items, texts, tokenizer, model, tmp_dir, args.repeats)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
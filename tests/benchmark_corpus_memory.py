@@ -0,0 +1,66 @@
+import io
+import os
+import json
+import contextlib
+import argparse
+
+from langchain.schema import Document
+from src.rag.article_graph import ArticleGraph
+from src.rag.bm25_index import BM25IndexRetriever
+from src.rag.corpus_store import CorpusStore
+from src.rag.memory_report import format_memory_report, memory_report
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def load_items(documents_path):
+    with open(documents_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def processed_text(text):
+    # Stand-in for the lemmatized text: a separate string of the same size
+    return text[::-1]
+
+
+def before_components(items, index_path):
+    # The corpus as HybridRetriever held it before the CorpusStore: the raw Documents (with
+    # original_text metadata), the processed Documents with their own copy of the metadata,
+    # the BM25 retriever's document list and the article graph
+    documents = [Document(page_content=item['page_content'], metadata=item['metadata']) for item in items]
+    for document in documents:
+        document.metadata['original_text'] = document.page_content
+    processed = [Document(page_content=processed_text(doc.page_content), metadata=doc.metadata) for doc in documents]
+    sparse = BM25IndexRetriever.from_documents(documents, index_path=index_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        graph = ArticleGraph(documents)
+    return [("corpus", None), ("raw_documents", sparse.docs), ("processed_documents", processed),
+            ("article_graph", graph), ("bm25_index", sparse.index)]
+
+
+def after_components(items, index_path):
+    documents = [Document(page_content=item['page_content'], metadata=item['metadata']) for item in items]
+    corpus = CorpusStore.from_documents(documents, [processed_text(doc.page_content) for doc in documents])
+    del documents
+    sparse = BM25IndexRetriever.from_documents(corpus.documents(), index_path=index_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        graph = ArticleGraph(sparse.docs)
+    return [("corpus", corpus), ("raw_documents", sparse.docs), ("processed_documents", corpus.documents(processed=True)),
+            ("article_graph", graph), ("bm25_index", sparse.index)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory of the in-memory corpus, before and after the CorpusStore.")
+    parser.add_argument('--documents', type=str, default=os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"))
+    parser.add_argument('--index_path', type=str, default=None, help='Prebuilt BM25 index to memory-map.')
+    args = parser.parse_args()
+
+    items = load_items(args.documents)
+    before = memory_report(before_components(load_items(args.documents), args.index_path))
+    after = memory_report(after_components(items, args.index_path))
+    print(f"{len(items)} articles")
+    print(format_memory_report(after, before=before))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import numpy as np
+
+from src.rag.dense_index import NumpyDenseIndex, normalize_rows
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def load_queries(path, limit):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [sample['user_input'] for sample in json.load(f)[:limit]]
+
+
+def synthetic_collection(client, num_chunks, dim, num_queries, seed=0):
+    """
+    Fill a Chroma collection with clustered random vectors (a few chunks per article, like the
+    parent/child split) and return perturbed chunk vectors as queries.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_chunks // 3 + 1, dim)).astype(np.float32)
+    vectors = centers[np.arange(num_chunks) // 3] + 0.5 * rng.standard_normal((num_chunks, dim)).astype(np.float32)
+    collection = client.get_or_create_collection("benchmark_collection")
+    for start in range(0, num_chunks, 1000):
+        end = min(start + 1000, num_chunks)
+        collection.add(ids=[f"chunk-{i}" for i in range(start, end)], embeddings=normalize_rows(vectors[start:end]).tolist(),
+                       documents=[f"chunk {i}" for i in range(start, end)],
+                       metadatas=[{"doc_id": f"article-{i // 3}"} for i in range(start, end)])
+    queries = vectors[rng.integers(0, num_chunks, num_queries)] + 0.5 * rng.standard_normal((num_queries, dim)).astype(np.float32)
+    return collection, normalize_rows(queries)
+
+
+def embed_queries(model_name, queries):
+    from sentence_transformers import SentenceTransformer
+    return normalize_rows(SentenceTransformer(model_name).encode(queries))
+
+
+def time_queries(search, query_vectors):
+    start = time.perf_counter()
+    results = [search(vector) for vector in query_vectors]
+    return (time.perf_counter() - start) / len(query_vectors) * 1000, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare latency and recall of the NumPy dense index against Chroma.")
+    parser.add_argument('--chromadb', type=str, default=os.path.join(REPO_ROOT, "data/chromadb-law"), help='Chroma persist directory.')
+    parser.add_argument('--collection', type=str, default="law_collection")
+    parser.add_argument('--model', type=str, default="intfloat/multilingual-e5-large", help='Model used to embed the evaluation queries.')
+    parser.add_argument('--queries', type=str, default=os.path.join(REPO_ROOT, "data/labour_law_evaluation/data_samples_mid.json"))
+    parser.add_argument('--synthetic', type=int, default=0, help='Benchmark a synthetic collection with this many chunks instead.')
+    parser.add_argument('--dim', type=int, default=1024, help='Embedding dimension of the synthetic collection.')
+    parser.add_argument('--num_queries', type=int, default=50)
+    parser.add_argument('--k', type=int, default=4)
+    args = parser.parse_args()
+
+    import chromadb
+    tmp_dir = None
+    if args.synthetic:
+        tmp_dir = tempfile.mkdtemp()
+        collection, query_vectors = synthetic_collection(chromadb.PersistentClient(path=tmp_dir), args.synthetic, args.dim, args.num_queries)
+    else:
+        collection = chromadb.PersistentClient(path=args.chromadb).get_collection(args.collection)
+        query_vectors = embed_queries(args.model, load_queries(args.queries, args.num_queries))
+
+    try:
+        start = time.perf_counter()
+        index = NumpyDenseIndex.from_chroma(collection)
+        print(f"Exported {len(index)} chunks of dimension {index.dim} in {time.perf_counter() - start:.2f}s")
+
+        # Same request LangChain's Chroma wrapper makes for a similarity search with scores
+        chroma_ms, chroma_results = time_queries(
+            lambda vector: collection.query(query_embeddings=[vector.tolist()], n_results=args.k,
+                                            include=["documents", "metadatas", "distances"])["ids"][0],
+            query_vectors)
+        numpy_ms, numpy_results = time_queries(lambda vector: index.search(vector, args.k)[0], query_vectors)
+
+        # The NumPy index is exact, so it is the reference for Chroma's approximate HNSW search
+        recall = np.mean([len(set(chroma_ids) & {index.ids[row] for row in rows}) / args.k
+                          for chroma_ids, rows in zip(chroma_results, numpy_results)])
+        print(f"{'backend':<8} {'ms/query':>9} {'recall@' + str(args.k):>9}")
+        print(f"{'chroma':<8} {chroma_ms:>9.3f} {recall:>9.3f}")
+        print(f"{'numpy':<8} {numpy_ms:>9.3f} {1.0:>9.3f}")
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+import time
+import random
+import shutil
+import tempfile
+import argparse
+
+from src.rag.caching import CachedDocstore
+from src.rag.packed_docstore import migrate_file_store, open_docstore
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def parent_requests(keys, num_queries, per_query, seed=0):
+    # Popular articles come back across questions, like the parents of frequently matched chunks
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(keys))]
+    return [rng.choices(keys, weights=weights, k=per_query) for _ in range(num_queries)]
+
+
+def time_per_query(store, requests):
+    start = time.perf_counter()
+    for keys in requests:
+        store.mget(keys)
+    return (time.perf_counter() - start) / len(requests) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parent document fetch latency of the LocalFileStore, the packed SQLite docstore and the cache.")
+    parser.add_argument('--docstore', type=str, default=os.path.join(REPO_ROOT, "data/docstore"), help='LocalFileStore directory.')
+    parser.add_argument('--num_queries', type=int, default=5000)
+    parser.add_argument('--per_query', type=int, default=4, help='Parents fetched per query (dense_k).')
+    parser.add_argument('--cache_size', type=int, default=1024)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        packed_path = os.path.join(tmp_dir, "docstore.sqlite")
+        start = time.perf_counter()
+        count = migrate_file_store(args.docstore, packed_path)
+        print(f"Migrated {count} documents in {(time.perf_counter() - start) * 1000:.1f} ms "
+              f"({sum(os.path.getsize(os.path.join(args.docstore, name)) for name in os.listdir(args.docstore)) / 2**20:.2f} MB "
+              f"in {count} files -> {os.path.getsize(packed_path) / 2**20:.2f} MB in one file)")
+        keys = sorted(os.listdir(args.docstore))
+        requests = parent_requests(keys, args.num_queries, args.per_query)
+
+        stores = {
+            "files": open_docstore(args.docstore),
+            "packed": open_docstore(packed_path, read_only=True),
+            "packed+cache": CachedDocstore(open_docstore(packed_path, read_only=True), args.cache_size),
+        }
+        print(f"{args.num_queries} queries x {args.per_query} parents")
+        print(f"{'store':<13} {'us/query':>9}")
+        for name, store in stores.items():
+            print(f"{name:<13} {time_per_query(store, requests):>9.1f}")
+        print(f"cache hit rate: {stores['packed+cache'].stats()['hit_rate']:.1%}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import numpy as np
+import torch
+
+from src.rag.inference_backends import INFERENCE_BACKENDS, load_embeddings
+from src.rag.reranker import CrossEncoderReranker
+from benchmark_reranker import load_retrieval_outputs
+from tiny_models import build_tiny_tokenizer, build_tiny_cross_encoder, build_tiny_sentence_transformer
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def time_per_query(func, items):
+    func(items[0])  # Warm-up, e.g. ONNX Runtime's first-run allocations
+    start = time.perf_counter()
+    results = [func(item) for item in items]
+    return (time.perf_counter() - start) / len(items) * 1000, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU latency and score parity of the reranker and query embedder per inference backend.")
+    parser.add_argument('--documents', type=str, default=os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"))
+    parser.add_argument('--queries', type=str, default=os.path.join(REPO_ROOT, "data/labour_law_evaluation/data_samples_mid.json"))
+    parser.add_argument('--reranker', type=str, default="BAAI/bge-reranker-v2-m3")
+    parser.add_argument('--embedding_model', type=str, default="intfloat/multilingual-e5-large")
+    parser.add_argument('--onnx_cache_dir', type=str, default=os.path.join(REPO_ROOT, "data/onnx"))
+    parser.add_argument('--tiny', action='store_true', help='Use small randomly initialized models (offline).')
+    parser.add_argument('--num_queries', type=int, default=30)
+    parser.add_argument('--candidates', type=int, default=8, help='Candidates reranked per query.')
+    parser.add_argument('--threads', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    outputs = load_retrieval_outputs(args.documents, args.queries, args.num_queries, args.candidates)
+    tmp_dir = None
+    tokenizer = cross_encoder = sentence_transformer = None
+    if args.tiny:
+        tmp_dir = tempfile.mkdtemp()
+        args.onnx_cache_dir = os.path.join(tmp_dir, "onnx")
+        with open(args.documents, 'r', encoding='utf-8') as f:
+            tokenizer = build_tiny_tokenizer([item['page_content'] for item in json.load(f)], vocab_size=8000)
+        cross_encoder = build_tiny_cross_encoder(tokenizer, hidden_size=256, num_layers=4, initializer_range=0.1)
+        sentence_transformer = build_tiny_sentence_transformer(tokenizer, os.path.join(tmp_dir, "tiny-embedder"),
+                                                               hidden_size=256, num_layers=4, initializer_range=0.1)
+
+    try:
+        print(f"{len(outputs)} queries x {args.candidates} candidates, {args.threads} threads")
+        print(f"{'model':<9} {'backend':<10} {'ms/query':>9} {'max |diff|':>11} {'top-1':>6}")
+        reference = None
+        for backend in INFERENCE_BACKENDS:
+            reranker = CrossEncoderReranker(args.reranker, tokenizer=tokenizer, model=cross_encoder, backend=backend,
+                                            onnx_cache_dir=args.onnx_cache_dir)
+            reranker.text_ids([text for _, texts in outputs for text in texts])
+            ms, scores = time_per_query(lambda output: np.array(reranker.score(*output)), outputs)
+            reference = reference or scores
+            max_diff = max(np.abs(a - b).max() for a, b in zip(scores, reference))
+            top1 = np.mean([a.argmax() == b.argmax() for a, b in zip(scores, reference)])
+            print(f"{'reranker':<9} {backend:<10} {ms:>9.1f} {max_diff:>11.2e} {top1:>6.3f}")
+
+        reference = None
+        queries = [query for query, _ in outputs]
+        for backend in INFERENCE_BACKENDS:
+            name = os.path.join(tmp_dir, "tiny-embedder") if args.tiny else args.embedding_model
+            if backend == "torch" and args.tiny:
+                embeddings = lambda query: sentence_transformer.encode([query])[0]
+            else:
+                model = load_embeddings(name, backend, args.onnx_cache_dir, sentence_transformer=sentence_transformer)
+                embeddings = lambda query, model=model: np.array(model.embed_query(query))
+            ms, vectors = time_per_query(embeddings, queries)
+            reference = reference or vectors
+            max_diff = max(np.abs(a - b).max() for a, b in zip(vectors, reference))
+            print(f"{'embedder':<9} {backend:<10} {ms:>9.1f} {max_diff:>11.2e} {'-':>6}")
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+from src.rag.dense_index import NumpyDenseIndex, normalize_rows
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def load_queries(path, limit):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [sample['user_input'] for sample in json.load(f)[:limit]]
+
+
+def synthetic_index(num_chunks, dim, num_queries, seed=0):
+    """
+    Clustered random vectors with a decaying spectrum, like sentence embeddings whose variance
+    concentrates in a few hundred directions, and perturbed chunk vectors as queries.
+    """
+    rng = np.random.default_rng(seed)
+    spectrum = (1.0 / np.sqrt(1.0 + np.arange(dim) / 16.0)).astype(np.float32)
+    basis, _ = np.linalg.qr(rng.standard_normal((dim, dim)))
+    centers = rng.standard_normal((num_chunks // 3 + 1, dim)).astype(np.float32) * spectrum
+    vectors = centers[np.arange(num_chunks) // 3] + 0.5 * spectrum * rng.standard_normal((num_chunks, dim)).astype(np.float32)
+    queries = vectors[rng.integers(0, num_chunks, num_queries)] + 0.5 * spectrum * rng.standard_normal((num_queries, dim)).astype(np.float32)
+    vectors, queries = vectors @ basis.T.astype(np.float32), queries @ basis.T.astype(np.float32)
+    index = NumpyDenseIndex.from_embeddings(vectors, [str(i) for i in range(num_chunks)], [str(i // 3) for i in range(num_chunks)])
+    return index, normalize_rows(queries)
+
+
+def embed_queries(model_name, queries):
+    from sentence_transformers import SentenceTransformer
+    return normalize_rows(SentenceTransformer(model_name).encode(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep the recall/latency trade-off of reduced-dimension dense indexes.")
+    parser.add_argument('--dense_index', type=str, default=os.path.join(REPO_ROOT, "data/dense-law"), help='Index exported with `python -m src.rag.dense_index`.')
+    parser.add_argument('--model', type=str, default="intfloat/multilingual-e5-large", help='Model used to embed the evaluation queries.')
+    parser.add_argument('--queries', type=str, default=os.path.join(REPO_ROOT, "data/labour_law_evaluation/data_samples_mid.json"))
+    parser.add_argument('--synthetic', type=int, default=0, help='Sweep a synthetic index with this many chunks instead.')
+    parser.add_argument('--dim', type=int, default=1024, help='Embedding dimension of the synthetic index.')
+    parser.add_argument('--dims', type=int, nargs='+', default=[64, 128, 256, 512], help='Reduced dimensions to sweep.')
+    parser.add_argument('--methods', type=str, nargs='+', default=["pca", "truncate"])
+    parser.add_argument('--num_queries', type=int, default=100)
+    parser.add_argument('--k', type=int, default=4)
+    parser.add_argument('--rescore_factor', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        index, query_vectors = synthetic_index(args.synthetic, args.dim, args.num_queries)
+    else:
+        index = NumpyDenseIndex.load(args.dense_index, mmap=False)
+        query_vectors = embed_queries(args.model, load_queries(args.queries, args.num_queries))
+    index.rescore_factor = args.rescore_factor
+
+    def run(reduced):
+        start = time.perf_counter()
+        results = [index.search(vector, args.k, reduced=reduced)[0] for vector in query_vectors]
+        return (time.perf_counter() - start) / len(query_vectors) * 1000, results
+
+    full_ms, exact = run(reduced=False)
+    exact = [set(rows.tolist()) for rows in exact]
+    print(f"{len(index)} chunks of dimension {index.dim}, {len(query_vectors)} queries, k={args.k}, rescore factor {args.rescore_factor}")
+    print(f"{'method':<9} {'dim':>5} {'rescore':>7} {'scan MB':>8} {'ms/query':>9} {'recall@' + str(args.k):>9}")
+    print(f"{'full':<9} {index.dim:>5} {'-':>7} {index.memory_footprint() / 2**20:>8.2f} {full_ms:>9.3f} {1.0:>9.3f}")
+    for method in args.methods:
+        for dim in args.dims:
+            index.add_projection(dim, method)
+            for rescore in (False, True):
+                index.rescore_reduced = rescore
+                ms, results = run(reduced=True)
+                recall = np.mean([len(set(rows.tolist()) & expected) / args.k for rows, expected in zip(results, exact)])
+                print(f"{method:<9} {dim:>5} {'yes' if rescore else 'no':>7} "
+                      f"{index.memory_footprint(reduced=True) / 2**20:>8.2f} {ms:>9.3f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
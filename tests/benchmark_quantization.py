@@ -0,0 +1,68 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+from src.rag.dense_index import NumpyDenseIndex, normalize_rows
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def load_queries(path, limit):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [sample['user_input'] for sample in json.load(f)[:limit]]
+
+
+def synthetic_index(num_chunks, dim, num_queries, seed=0):
+    """
+    Clustered random vectors (a few chunks per article, like the parent/child split) and
+    perturbed chunk vectors as queries.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_chunks // 3 + 1, dim)).astype(np.float32)
+    vectors = centers[np.arange(num_chunks) // 3] + 0.5 * rng.standard_normal((num_chunks, dim)).astype(np.float32)
+    index = NumpyDenseIndex.from_embeddings(vectors, [str(i) for i in range(num_chunks)], [str(i // 3) for i in range(num_chunks)])
+    queries = vectors[rng.integers(0, num_chunks, num_queries)] + 0.5 * rng.standard_normal((num_queries, dim)).astype(np.float32)
+    return index, normalize_rows(queries)
+
+
+def embed_queries(model_name, queries):
+    from sentence_transformers import SentenceTransformer
+    return normalize_rows(SentenceTransformer(model_name).encode(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory, latency and recall@k of the quantized dense index modes against the exact float32 scan.")
+    parser.add_argument('--dense_index', type=str, default=os.path.join(REPO_ROOT, "data/dense-law"), help='Index exported with `python -m src.rag.dense_index`.')
+    parser.add_argument('--model', type=str, default="intfloat/multilingual-e5-large", help='Model used to embed the evaluation queries.')
+    parser.add_argument('--queries', type=str, default=os.path.join(REPO_ROOT, "data/labour_law_evaluation/data_samples_mid.json"))
+    parser.add_argument('--synthetic', type=int, default=0, help='Benchmark a synthetic index with this many chunks instead.')
+    parser.add_argument('--dim', type=int, default=1024, help='Embedding dimension of the synthetic index.')
+    parser.add_argument('--num_queries', type=int, default=100)
+    parser.add_argument('--k', type=int, default=4)
+    parser.add_argument('--rescore_factors', type=int, nargs='+', default=[4, 10, 25])
+    args = parser.parse_args()
+
+    if args.synthetic:
+        index, query_vectors = synthetic_index(args.synthetic, args.dim, args.num_queries)
+    else:
+        index = NumpyDenseIndex.load(args.dense_index)
+        query_vectors = embed_queries(args.model, load_queries(args.queries, args.num_queries))
+    exact = [set(index.search(vector, args.k, quantization=None)[0].tolist()) for vector in query_vectors]
+
+    print(f"{len(index)} chunks of dimension {index.dim}, {len(query_vectors)} queries, k={args.k}")
+    print(f"{'mode':<8} {'rescore':>7} {'scan MB':>8} {'ms/query':>9} {'recall@' + str(args.k):>9}")
+    for quantization in (None, "int8", "binary"):
+        for rescore_factor in ([1] if quantization is None else args.rescore_factors):
+            index.rescore_factor = rescore_factor
+            start = time.perf_counter()
+            results = [index.search(vector, args.k, quantization=quantization)[0] for vector in query_vectors]
+            ms = (time.perf_counter() - start) / len(query_vectors) * 1000
+            recall = np.mean([len(set(rows.tolist()) & expected) / args.k for rows, expected in zip(results, exact)])
+            print(f"{quantization or 'float32':<8} {rescore_factor if quantization else '-':>7} "
+                  f"{index.memory_footprint(quantization) / 2**20:>8.2f} {ms:>9.3f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import argparse
+import torch
+from langchain.schema import Document
+
+from src.rag.bm25_index import BM25IndexRetriever
+from src.rag.reranker import CrossEncoderReranker
+from tiny_models import build_tiny_tokenizer, build_tiny_cross_encoder
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def load_retrieval_outputs(documents_path, queries_path, num_queries, num_candidates):
+    """
+    (query, candidate article texts) pairs as the sparse retriever returns them for the
+    evaluation questions.
+    """
+    with open(documents_path, 'r', encoding='utf-8') as f:
+        documents = json.load(f)
+    with open(queries_path, 'r', encoding='utf-8') as f:
+        queries = [sample['user_input'] for sample in json.load(f)[:num_queries]]
+    retriever = BM25IndexRetriever.from_documents(
+        [Document(page_content=item['page_content'], metadata=item['metadata']) for item in documents], k=num_candidates)
+    return [(query, [doc.page_content for doc in retriever.invoke(query)]) for query in queries]
+
+
+def single_batch_scores(reranker, query, texts):
+    # The previous rerank: one batch padded to the longest pair
+    inputs = reranker.tokenizer([[query, text] for text in texts], padding=True, truncation=True,
+                                return_tensors='pt', max_length=reranker.max_length)
+    with torch.no_grad():
+        scores = reranker.model(**inputs, return_dict=True).logits.view(-1).float()
+    return scores.tolist(), inputs["input_ids"].numel(), int(inputs["attention_mask"].sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-batch and length-bucketed micro-batched reranking on retrieval outputs.")
+    parser.add_argument('--documents', type=str, default=os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"))
+    parser.add_argument('--queries', type=str, default=os.path.join(REPO_ROOT, "data/labour_law_evaluation/data_samples_mid.json"))
+    parser.add_argument('--model', type=str, default="BAAI/bge-reranker-v2-m3")
+    parser.add_argument('--tiny', action='store_true', help='Use a small randomly initialized cross-encoder (offline).')
+    parser.add_argument('--num_queries', type=int, default=30)
+    parser.add_argument('--candidates', type=int, default=8, help='Candidates reranked per query.')
+    parser.add_argument('--max_batch_size', type=int, default=16)
+    parser.add_argument('--max_batch_tokens', type=int, default=2048)
+    args = parser.parse_args()
+
+    torch.set_num_threads(os.cpu_count())
+    outputs = load_retrieval_outputs(args.documents, args.queries, args.num_queries, args.candidates)
+    if args.tiny:
+        with open(args.documents, 'r', encoding='utf-8') as f:
+            tokenizer = build_tiny_tokenizer([item['page_content'] for item in json.load(f)], vocab_size=8000)
+        model = build_tiny_cross_encoder(tokenizer, hidden_size=256, num_layers=4)
+        reranker = CrossEncoderReranker(tokenizer=tokenizer, model=model, max_batch_size=args.max_batch_size,
+                                        max_batch_tokens=args.max_batch_tokens)
+    else:
+        reranker = CrossEncoderReranker(args.model, max_batch_size=args.max_batch_size, max_batch_tokens=args.max_batch_tokens)
+
+    # Tokenizer work alone: pairs tokenized from scratch vs cached article ids plus the query
+    start = time.perf_counter()
+    for query, texts in outputs:
+        reranker.tokenizer([[query, text] for text in texts], truncation=True, max_length=reranker.max_length)
+    pair_tokenize_ms = (time.perf_counter() - start) / len(outputs) * 1000
+    reranker.text_ids([text for _, texts in outputs for text in texts])
+    start = time.perf_counter()
+    for query, texts in outputs:
+        reranker.encode(query, texts)
+    cached_tokenize_ms = (time.perf_counter() - start) / len(outputs) * 1000
+
+    baseline_time = bucketed_time = 0.0
+    baseline_padded = real_tokens = 0
+    max_diff = 0.0
+    for query, texts in outputs:
+        start = time.perf_counter()
+        expected, padded, real = single_batch_scores(reranker, query, texts)
+        baseline_time += time.perf_counter() - start
+        baseline_padded += padded
+        real_tokens += real
+
+        start = time.perf_counter()
+        scores = reranker.score(query, texts)
+        bucketed_time += time.perf_counter() - start
+        max_diff = max(max_diff, max(abs(a - b) for a, b in zip(scores, expected)))
+
+    stats = reranker.stats()
+    print(f"{len(outputs)} queries x {args.candidates} candidates, {real_tokens} real tokens")
+    print(f"{'mode':<12} {'padded tokens':>13} {'padding':>8} {'ms/query':>9}")
+    print(f"{'single':<12} {baseline_padded:>13} {1 - real_tokens / baseline_padded:>8.1%} {baseline_time / len(outputs) * 1000:>9.1f}")
+    print(f"{'bucketed':<12} {stats['padded_tokens']:>13} {stats['padding_ratio']:>8.1%} {bucketed_time / len(outputs) * 1000:>9.1f}")
+    print(f"max |score difference|: {max_diff:.2e}")
+    print(f"tokenization ms/query: pairs {pair_tokenize_ms:.2f}, cached article ids {cached_tokenize_ms:.2f}")
+
+
+if __name__ == "__main__":
+    main()
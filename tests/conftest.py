@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the repository root importable so tests can import `src.*` and `data.*`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
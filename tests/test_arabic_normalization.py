@@ -0,0 +1,116 @@
+import os
+import re
+import json
+import time
+import argparse
+import pytest
+
+from src.rag.arabic_normalization import normalize_arabic, collapse_whitespace
+from data.data_preprocessing import clean_text as data_clean_text
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CORPUS_FILES = [
+    os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"),
+    os.path.join(REPO_ROOT, "data/merged_data/documents.json"),
+]
+
+
+# Reference implementations: the multi-pass versions the engine replaced
+def legacy_normalize_arabic(text, strip=True):
+    import pyarabic.araby as araby
+    if strip:
+        text = text.strip()
+    text = re.sub("[إأٱآا]", "ا", text)
+    text = re.sub("ى", "ي", text)
+    text = re.sub("ؤ", "ء", text)
+    text = re.sub("ئ", "ء", text)
+    text = re.sub("ة", "ه", text)
+    noise = re.compile(""" ّ    | # Tashdid
+                             َ    | # Fatha
+                             ً    | # Tanwin Fath
+                             ُ    | # Damma
+                             ٌ    | # Tanwin Damm
+                             ِ    | # Kasra
+                             ٍ    | # Tanwin Kasr
+                             ْ    | # Sukun
+                             ـ     # Tatwil/Kashida
+                         """, re.VERBOSE)
+    text = re.sub(noise, '', text)
+    text = re.sub(r'(.)\1+', r"\1\1", text)
+    return araby.strip_tashkeel(text)
+
+
+def legacy_clean_lemmatized(text):
+    return re.sub(r'\s+', ' ', legacy_normalize_arabic(text))
+
+
+def legacy_data_clean_text(text):
+    # data/data_preprocessing.clean_text collapsed whitespace first and never stripped
+    text = re.sub(r'^المادة \d+ من قانون العمل المصري:', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return legacy_normalize_arabic(text, strip=False)
+
+
+def load_corpus_texts():
+    texts = []
+    for path in CORPUS_FILES:
+        with open(path, 'r', encoding='utf-8') as f:
+            texts.extend(item['page_content'] for item in json.load(f))
+    return texts
+
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "ـــ",
+    "العـــاملين",
+    "قاااانون   العمل\n\n\nالمصري",
+    "  مُدَّةُ العَقْدِ  ",
+    "ؤئىةإأٱآ",
+    "aaa bb cccc",
+    "َ ََ ّ",
+]
+
+
+def test_normalize_arabic_matches_legacy_on_corpus():
+    pytest.importorskip("pyarabic")
+    for text in load_corpus_texts() + EDGE_CASES:
+        assert normalize_arabic(text) == legacy_normalize_arabic(text)
+        assert collapse_whitespace(normalize_arabic(text)) == legacy_clean_lemmatized(text)
+
+
+def test_data_clean_text_matches_legacy_on_corpus():
+    pytest.importorskip("pyarabic")
+    for text in load_corpus_texts() + EDGE_CASES:
+        assert data_clean_text(text) == legacy_data_clean_text(text)
+
+
+def benchmark(texts, repeat):
+    n_chars = sum(len(text) for text in texts) * repeat
+    candidates = [
+        ("legacy normalizeArabic", legacy_normalize_arabic),
+        ("normalize_arabic", normalize_arabic),
+        ("legacy data clean_text", legacy_data_clean_text),
+        ("data clean_text", data_clean_text),
+    ]
+    for name, func in candidates:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for text in texts:
+                func(text)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<24} {n_chars / elapsed / 1e6:8.2f} M chars/sec ({elapsed:.3f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark the Arabic normalization engine against the legacy regex passes.")
+    parser.add_argument('--repeat', type=int, default=5, help='Number of passes over the corpus.')
+    args = parser.parse_args()
+
+    texts = load_corpus_texts()
+    print(f"Corpus: {len(texts)} texts, {sum(len(t) for t in texts)} chars")
+    benchmark(texts, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
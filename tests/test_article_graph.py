@@ -0,0 +1,62 @@
+import os
+import json
+import pytest
+
+pytest.importorskip("langchain")
+from langchain.schema import Document
+from src.rag.article_graph import ArticleGraph, parse_linked_articles
+from tiny_models import REPO_ROOT
+
+
+def article(number, links, law="العمل"):
+    return Document(page_content=f"{law} {number}", metadata={"law_short": law, "article_number": str(number),
+                                                               "linked_articles": links, "original_text": f"نص {law} {number}"})
+
+
+@pytest.fixture
+def graph():
+    # 1 -> 2 -> 3 -> 1 is a cycle, 4 links to a missing article, and the same numbers repeat in another law
+    return ArticleGraph([
+        article(1, "[2]"), article(2, "[3, 3]"), article(3, "[1]"), article(4, "[99, 1]"),
+        article(1, "[2]", law="التعليم"), article(2, "[]", law="التعليم"), article(5, "[1, ", law="التعليم"),
+    ])
+
+
+def test_parse_linked_articles():
+    assert parse_linked_articles("[5, 12]") == [5, 12]
+    assert parse_linked_articles("[]") == []
+    assert parse_linked_articles(None) == []
+    assert parse_linked_articles("7") == [7]
+    with pytest.raises(ValueError):
+        parse_linked_articles("[5,")
+
+
+def test_links_stay_within_their_law(graph):
+    assert graph.linked_keys(("التعليم", "1")) == [("التعليم", "2")]
+    assert graph.linked_keys(("العمل", "1")) == [("العمل", "2")]
+
+
+def test_hop_limit_and_cycles(graph):
+    assert graph.linked_keys(("العمل", "1"), max_hops=2) == [("العمل", "2"), ("العمل", "3")]
+    assert graph.linked_keys(("العمل", "1"), max_hops=None) == [("العمل", "2"), ("العمل", "3")]
+    assert graph.linked_keys(("العمل", "4"), max_hops=0) == []
+
+
+def test_expand_deduplicates_across_rows(graph):
+    rows = graph.expand([("العمل", "1"), ("العمل", "2"), ("العمل", "4"), ("العمل", "3"), ("العمل", "404")])
+    assert rows == [["نص العمل 1", "نص العمل 2"], ["نص العمل 4"], ["نص العمل 3"]]
+
+
+def test_build_time_diagnostics(graph, capsys):
+    assert graph.missing_links == [(("العمل", "4"), ("العمل", "99"))]
+    assert [key for key, _ in graph.invalid_links] == [("التعليم", "5")]
+    graph.expand([("العمل", "4")])
+    assert capsys.readouterr().out == ""
+
+
+def test_corpus_graph():
+    with open(os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"), 'r', encoding='utf-8') as f:
+        documents = [Document(page_content=item['page_content'], metadata=item['metadata']) for item in json.load(f)]
+    graph = ArticleGraph(documents)
+    assert len(graph) == len(documents)
+    assert sum(len(neighbors) for neighbors in graph.neighbors) + len(graph.missing_links) > 200
@@ -0,0 +1,105 @@
+import os
+import threading
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+from src.rag.artifact_versions import lease_version, list_versions, migrate_legacy_path, new_version_path, publish_version, version_path
+from src.rag.bm25_index import BM25Index
+
+
+def corpus(size):
+    return [["عقد", "العمل", f"مادة{i}"] for i in range(size)]
+
+
+def test_save_publishes_versions_behind_a_symlink(tmp_path):
+    path = str(tmp_path / "bm25")
+    for size in (2, 3, 4):
+        BM25Index.from_tokenized(corpus(size)).save(path)
+    assert os.path.islink(path)
+    assert BM25Index.load(path).num_docs == 4
+    # Nobody leased the replaced versions
+    assert len(list_versions(path)) == 1
+
+
+def test_replaced_versions_are_removed_once_unleased(tmp_path):
+    path = str(tmp_path / "bm25")
+    BM25Index.from_tokenized(corpus(2)).save(path)
+    leased, lease = lease_version(path)
+    stale = new_version_path(path)  # e.g. left behind by a crashed writer
+    os.makedirs(stale)
+    BM25Index.from_tokenized(corpus(3)).save(path)
+    # The leased version is kept however many times the index is saved, the abandoned one is removed
+    BM25Index.from_tokenized(corpus(4)).save(path)
+    assert [os.path.realpath(version) for _, version in list_versions(path)] == [leased, os.path.realpath(path)]
+    assert not os.path.exists(stale)
+    assert BM25Index.load(leased).num_docs == 2
+
+    lease.release()
+    BM25Index.from_tokenized(corpus(5)).save(path)
+    current = os.path.basename(os.path.realpath(path))
+    # Lock files of removed versions are removed with them
+    assert sorted(os.listdir(tmp_path)) == ["bm25", "bm25.lock", current, f"{current}.lock"]
+
+
+def test_a_resolved_version_survives_the_next_publish(tmp_path):
+    path = str(tmp_path / "bm25")
+    BM25Index.from_tokenized(corpus(2)).save(path)
+    loaded = BM25Index.load(path)
+    BM25Index.from_tokenized(corpus(5)).save(path)
+    assert loaded.num_docs == 2 and loaded.search(["عقد"], 2)[0].tolist()
+    assert BM25Index.load(path).num_docs == 5
+
+
+def test_unversioned_paths_are_only_versioned_explicitly(tmp_path):
+    path = str(tmp_path / "bm25")
+    BM25Index.from_tokenized(corpus(2)).write(path)
+    # A plain directory (e.g. a tracked one) is never moved or replaced by a save
+    with pytest.raises(ValueError, match="--migrate"):
+        BM25Index.from_tokenized(corpus(3)).save(path)
+    assert not os.path.islink(path) and list_versions(path) == []
+    assert BM25Index.load(path).num_docs == 2
+
+    assert migrate_legacy_path(path) and not migrate_legacy_path(path)
+    assert os.path.islink(path) and BM25Index.load(version_path(path, 0)).num_docs == 2
+    BM25Index.from_tokenized(corpus(3)).save(path)
+    assert BM25Index.load(path).num_docs == 3
+
+    # Files keep their suffix, so a versioned docstore is still recognized as SQLite
+    file_path = str(tmp_path / "docstore.sqlite")
+    with open(file_path, 'w') as f:
+        f.write("old")
+    with pytest.raises(ValueError):
+        new_version_path(file_path)
+    migrate_legacy_path(file_path)
+    version = new_version_path(file_path)
+    assert version.endswith(".sqlite")
+    with open(version, 'w') as f:
+        f.write("new")
+    publish_version(file_path, version)
+    with open(file_path) as f:
+        assert f.read() == "new"
+
+
+def test_readers_never_see_a_missing_index(tmp_path):
+    path = str(tmp_path / "bm25")
+    BM25Index.from_tokenized(corpus(2)).save(path)
+    errors, done = [], threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                version, lease = lease_version(path)
+                BM25Index.load(version)
+                lease.release()
+            except Exception as e:
+                errors.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for size in range(3, 30):
+        BM25Index.from_tokenized(corpus(size)).save(path)
+    done.set()
+    reader.join()
+    assert errors == []
+    assert BM25Index.load(path).num_docs == 29
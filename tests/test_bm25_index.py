@@ -0,0 +1,121 @@
+import os
+import json
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+rank_bm25 = pytest.importorskip("rank_bm25")
+
+from src.rag.bm25_index import BM25Index
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def load_tokenized_corpus():
+    with open(os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"), 'r', encoding='utf-8') as f:
+        return [item['page_content'].split() for item in json.load(f)]
+
+
+def load_queries(limit=100):
+    with open(os.path.join(REPO_ROOT, "data/labour_law_evaluation/data_samples_mid.json"), 'r', encoding='utf-8') as f:
+        return [sample['user_input'].split() for sample in json.load(f)[:limit]]
+
+
+def test_scores_match_rank_bm25():
+    corpus = load_tokenized_corpus()
+    index = BM25Index.from_tokenized(corpus)
+    reference = rank_bm25.BM25Okapi(corpus)
+    for query in load_queries():
+        np.testing.assert_allclose(index.get_scores(query), reference.get_scores(query), rtol=1e-5, atol=1e-5)
+
+
+def test_top_k_matches_rank_bm25():
+    corpus = load_tokenized_corpus()
+    index = BM25Index.from_tokenized(corpus)
+    reference = rank_bm25.BM25Okapi(corpus)
+    for query in load_queries():
+        doc_ids, _ = index.search(query, 4)
+        expected = np.argsort(reference.get_scores(query))[::-1][:4]
+        assert set(doc_ids.tolist()) == set(expected.tolist())
+
+
+def test_unknown_query_returns_k_documents():
+    index = BM25Index.from_tokenized([["a", "b"], ["b", "c"], ["c", "d"]])
+    doc_ids, scores = index.search(["zzz"], 2)
+    assert doc_ids.tolist() == [0, 1]
+    assert scores.tolist() == [0.0, 0.0]
+
+
+def test_maxscore_matches_exhaustive():
+    import random
+    rng = random.Random(0)
+    corpus = load_tokenized_corpus()
+    # Mix article halves so the corpus is large enough for pruning to kick in
+    for _ in range(len(corpus) * 10):
+        tokens = rng.choice(corpus) + rng.choice(corpus)
+        corpus.append(rng.sample(tokens, k=max(1, len(tokens) // 2)))
+    index = BM25Index.from_tokenized(corpus)
+    for query in load_queries():
+        for k in (1, 4, 10):
+            expected = index.search(query, k, method="exhaustive")
+            actual = index.search(query, k, method="maxscore")
+            np.testing.assert_array_equal(actual[0], expected[0])
+            np.testing.assert_array_equal(actual[1], expected[1])
+
+
+def test_auto_uses_maxscore_for_short_queries_on_large_corpora(monkeypatch):
+    import src.rag.bm25_index
+    index = BM25Index.from_tokenized(load_tokenized_corpus())
+    calls = []
+    search_maxscore = index._search_maxscore
+    monkeypatch.setattr(index, "_search_maxscore", lambda *args: calls.append(len(args[0])) or search_maxscore(*args))
+    query = list(dict.fromkeys(token for token in load_queries()[0] if token in index.vocabulary))
+    assert len(query) > src.rag.bm25_index.MAXSCORE_MAX_TERMS
+
+    index.search(query[:2], 4)
+    assert calls == []  # the corpus is below MAXSCORE_MIN_DOCS
+    monkeypatch.setattr(src.rag.bm25_index, "MAXSCORE_MIN_DOCS", index.num_docs)
+    index.search(query, 4)
+    assert calls == []  # too many terms
+    doc_ids, scores = index.search(query[:2], 4)
+    assert calls == [2]
+    expected = index.search(query[:2], 4, method="exhaustive")
+    np.testing.assert_array_equal(doc_ids, expected[0])
+    np.testing.assert_array_equal(scores, expected[1])
+
+
+def is_memory_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+def test_saved_index_is_memory_mapped_and_equivalent(tmp_path):
+    corpus = load_tokenized_corpus()
+    index = BM25Index.from_tokenized(corpus)
+    index.save(str(tmp_path / "bm25"))
+    loaded = BM25Index.load(str(tmp_path / "bm25"))
+    for array in (loaded.matrix.data, loaded.matrix.indices, loaded.matrix.indptr):
+        assert is_memory_mapped(array)
+    for query in load_queries(20):
+        np.testing.assert_array_equal(loaded.get_scores(query), index.get_scores(query))
+
+
+def test_with_changes_matches_rebuild(tmp_path):
+    corpus = load_tokenized_corpus()[:200]
+    index = BM25Index.from_tokenized(corpus)
+    index.save(str(tmp_path / "index"))
+    loaded = BM25Index.load(str(tmp_path / "index"))
+    replaced = {3: ["كلمه", "جديده"] + corpus[3][:5], 10: corpus[11]}
+    removed = {0, 7, 150}
+    appended = [["نص", "مضاف", "جديد"], corpus[20]]
+
+    updated = loaded.with_changes(replaced=replaced, removed=removed, appended=appended)
+    expected_corpus = [replaced.get(i, tokens) for i, tokens in enumerate(corpus) if i not in removed] + appended
+    expected = BM25Index.from_tokenized(expected_corpus)
+    assert dict(updated.vocabulary.items()) == expected.vocabulary
+    assert updated.doc_len.tolist() == expected.doc_len.tolist()
+    for query in load_queries(30) + [["كلمه", "مضاف"]]:
+        np.testing.assert_allclose(updated.get_scores(query), expected.get_scores(query), rtol=1e-6, atol=1e-6)
@@ -0,0 +1,86 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+from src.rag.caching import LRUCache, CachedEmbeddings
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+
+def test_cached_embeddings_skip_repeated_queries():
+    model = CountingEmbeddings()
+    embeddings = CachedEmbeddings(model, "model-a")
+    assert embeddings.embed_query("عقد العمل") == embeddings.embed_query("عقد العمل")
+    assert model.calls == 1
+    assert embeddings.stats()["hit_rate"] == 0.5
+
+
+def test_cached_embeddings_persist_per_model(tmp_path):
+    path = str(tmp_path / "query_embeddings.json")
+    first = CachedEmbeddings(CountingEmbeddings(), "model-a", path=path)
+    first.embed_query("اجازه")
+    first.save()
+
+    model = CountingEmbeddings()
+    CachedEmbeddings(model, "model-a", path=path).embed_query("اجازه")
+    assert model.calls == 0
+    CachedEmbeddings(model, "model-b", path=path).embed_query("اجازه")
+    assert model.calls == 1
+
+
+def test_persistent_caches_are_saved_at_exit_without_being_kept_alive(tmp_path):
+    import gc
+    import weakref
+    import src.rag.caching as caching
+
+    path = str(tmp_path / "query_embeddings.json")
+    embeddings = CachedEmbeddings(CountingEmbeddings(), "model-a", path=path)
+    embeddings.embed_query("اجازه")
+    caching._save_persistent_embeddings()
+    model = CountingEmbeddings()
+    CachedEmbeddings(model, "model-a", path=path).embed_query("اجازه")
+    assert model.calls == 0
+
+    reference = weakref.ref(embeddings)
+    del embeddings
+    gc.collect()
+    assert reference() is None
+
+
+def test_released_caches_save_their_new_entries(tmp_path):
+    import gc
+
+    path = str(tmp_path / "query_embeddings.json")
+    embeddings = CachedEmbeddings(CountingEmbeddings(), "model-a", path=path)
+    embeddings.embed_query("اجازه")
+    embeddings.close()
+    model = CountingEmbeddings()
+    CachedEmbeddings(model, "model-a", path=path).embed_query("اجازه")
+    assert model.calls == 0
+
+    embeddings = CachedEmbeddings(CountingEmbeddings(), "model-a", path=path)
+    embeddings.embed_query("عقد العمل")
+    del embeddings
+    gc.collect()
+    CachedEmbeddings(model, "model-a", path=path).embed_query("عقد العمل")
+    assert model.calls == 0
@@ -0,0 +1,54 @@
+import pytest
+
+from src.rag.citation_parser import parse_article_citations
+
+LAWS = ["العمل", "التعليم"]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("المادة 12 و13 من قانون العمل", [("12", "العمل"), ("13", "العمل")]),
+    ("اذكر المادتين ١٢ و ١٣ من قانون العمل", [("12", "العمل"), ("13", "العمل")]),
+    ("ما نص المادة ۴۵ من قانون العمل المصري؟", [("45", "العمل")]),
+    ("ما هي المواد من 10 إلى 13 من قانون التعليم؟", [(str(n), "التعليم") for n in range(10, 14)]),
+    ("المواد ٣-٥ بقانون العمل", [("3", "العمل"), ("4", "العمل"), ("5", "العمل")]),
+    ("المواد 1، 2 و 7 من قانون التعليم", [("1", "التعليم"), ("2", "التعليم"), ("7", "التعليم")]),
+    ("وفقاً للمادة 5 من قانون العمل والمادة 3 من قانون التعليم", [("5", "العمل"), ("3", "التعليم")]),
+    ("في قانون العمل، ما نص المادة رقم 7؟", [("7", "العمل")]),
+])
+def test_citations(query, expected):
+    assert parse_article_citations(query, LAWS) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "ما هي مدة الإجازة السنوية؟",
+    "ما نص المادة 5؟",
+    "المادة 5 من قانون الضرائب",
+    "ما نص المادة 5 في كل من قانون العمل وقانون التعليم؟",
+])
+def test_no_citation(query):
+    assert parse_article_citations(query, LAWS) is None
+
+
+def test_ranges_are_bounded_and_deduplicated():
+    citations = parse_article_citations("المواد من 1 إلى 1000 والمادة 3 من قانون العمل", LAWS, max_range=20)
+    assert [number for number, _ in citations] == [str(n) for n in range(1, 21)]
+
+
+def test_any_law_without_corpus_laws():
+    assert parse_article_citations("المادة 12 من قانون المرور") == [("12", "المرور")]
+
+
+def test_cited_articles_come_with_their_linked_articles(tmp_path):
+    pytest.importorskip("torch")
+    pytest.importorskip("langchain")
+    from tiny_models import load_article_texts, build_tiny_retriever
+
+    texts = load_article_texts(3)
+    items = [{"page_content": text, "metadata": {"law_short": "العمل", "article_number": str(i + 1),
+                                                 "linked_articles": "[3]" if i == 0 else "[]"}}
+             for i, text in enumerate(texts)]
+    retriever = build_tiny_retriever(tmp_path, items)
+    assert retriever.retrieve_documents("ما نص المادة 1 من قانون العمل؟") == [[texts[0], texts[2]]]
+    retriever.citation_link_hops = 0
+    assert retriever.retrieve_documents("ما نص المادة 1 من قانون العمل؟") == [[texts[0]]]
+    retriever.close()
@@ -0,0 +1,81 @@
+import json
+import os
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("langchain")
+from langchain.schema import Document
+from src.rag.article_graph import ArticleGraph
+from src.rag.corpus_artifact import CorpusArtifact, StringColumn, write_corpus_artifact
+from src.rag.memory_report import deep_sizeof
+from src.rag.reranker import CrossEncoderReranker
+from tiny_models import REPO_ROOT, build_tiny_tokenizer, build_tiny_cross_encoder
+
+
+def load_items():
+    with open(os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_artifact_round_trip(tmp_path):
+    items = load_items()
+    processed_texts = [f"processed {i}" for i in range(len(items))]
+    tokenizer = build_tiny_tokenizer([item['page_content'] for item in items])
+    write_corpus_artifact(str(tmp_path / "corpus"), items, processed_texts, tokenizer)
+    artifact = CorpusArtifact.load(str(tmp_path / "corpus"))
+    assert len(artifact) == len(items)
+
+    raw_documents, processed_documents = artifact.documents()
+    for item, raw, processed, processed_text in zip(items, raw_documents, processed_documents, processed_texts):
+        assert raw.page_content == item['page_content']
+        assert raw.metadata == dict(item['metadata'], original_text=item['page_content'])
+        assert processed.page_content == processed_text
+        assert processed.metadata is raw.metadata
+
+    # The texts are decoded per access from the memory-mapped blob, not held on the heap
+    assert isinstance(artifact.raw_texts, StringColumn) and isinstance(artifact.raw_texts.blob, np.memmap)
+    assert artifact.raw_texts[-1] == items[-1]['page_content']
+    assert artifact.processed_texts[1:3] == processed_texts[1:3]
+    assert list(artifact.raw_texts.take([2, 0])) == [items[2]['page_content'], items[0]['page_content']]
+    heap, mapped = deep_sizeof(artifact.raw_texts)
+    assert mapped >= sum(len(item['page_content'].encode('utf-8')) for item in items) > heap
+
+    token_ids = tokenizer([item['page_content'] for item in items], add_special_tokens=False)["input_ids"]
+    assert [ids.tolist() for ids in artifact.text_token_ids()] == token_ids
+
+
+def test_artifact_graph_matches_parsed_graph(tmp_path):
+    items = load_items()
+    write_corpus_artifact(str(tmp_path / "corpus"), items, [item['page_content'] for item in items])
+    artifact = CorpusArtifact.load(str(tmp_path / "corpus"))
+    assert artifact.text_token_ids() is None
+
+    documents = [Document(page_content=item['page_content'], metadata=item['metadata']) for item in items]
+    expected = ArticleGraph(documents)
+    graph = artifact.article_graph()
+    assert graph.keys == expected.keys
+    assert graph.neighbors == expected.neighbors
+    for max_hops in (1, 2, None):
+        assert graph.expand(expected.keys, max_hops) == expected.expand(expected.keys, max_hops)
+
+
+def test_reranker_uses_precomputed_token_ids(tmp_path):
+    items = load_items()[:20]
+    texts = [item['page_content'] for item in items]
+    tokenizer = build_tiny_tokenizer(texts)
+    write_corpus_artifact(str(tmp_path / "corpus"), items, texts, tokenizer)
+    artifact = CorpusArtifact.load(str(tmp_path / "corpus"))
+
+    model = build_tiny_cross_encoder(tokenizer, initializer_range=0.3)
+    primed = CrossEncoderReranker(tokenizer=tokenizer, model=model, token_cache_path=str(tmp_path / "tokens.json"))
+    assert primed.add_text_ids(texts, artifact.text_token_ids(), artifact.meta["tokenizer"])
+    assert not primed.add_text_ids(texts, artifact.text_token_ids(), "another-tokenizer:10")
+    reference = CrossEncoderReranker(tokenizer=tokenizer, model=model)
+    assert primed.score("ما هي مدة الإجازة السنوية؟", texts[:8]) == reference.score("ما هي مدة الإجازة السنوية؟", texts[:8])
+
+    # A new text is tokenized and the cache, array views included, can still be saved
+    primed.text_ids(["نص جديد"])
+    primed.save_token_cache()
+    with open(tmp_path / "tokens.json", 'r', encoding='utf-8') as f:
+        assert len(json.load(f)["entries"]) == 21
@@ -0,0 +1,82 @@
+import json
+import os
+from collections import Counter
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("langchain")
+import src.rag.hybrid_retrieval
+import src.rag.preprocessing_pipline
+from src.rag.corpus_artifact import build_corpus_artifact
+from src.rag.corpus_cache import ProcessedCorpusCache
+from src.rag.lemma_table import LemmaTable
+from src.rag.preprocessing_pipline import PREPROCESSING_VERSION
+from tiny_models import load_article_texts, build_tiny_retriever
+
+
+def article(number, text):
+    return {"page_content": text, "metadata": {"law_short": "العمل", "article_number": str(number), "linked_articles": "[]"}}
+
+
+def no_stanza(texts, *args, **kwargs):
+    raise AssertionError(f"Stanza ran on {len(texts)} cached articles")
+
+
+def test_warm_start_skips_stanza_and_prunes_the_cache(tmp_path, monkeypatch):
+    texts = load_article_texts(6)
+    items = [article(i + 1, text) for i, text in enumerate(texts[:4])]
+    cache = ProcessedCorpusCache(str(tmp_path / "processed"))
+    cache.put("removed article", "removed")
+    cache.save()
+
+    monkeypatch.setattr(src.rag.hybrid_retrieval, "clean_texts", no_stanza)
+    retriever = build_tiny_retriever(tmp_path, items)
+    assert [doc.page_content for doc in retriever.documents] == texts[:4]
+    # Only the live articles are left on disk
+    assert sorted(ProcessedCorpusCache(str(tmp_path / "processed")).entries) == sorted(cache.make_key(text) for text in texts[:4])
+
+    # An update only lemmatizes the changed article, and drops the entry of its old text
+    calls = []
+    monkeypatch.setattr(src.rag.hybrid_retrieval, "clean_texts",
+                        lambda batch, **kwargs: calls.append(list(batch)) or [text.upper() for text in batch])
+    retriever.upsert_articles([article(2, texts[4])], persist=False)
+    assert calls == [[texts[4]]]
+    on_disk = ProcessedCorpusCache(str(tmp_path / "processed"))
+    assert on_disk.get(texts[4]) == texts[4].upper()
+    assert on_disk.get(texts[1]) is None
+    assert len(on_disk.entries) == 4
+
+
+def test_build_corpus_artifact_prunes_the_cache(tmp_path, monkeypatch):
+    texts = load_article_texts(3)
+    documents_path = str(tmp_path / "articles.json")
+    with open(documents_path, 'w', encoding='utf-8') as f:
+        json.dump([article(i + 1, text) for i, text in enumerate(texts)], f, ensure_ascii=False)
+    cache = ProcessedCorpusCache(str(tmp_path / "processed"))
+    for text in texts + ["removed article"]:
+        cache.put(text, text)
+    cache.save()
+    # A non-empty query lemma table, which the build would otherwise fill by lemmatizing
+    lemma_table = LemmaTable(str(tmp_path / "processed" / f"lemma_table_v{PREPROCESSING_VERSION}.json"))
+    lemma_table.observe(Counter({("العمل", "عمل"): 1}))
+    lemma_table.save()
+
+    monkeypatch.setattr(src.rag.preprocessing_pipline, "clean_texts", no_stanza)
+    build_corpus_artifact(documents_path, str(tmp_path / "corpus"), str(tmp_path / "processed"))
+    assert os.path.isdir(tmp_path / "corpus")
+    assert sorted(ProcessedCorpusCache(str(tmp_path / "processed")).entries) == sorted(cache.make_key(text) for text in texts)
+
+
+def test_concurrent_saves_leave_one_complete_cache(tmp_path):
+    import threading
+    caches = [ProcessedCorpusCache(str(tmp_path / "processed")) for _ in range(8)]
+    for i, cache in enumerate(caches):
+        cache.put(f"text {i}", f"processed {i}" * 1000)
+    threads = [threading.Thread(target=cache.save) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert os.listdir(tmp_path / "processed") == [f"processed_v{PREPROCESSING_VERSION}.json"]
+    assert len(ProcessedCorpusCache(str(tmp_path / "processed")).entries) == 1
@@ -0,0 +1,60 @@
+import json
+import os
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("langchain")
+from langchain.schema import Document
+from src.rag.article_graph import ArticleGraph
+from src.rag.corpus_store import CorpusStore
+from tiny_models import REPO_ROOT
+
+
+def load_documents():
+    with open(os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"), 'r', encoding='utf-8') as f:
+        return [Document(page_content=item['page_content'], metadata=item['metadata']) for item in json.load(f)]
+
+
+def test_corpus_store_round_trip():
+    documents = load_documents()
+    processed_texts = [f"processed {i}" for i in range(len(documents))]
+    corpus = CorpusStore.from_documents(documents, processed_texts)
+    assert len(corpus) == len(documents)
+
+    raw, processed = corpus.documents(), corpus.documents(processed=True)
+    for row, document in enumerate(documents):
+        assert raw[row].page_content == document.page_content
+        assert raw[row].metadata == dict(document.metadata, original_text=document.page_content)
+        assert processed[row].page_content == processed_texts[row]
+        assert processed[row].metadata == raw[row].metadata
+        assert corpus.key(row) == (document.metadata["law_short"], str(document.metadata["article_number"]))
+    # The graph built from the store matches the one built from the Documents
+    assert ArticleGraph(raw).neighbors == ArticleGraph(documents).neighbors
+
+
+def test_corpus_store_interns_metadata():
+    documents = [
+        Document(page_content="a", metadata={"law": "".join(["Labor ", "Law"]), "article_number": 1, "original_text": "a"}),
+        Document(page_content="b", metadata={"law": "".join(["Labor ", "Law"]), "article_number": 1.0, "original_text": "b"}),
+        Document(page_content="c", metadata={"article_number": [3], "original_text": "c"}),
+    ]
+    corpus = CorpusStore.from_documents(documents)
+    assert corpus.fields == ["article_number", "law"]
+    assert corpus.value(0, "law") is corpus.value(1, "law")
+    # 1 and 1.0 are distinct values, and missing fields stay missing
+    assert type(corpus.value(1, "article_number")) is float
+    assert corpus.value(2, "article_number") == [3]
+    assert "law" not in corpus.metadata(2)
+    assert corpus.metadata(1)["original_text"] is corpus.raw_texts[1]
+
+
+def test_document_view_sequence():
+    documents = [Document(page_content=text, metadata={"original_text": text}) for text in "abc"]
+    view = CorpusStore.from_documents(documents).documents()
+    assert len(view) == 3
+    assert view[-1].page_content == "c"
+    assert [doc.page_content for doc in view[1:]] == ["b", "c"]
+    assert [doc.page_content for doc in view] == ["a", "b", "c"]
+    with pytest.raises(IndexError):
+        view[3]
+
@@ -0,0 +1,107 @@
+import json
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("langchain")
+from langchain.schema import Document
+from src.rag.bm25_index import BM25Index, BM25IndexRetriever, corpus_fingerprint
+from src.rag.corpus_artifact import CorpusArtifact, write_corpus_artifact
+from src.rag.dense_index import NumpyDenseIndex
+from src.rag.reranker import CrossEncoderReranker
+from tiny_models import load_article_texts, build_tiny_tokenizer, build_tiny_cross_encoder, build_tiny_retriever
+
+
+def article(number, text, linked="[]"):
+    return {"page_content": text, "metadata": {"law_short": "العمل", "article_number": str(number), "linked_articles": linked}}
+
+
+def make_retriever(tmp_path, items, **kwargs):
+    retriever = build_tiny_retriever(tmp_path, items, **kwargs)
+    retriever.rerank_cache.put(("old",), 1.0)
+    # The processed texts of the articles the tests upsert, standing in for Stanza
+    for text in load_article_texts(40):
+        retriever.open_processed_cache().put(text, text)
+    return retriever
+
+
+def test_upsert_and_remove_match_a_rebuild(tmp_path):
+    texts = load_article_texts(8)
+    items = [article(i + 1, text, "[2]" if i == 0 else "[]") for i, text in enumerate(texts[:6])]
+    retriever = make_retriever(tmp_path, items)
+    retriever.reranker.token_cache_path = str(tmp_path / "reranker_tokens.json")
+    old_version = retriever.corpus_version
+
+    changed = article(2, texts[6])
+    added = article(7, texts[7], "[1]")
+    assert retriever.upsert_articles([changed, added]) == {"added": 1, "replaced": 1, "removed": 0,
+                                                           "corpus_version": retriever.corpus_version}
+    assert retriever.remove_articles([("العمل", 4), ("العمل", 99)])["removed"] == 1
+
+    expected = [items[0], changed, items[2], items[4], items[5], added]
+    assert [doc.page_content for doc in retriever.sparse.docs] == [item["page_content"] for item in expected]
+    assert [doc.metadata["original_text"] for doc in retriever.documents] == [item["page_content"] for item in expected]
+    assert retriever.corpus_version == corpus_fingerprint([item["page_content"] for item in expected]) != old_version
+    assert len(retriever.rerank_cache) == 0
+
+    # Sparse branch: same scores as an index built from scratch
+    rebuilt = BM25IndexRetriever.from_documents([Document(page_content=item["page_content"]) for item in expected])
+    query = retriever.sparse.preprocess_func(texts[6][:80])
+    np.testing.assert_allclose(retriever.sparse.index.get_scores(query), rebuilt.index.get_scores(query), rtol=1e-6)
+
+    # Dense branch: the changed article is found by its new text, the removed one is gone
+    retriever.dense_k = 1
+    (document, _), = retriever.dense_search_with_scores(texts[6])
+    assert (document.metadata["article_number"], document.metadata["original_text"]) == ("2", texts[6])
+    parent_keys = [doc.metadata["article_number"] for doc in retriever.docstore.mget(retriever.dense_index.parent_ids.tolist())]
+    assert sorted(set(parent_keys)) == ["1", "2", "3", "5", "6", "7"]
+    assert len(list(retriever.docstore.yield_keys())) == len(set(retriever.dense_index.parent_ids.tolist()))
+
+    # Article graph: the new article links back to article 1
+    assert ("العمل", "4") not in retriever.article_graph
+    assert retriever.article_graph.expand([("العمل", "7")]) == [[texts[7], texts[0]]]
+
+    # Reranker token ids are kept for the live articles only, also in the token cache file
+    live_keys = {retriever.reranker.text_key(item["page_content"]) for item in expected}
+    assert set(retriever.reranker.text_token_ids) == live_keys
+    with open(tmp_path / "reranker_tokens.json", 'r', encoding='utf-8') as f:
+        assert set(json.load(f)["entries"]) == live_keys
+
+    # Everything was persisted for the next start
+    with open(retriever.documents_path, 'r', encoding='utf-8') as f:
+        assert json.load(f) == expected
+    assert BM25Index.read_meta(retriever.sparse_index_path)["fingerprint"] == retriever.corpus_version
+    assert len(NumpyDenseIndex.load(retriever.dense_index_path)) == len(retriever.dense_index)
+
+
+def test_updates_are_written_back_to_a_corpus_artifact(tmp_path):
+    texts = load_article_texts(4)
+    items = [article(i + 1, text) for i, text in enumerate(texts[:3])]
+    tokenizer = build_tiny_tokenizer(load_article_texts())
+    reranker = CrossEncoderReranker(tokenizer=tokenizer, model=build_tiny_cross_encoder(tokenizer))
+    write_corpus_artifact(str(tmp_path / "corpus"), items, texts[:3], tokenizer)
+    retriever = make_retriever(tmp_path, items, reranker=reranker, documents=str(tmp_path / "corpus"))
+    assert retriever.corpus_artifact_path == str(tmp_path / "corpus")
+    retriever.upsert_articles([article(4, texts[3], "[1]")])
+
+    artifact = CorpusArtifact.load(retriever.corpus_artifact_path)
+    assert artifact.fingerprint == retriever.corpus_version
+    assert list(artifact.raw_texts) == texts
+    assert artifact.article_graph().expand([("العمل", "4")]) == [[texts[3], texts[0]]]
+    assert [ids.tolist() for ids in artifact.text_token_ids()] == retriever.reranker.text_ids(texts)
+
+
+
+def test_upsert_replaces_the_chunks_of_a_chroma_collection(tmp_path):
+    pytest.importorskip("chromadb")
+    texts = [text for text in load_article_texts(40) if len(text) < 300][:4]
+    retriever = make_retriever(tmp_path, [article(i + 1, text) for i, text in enumerate(texts[:3])],
+                               dense_backend="chroma", build_indexes=True, vectorstore_path=str(tmp_path / "chroma"),
+                               docstore_path=str(tmp_path / "docstore.v1.sqlite"))
+    retriever.upsert_articles([article(2, texts[3])], persist=False)
+
+    assert len(retriever.vectorstore.get(include=[])["ids"]) == 3
+    retriever.dense_k = 1
+    (document, _), = retriever.dense_search_with_scores(texts[3])
+    assert (document.metadata["article_number"], document.metadata["original_text"]) == ("2", texts[3])
+    retriever.close()
@@ -0,0 +1,106 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+from src.rag.dense_index import NumpyDenseIndex
+
+
+def random_index(num_chunks=500, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((num_chunks, dim)).astype(np.float32)
+    ids = [f"chunk-{i}" for i in range(num_chunks)]
+    parent_ids = [f"article-{i // 3}" for i in range(num_chunks)]
+    return NumpyDenseIndex.from_embeddings(vectors, ids, parent_ids, model_name="test-model"), vectors
+
+
+def test_search_is_exact_cosine_top_k():
+    index, vectors = random_index()
+    rng = np.random.default_rng(1)
+    for query in rng.standard_normal((20, vectors.shape[1])):
+        cosine = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+        rows, scores = index.search(query, 5)
+        np.testing.assert_array_equal(rows, np.argsort(-cosine)[:5])
+        np.testing.assert_allclose(scores, cosine[rows], rtol=1e-5)
+
+
+def test_saved_index_is_memory_mapped_and_equivalent(tmp_path):
+    index, vectors = random_index()
+    index.save(str(tmp_path / "dense"))
+    loaded = NumpyDenseIndex.load(str(tmp_path / "dense"))
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.model_name == "test-model"
+    assert loaded.parent_ids[7] == "article-2"
+    query = vectors[42]
+    np.testing.assert_array_equal(loaded.search(query, 4)[0], index.search(query, 4)[0])
+
+
+def test_export_from_chroma():
+    chromadb = pytest.importorskip("chromadb")
+    _, vectors = random_index(num_chunks=50)
+    collection = chromadb.EphemeralClient().get_or_create_collection("dense_index_test")
+    collection.add(ids=[f"chunk-{i}" for i in range(50)], embeddings=vectors.tolist(),
+                   metadatas=[{"doc_id": f"article-{i // 3}"} for i in range(50)])
+    index = NumpyDenseIndex.from_chroma(collection, batch_size=16)
+    assert len(index) == 50
+    row = list(index.ids).index("chunk-10")
+    assert index.parent_ids[row] == "article-3"
+    rows, _ = index.search(vectors[10], 1)
+    assert index.ids[rows[0]] == "chunk-10"
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_quantized_search_rescores_with_full_precision(tmp_path, quantization):
+    # Chunks of the same article are close to each other, like real parent/child splits
+    rng = np.random.default_rng(2)
+    centers = rng.standard_normal((700, 256))
+    vectors = (centers[np.arange(2000) // 3] + 0.5 * rng.standard_normal((2000, 256))).astype(np.float32)
+    index = NumpyDenseIndex.from_embeddings(vectors, [str(i) for i in range(2000)], [str(i // 3) for i in range(2000)])
+    index.save(str(tmp_path / "dense"))
+    quantized = NumpyDenseIndex.load(str(tmp_path / "dense"), quantization=quantization, rescore_factor=20)
+    assert quantized.memory_footprint(quantization) < index.memory_footprint() / 3
+    recalled = 0
+    for query in vectors[rng.integers(0, 2000, 20)] + 0.1 * rng.standard_normal((20, 256)):
+        exact_rows, exact_scores = index.search(query, 4)
+        rows, scores = quantized.search(query, 4)
+        # Returned scores are the exact cosine similarities of the rescored rows
+        np.testing.assert_allclose(scores, index.vectors[rows] @ (query / np.linalg.norm(query)), rtol=1e-5)
+        recalled += len(set(rows.tolist()) & set(exact_rows.tolist()))
+    assert recalled / 80 >= 0.9
+
+
+@pytest.mark.parametrize("method", ["pca", "truncate"])
+def test_reduced_index_round_trip(tmp_path, method):
+    index, vectors = random_index(num_chunks=300, dim=64)
+    index.add_projection(16, method)
+    assert index.reduced_vectors.shape == (300, 16)
+    index.save(str(tmp_path / "dense"))
+    loaded = NumpyDenseIndex.load(str(tmp_path / "dense"), reduced=True)
+    query = vectors[3]
+    rows, scores = loaded.search(query, 4)
+    np.testing.assert_array_equal(rows, index.search(query, 4, reduced=True)[0])
+    # The shortlist is rescored, so scores are full-dimension cosine similarities
+    np.testing.assert_allclose(scores, index.vectors[rows] @ (query / np.linalg.norm(query)), rtol=1e-5)
+
+
+def test_pca_keeps_full_rank_results():
+    index, vectors = random_index(num_chunks=200, dim=32)
+    index.add_projection(32, "pca")
+    for query in vectors[:10]:
+        np.testing.assert_array_equal(index.search(query, 5, reduced=True)[0], index.search(query, 5, reduced=False)[0])
+
+
+def test_with_changes_replaces_parent_chunks(tmp_path):
+    index, vectors = random_index(num_chunks=30, dim=16)
+    index.add_projection(8, "truncate")
+    index.save(str(tmp_path / "dense"))
+    loaded = NumpyDenseIndex.load(str(tmp_path / "dense"), quantization="int8")
+    new_vectors = np.random.default_rng(2).standard_normal((2, 16)).astype(np.float32)
+    updated = loaded.with_changes(["article-0", "article-4"], new_vectors, ["chunk-new-0", "chunk-new-1"], ["article-0", "article-0"])
+    assert len(updated) == 30 - 6 + 2
+    assert updated.quantization == "int8"
+    assert updated.reduced_vectors.shape == (26, 8)
+    assert "article-4" not in updated.parent_ids.tolist()
+    rows, _ = updated.search(new_vectors[1], 1, quantization=None)
+    assert updated.ids[rows[0]] == "chunk-new-1"
+    assert updated.parent_ids[rows[0]] == "article-0"
+    # Unchanged chunks keep their vectors
+    np.testing.assert_allclose(updated.vectors[0], vectors[3] / np.linalg.norm(vectors[3]), rtol=1e-6)
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("langchain")
+from langchain.schema import Document
+from src.rag.hybrid_retrieval import fuse_rankings, article_key
+
+
+def make_doc(law, number):
+    return Document(page_content=f"{law} {number}", metadata={"law_short": law, "article_number": number})
+
+
+def test_rrf_weights_apply_to_named_branches():
+    dense = [(make_doc("labour", 1), 0.9), (make_doc("labour", 2), 0.8)]
+    sparse = [(make_doc("labour", 2), 12.0), (make_doc("labour", 3), 7.0)]
+    fused = fuse_rankings({"dense": dense, "sparse": sparse}, {"dense": 0.0, "sparse": 1.0})
+    assert [article_key(c["document"]) for c in fused][:2] == [("labour", "2"), ("labour", "3")]
+    assert fused[0]["dense_score"] == 0.8 and fused[0]["sparse_score"] == 12.0
+    assert fused[0]["fused_score"] == pytest.approx(1 / 61)
+
+
+def test_same_article_number_in_different_laws_is_kept():
+    dense = [(make_doc("labour", 5), 0.9)]
+    sparse = [(make_doc("civil", 5), 3.0)]
+    fused = fuse_rankings({"dense": dense, "sparse": sparse}, {"dense": 0.5, "sparse": 0.5})
+    assert len(fused) == 2
+    assert {c["sparse_score"] for c in fused} == {None, 3.0}
+
+
+@pytest.mark.parametrize("method", ["minmax", "zscore"])
+def test_score_fusion_uses_branch_scores(method):
+    dense = [(make_doc("labour", 1), 0.9), (make_doc("labour", 2), 0.1), (make_doc("labour", 3), 0.0)]
+    sparse = [(make_doc("labour", 2), 10.0), (make_doc("labour", 1), 9.9), (make_doc("labour", 4), 0.0)]
+    fused = fuse_rankings({"dense": dense, "sparse": sparse}, {"dense": 0.5, "sparse": 0.5}, method=method)
+    # Article 1 is near the top of both branches by score even though it ranks second in one
+    assert article_key(fused[0]["document"]) == ("labour", "1")
+    assert len(fused) == 4
+
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        fuse_rankings({}, {}, method="borda")
@@ -0,0 +1,355 @@
+import os
+import json
+import threading
+import pytest
+from src.rag.index_rebuild import IndexRebuild
+
+
+class Holder:
+    # Stands in for RAGPipeline: requests take a snapshot of the live retriever
+    def __init__(self, retriever):
+        self.retriever = retriever
+
+    def swap(self, retriever):
+        self.retriever = retriever
+
+
+def test_in_flight_request_finishes_on_the_old_retriever():
+    holder = Holder("blue")
+    release_build = threading.Event()
+
+    def build():
+        release_build.wait(5)
+        return "green"
+
+    rebuild = IndexRebuild(build, holder.swap)
+    snapshot = holder.retriever
+    assert rebuild.start()
+    assert not rebuild.start()
+    assert rebuild.status()["state"] == "running"
+    # The live retriever keeps serving while the new one is built
+    assert holder.retriever == "blue"
+
+    release_build.set()
+    assert rebuild.wait(5)
+    assert snapshot == "blue"
+    assert holder.retriever == "green"
+    status = rebuild.status()
+    assert (status["state"], status["swaps"], status["error"]) == ("succeeded", 1, None)
+    assert status["seconds"] >= 0
+
+
+def test_failed_build_keeps_the_live_retriever():
+    holder = Holder("blue")
+
+    def build():
+        raise OSError("corpus file missing")
+
+    rebuild = IndexRebuild(build, holder.swap)
+    rebuild.start()
+    rebuild.wait(5)
+    assert holder.retriever == "blue"
+    status = rebuild.status()
+    assert (status["state"], status["swaps"]) == ("failed", 0)
+    assert status["error"] == "OSError: corpus file missing"
+    # A new rebuild can be started after a failure
+    assert rebuild.start()
+    rebuild.wait(5)
+
+
+def article(number, text):
+    return {"page_content": text, "metadata": {"law_short": "العمل", "article_number": str(number), "linked_articles": "[]"}}
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    pytest.importorskip("torch")
+    pytest.importorskip("langchain")
+    import src.rag.RAG_Pipeline
+    from src.rag.artifact_versions import migrate_legacy_path
+    from tiny_models import load_article_texts, build_tiny_retriever
+
+    class FakeGenerator:
+        def __init__(self, base_model_id, finetuned_model_id):
+            self.base_model_id = base_model_id
+
+    # The LLM is not needed to rebuild the retriever
+    monkeypatch.setattr(src.rag.RAG_Pipeline, "LegalGenerator", FakeGenerator)
+    texts = load_article_texts(40)
+    # Writes the corpus file, processed cache, docstore and dense index the pipeline starts from
+    seed = build_tiny_retriever(tmp_path, [article(i + 1, text) for i, text in enumerate(texts[:5])])
+    seed.close()
+    # The docstore was written as a plain file; it is versioned once before the first rebuild
+    migrate_legacy_path(str(tmp_path / "docstore.sqlite"))
+    pipeline = src.rag.RAG_Pipeline.RAGPipeline(
+        documents=str(tmp_path / "articles.json"),
+        embedding_model_name="fake-embeddings",
+        vectorstore_path=None,
+        docstore_path=str(tmp_path / "docstore.sqlite"),
+        sparse_index_path=str(tmp_path / "bm25"),
+        dense_backend="numpy",
+        dense_index_path=str(tmp_path / "dense"),
+        processed_cache_dir=str(tmp_path / "processed"),
+        query_lemma_lookup=False,
+        retrieval_workers=2,
+        embeddings=seed.embeddings,
+        reranker=seed.reranker,
+    )
+    # A single child chunk, so the dense search finds it by its own text
+    pipeline.new_text = next(text for text in texts[5:] if len(text) < 300)
+    pipeline.open_processed_cache = seed.open_processed_cache
+    yield pipeline
+    pipeline.retriever.close()
+
+
+def edit_corpus(pipeline):
+    # Article 2 gets a new text; its processed text is cached, standing in for Stanza
+    with open(pipeline.retriever.documents_path, 'r', encoding='utf-8') as f:
+        items = json.load(f)
+    items[1]["page_content"] = pipeline.new_text
+    with open(pipeline.retriever.documents_path, 'w', encoding='utf-8') as f:
+        json.dump(items, f, ensure_ascii=False)
+    cache = pipeline.open_processed_cache()
+    cache.put(pipeline.new_text, pipeline.new_text)
+    cache.save()
+
+
+def test_rebuild_retriever_builds_and_publishes_every_index(pipeline):
+    from src.rag.artifact_versions import list_versions
+
+    live = pipeline.retriever
+    edit_corpus(pipeline)
+    assert pipeline.rebuild_retriever(wait=True)
+    assert pipeline.index_rebuild.status()["state"] == "succeeded"
+
+    retriever = pipeline.retriever
+    assert retriever is not live and live.retrieval_executor._shutdown
+    # The loaded models are shared instead of loaded again
+    assert retriever.embeddings is live.embeddings and retriever.reranker is live.reranker
+
+    # The docstore, dense index and BM25 index were built from the edited corpus and published together
+    for name, path in pipeline.index_paths().items():
+        assert os.path.islink(path) and getattr(retriever, name) == path
+        assert os.path.realpath(path) == os.path.realpath(list_versions(path)[-1][1])
+    assert os.path.realpath(pipeline.docstore_path).endswith(".sqlite")
+    retriever.dense_k = 1
+    (document, _), = retriever.dense_search_with_scores(pipeline.new_text)
+    assert (document.metadata["article_number"], document.metadata["original_text"]) == ("2", pipeline.new_text)
+    assert len(list(retriever.docstore.yield_keys())) == len(set(retriever.dense_index.parent_ids.tolist()))
+
+    # The next start loads the published indexes as they are
+    restarted = pipeline.create_retriever()
+    assert restarted.corpus_version == retriever.corpus_version
+    assert restarted.sparse.index.num_docs == 5 and len(restarted.dense_index) == len(retriever.dense_index)
+    restarted.close()
+
+
+def test_failed_rebuild_removes_its_staged_indexes(pipeline, monkeypatch):
+    from src.rag.artifact_versions import list_versions, version_path
+    from src.rag.bm25_index import BM25Index
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    live = pipeline.retriever
+    versions = {path: list_versions(path) for path in pipeline.index_paths().values()}
+    edit_corpus(pipeline)
+    # The BM25 index is written last, after the docstore and dense index
+    monkeypatch.setattr(BM25Index, "write", fail)
+    pipeline.rebuild_retriever(wait=True)
+    assert pipeline.index_rebuild.status()["error"] == "OSError: disk full"
+    assert pipeline.retriever is live and not live.retrieval_executor._shutdown
+    assert {path: list_versions(path) for path in versions} == versions
+    assert os.path.realpath(pipeline.docstore_path) == os.path.realpath(version_path(pipeline.docstore_path, 0))
+
+
+def test_rebuild_refuses_an_unversioned_index(pipeline):
+    from src.rag.artifact_versions import list_versions
+    from src.rag.bm25_index import BM25Index
+
+    # e.g. a tracked index directory: it is left as it is until it is versioned explicitly
+    BM25Index.from_tokenized([["عقد"], ["العمل"]]).write(pipeline.sparse_index_path)
+    live = pipeline.retriever
+    versions = {path: list_versions(path) for path in pipeline.index_paths().values()}
+    pipeline.rebuild_retriever(wait=True)
+    assert "--migrate" in pipeline.index_rebuild.status()["error"]
+    assert pipeline.retriever is live
+    assert {path: list_versions(path) for path in versions} == versions
+    assert not os.path.islink(pipeline.sparse_index_path)
+
+
+def test_rebuild_compiles_the_corpus_artifact_from_the_edited_json(pipeline, tmp_path):
+    from collections import Counter
+    from src.rag.corpus_artifact import build_corpus_artifact
+    from src.rag.lemma_table import LemmaTable
+    from src.rag.preprocessing_pipline import PREPROCESSING_VERSION
+
+    # A non-empty query lemma table, which the build would otherwise fill by lemmatizing
+    lemma_table = LemmaTable(str(tmp_path / "processed" / f"lemma_table_v{PREPROCESSING_VERSION}.json"))
+    lemma_table.observe(Counter({("العمل", "عمل"): 1}))
+    lemma_table.save()
+    json_path = pipeline.documents
+    build_corpus_artifact(json_path, str(tmp_path / "corpus"), str(tmp_path / "processed"))
+    pipeline.retriever.close()
+    pipeline.documents = str(tmp_path / "corpus")
+    pipeline.retriever = pipeline.create_retriever()
+    assert pipeline.retriever.documents_path == json_path
+
+    edit_corpus(pipeline)
+    assert pipeline.rebuild_retriever(wait=True)
+    assert pipeline.index_rebuild.status()["state"] == "succeeded"
+    retriever = pipeline.retriever
+    assert os.path.islink(pipeline.documents) and retriever.corpus_artifact_path == pipeline.documents
+    assert retriever.corpus.raw_texts[1] == pipeline.new_text
+    retriever.dense_k = 1
+    (document, _), = retriever.dense_search_with_scores(pipeline.new_text)
+    assert (document.metadata["article_number"], document.metadata["original_text"]) == ("2", pipeline.new_text)
+
+    # The next start loads the published artifact
+    restarted = pipeline.create_retriever()
+    assert restarted.corpus_version == retriever.corpus_version and restarted.corpus.raw_texts[1] == pipeline.new_text
+    restarted.close()
+
+
+def test_swap_waits_for_the_requests_on_the_old_retriever(pipeline):
+    old = pipeline.acquire_retriever()
+    old_versions = [os.path.realpath(path) for path in pipeline.index_paths().values() if os.path.islink(path)]
+    assert len(old_versions) == 2
+    edit_corpus(pipeline)
+    assert pipeline.rebuild_retriever(wait=True)
+    assert pipeline.retriever is not old and not old.retrieval_executor._shutdown
+    # The request still runs its branches on the old retriever's pool, and its leased index
+    # versions were not removed by the publish
+    assert old.retrieve_candidates(pipeline.new_text)
+    assert all(os.path.exists(version) for version in old_versions)
+    old.release()
+    assert old.retrieval_executor._shutdown
+
+    # Released, they are removed by the next publish
+    assert pipeline.rebuild_retriever(wait=True)
+    assert not any(os.path.exists(version) for version in old_versions)
+
+
+def test_a_second_process_cannot_serve_the_pipeline(tmp_path, monkeypatch):
+    pytest.importorskip("torch")
+    pytest.importorskip("langchain")
+    fcntl = pytest.importorskip("fcntl")
+    import src.rag.RAG_Pipeline
+
+    lock_path = str(tmp_path / "api-serving.lock")
+    monkeypatch.setattr(src.rag.RAG_Pipeline, "SERVING_LOCK_PATH", lock_path)
+    monkeypatch.setattr(src.rag.RAG_Pipeline, "_serving_lock_fd", None)
+    monkeypatch.setattr(src.rag.RAG_Pipeline, "_rag_pipeline", None)
+    monkeypatch.setattr(src.rag.RAG_Pipeline, "RAGPipeline", object)
+    # Another worker holds the lock (a separate open file, like another process)
+    with open(lock_path, 'w') as other_worker:
+        fcntl.flock(other_worker, fcntl.LOCK_EX)
+        with pytest.raises(RuntimeError, match="single worker"):
+            src.rag.RAG_Pipeline.get_rag_pipeline()
+    assert src.rag.RAG_Pipeline.get_rag_pipeline() is src.rag.RAG_Pipeline.get_rag_pipeline()
+    os.close(src.rag.RAG_Pipeline._serving_lock_fd)
+
+
+def test_concurrent_first_requests_share_one_pipeline(tmp_path, monkeypatch):
+    pytest.importorskip("torch")
+    pytest.importorskip("langchain")
+    import time
+    import src.rag.RAG_Pipeline
+
+    created = []
+
+    class SlowPipeline:
+        def __init__(self):
+            time.sleep(0.1)
+            created.append(self)
+
+    monkeypatch.setattr(src.rag.RAG_Pipeline, "RAGPipeline", SlowPipeline)
+    monkeypatch.setattr(src.rag.RAG_Pipeline, "_rag_pipeline", None)
+    monkeypatch.setattr(src.rag.RAG_Pipeline, "SERVING_LOCK_PATH", str(tmp_path / "api-serving.lock"))
+    monkeypatch.setattr(src.rag.RAG_Pipeline, "_serving_lock_fd", None)
+    pipelines = []
+    threads = [threading.Thread(target=lambda: pipelines.append(src.rag.RAG_Pipeline.get_rag_pipeline())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1 and pipelines == created * 4
+
+
+def test_build_indexes_writes_a_chroma_collection(tmp_path):
+    pytest.importorskip("chromadb")
+    pytest.importorskip("torch")
+    pytest.importorskip("langchain")
+    from src.rag.bm25_index import BM25Index
+    from tiny_models import load_article_texts, build_tiny_retriever
+
+    texts = [text for text in load_article_texts(40) if len(text) < 300][:4]
+    retriever = build_tiny_retriever(tmp_path, [article(i + 1, text) for i, text in enumerate(texts)],
+                                     dense_backend="chroma", build_indexes=True,
+                                     vectorstore_path=str(tmp_path / "chroma.v1"),
+                                     docstore_path=str(tmp_path / "docstore.v1.sqlite"),
+                                     sparse_index_path=str(tmp_path / "bm25.v1"))
+    retriever.dense_k = 1
+    (document, _), = retriever.dense_search_with_scores(texts[2])
+    assert document.metadata["article_number"] == "3"
+    assert retriever.vectorstore._collection.count() == len(texts)
+    assert BM25Index.load(str(tmp_path / "bm25.v1")).num_docs == len(texts)
+    retriever.close()
+
+    # Existing paths are never built into
+    with pytest.raises(ValueError):
+        build_tiny_retriever(tmp_path / "again", [article(1, texts[0])], dense_backend="chroma", build_indexes=True,
+                             vectorstore_path=str(tmp_path / "chroma.v1"), docstore_path=str(tmp_path / "docstore.v1.sqlite"))
+
+
+@pytest.fixture
+def admin_client(pipeline, tmp_path, monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    # The API modules create their SQLite database under the working directory when imported
+    (tmp_path / "src" / "database").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    import src.apis.admin as admin
+
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/admin")
+    user = {"username": "admin"}
+    app.dependency_overrides[admin.get_current_user] = lambda: user
+    app.dependency_overrides[admin.get_rag_pipeline] = lambda: pipeline
+    monkeypatch.setattr(admin, "ADMIN_USERNAMES", {"admin"})
+    client = TestClient(app)
+    client.user = user
+    return client
+
+
+def test_admin_rebuild_endpoint(admin_client, pipeline):
+    live = pipeline.retriever
+    response = admin_client.get("/admin/rebuild")
+    assert response.status_code == 200
+    assert response.json()["state"] == "idle" and response.json()["corpus_version"] == live.corpus_version
+
+    edit_corpus(pipeline)
+    release_build = threading.Event()
+    build = pipeline.index_rebuild.build
+
+    def slow_build():
+        release_build.wait(5)
+        return build()
+
+    pipeline.index_rebuild.build = slow_build
+    response = admin_client.post("/admin/rebuild")
+    assert response.status_code == 202 and response.json()["state"] == "running"
+    assert admin_client.post("/admin/rebuild").status_code == 409
+
+    release_build.set()
+    assert pipeline.index_rebuild.wait(60)
+    status = admin_client.get("/admin/rebuild").json()
+    assert (status["state"], status["swaps"]) == ("succeeded", 1)
+    assert status["corpus_version"] == pipeline.retriever.corpus_version != live.corpus_version
+
+    admin_client.user["username"] = "someone"
+    assert admin_client.post("/admin/rebuild").status_code == 403
+    assert admin_client.get("/admin/rebuild").status_code == 403
@@ -0,0 +1,55 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+np = pytest.importorskip("numpy")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+pytest.importorskip("sentence_transformers")
+from src.rag.inference_backends import OnnxSequenceClassifier, OnnxSentenceEmbeddings, load_embeddings
+from src.rag.reranker import CrossEncoderReranker
+from tiny_models import load_article_texts, build_tiny_tokenizer, build_tiny_cross_encoder, build_tiny_sentence_transformer
+
+QUERY = "ما هي مدة الإجازة السنوية؟"
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    return build_tiny_tokenizer(load_article_texts())
+
+
+def test_onnx_reranker_matches_torch(tokenizer, tmp_path):
+    texts = load_article_texts(12)
+    model = build_tiny_cross_encoder(tokenizer, initializer_range=0.3)
+    expected = CrossEncoderReranker(tokenizer=tokenizer, model=model, max_batch_size=4).score(QUERY, texts)
+    assert np.std(expected) > 0.1
+
+    onnx = CrossEncoderReranker(tokenizer=tokenizer, model=model, max_batch_size=4, backend="onnx", onnx_cache_dir=str(tmp_path))
+    assert isinstance(onnx.model, OnnxSequenceClassifier)
+    np.testing.assert_allclose(onnx.score(QUERY, texts), expected, atol=1e-4)
+
+    int8 = CrossEncoderReranker(tokenizer=tokenizer, model=model, max_batch_size=4, backend="onnx-int8", onnx_cache_dir=str(tmp_path))
+    assert int8.model.path.endswith("model-int8.onnx")
+    scores = int8.score(QUERY, texts)
+    assert np.corrcoef(scores, expected)[0, 1] > 0.98
+
+
+def test_onnx_embeddings_match_sentence_transformer(tokenizer, tmp_path):
+    texts = load_article_texts(10)
+    model = build_tiny_sentence_transformer(tokenizer, str(tmp_path / "tiny-e5"), initializer_range=0.3)
+    expected = model.encode(texts)
+
+    embeddings = load_embeddings("tiny-e5", "onnx", str(tmp_path / "onnx"), sentence_transformer=model)
+    assert isinstance(embeddings, OnnxSentenceEmbeddings)
+    np.testing.assert_allclose(embeddings.embed_documents(texts), expected, atol=1e-4)
+    np.testing.assert_allclose(embeddings.embed_query(texts[0]), expected[0], atol=1e-4)
+
+    # Later loads read the export and its saved settings without the PyTorch model
+    reloaded = load_embeddings("tiny-e5", "onnx-int8", str(tmp_path / "onnx"))
+    vectors = np.array(reloaded.embed_documents(texts))
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+    assert np.min(np.sum(vectors * expected, axis=1)) > 0.99
+
+
+def test_unknown_backend_is_rejected(tokenizer):
+    with pytest.raises(ValueError):
+        CrossEncoderReranker(tokenizer=tokenizer, model=build_tiny_cross_encoder(tokenizer), backend="tensorrt")
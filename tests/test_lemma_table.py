@@ -0,0 +1,117 @@
+import json
+from collections import Counter
+import pytest
+
+pytest.importorskip("stanza")
+from src.rag.lemma_table import LemmaTable
+
+
+def test_lemma_table_resolves_the_most_frequent_lemma():
+    table = LemmaTable()
+    table.observe(Counter({("العقد", "عقد"): 3, ("بالعقد", "ب عقد"): 1}))
+    table.observe(Counter({("العقد", "العقد"): 2}))
+    assert len(table) == 2
+    assert table.lookup("العقد") == "عقد"
+    table.observe(Counter({("العقد", "العقد"): 2}))
+    assert table.lookup("العقد") == "العقد"
+    assert table.lookup("بالعقد") == "ب عقد"
+    assert table.lookup("مجهول") is None
+    assert table.stats() == {"size": 2, "hits": 3, "misses": 1, "hit_rate": 0.75}
+
+
+def test_lemma_table_persists_per_version(tmp_path, capsys):
+    path = str(tmp_path / "lemma_table.json")
+    table = LemmaTable(path)
+    table.observe(Counter({("العمال", "عامل"): 2}))
+    table.save()
+
+    assert LemmaTable(path).lookup("العمال") == "عامل"
+    assert len(LemmaTable(path, version="other")) == 0
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("{not json")
+    assert len(LemmaTable(path)) == 0
+    assert "Warning: Ignoring unreadable lemma table" in capsys.readouterr().out
+
+
+def test_lemma_table_saves_only_changes(tmp_path):
+    path = tmp_path / "lemma_table.json"
+    LemmaTable(str(path)).save()
+    assert not path.exists()
+    table = LemmaTable(str(path))
+    table.observe(Counter({("قانون", "قانون"): 1}))
+    table.save()
+    assert json.loads(path.read_text(encoding='utf-8'))["counts"] == {"قانون": {"قانون": 1}}
+
+
+def test_cache_stats_report_query_lemma_lookups(tmp_path, monkeypatch):
+    pytest.importorskip("torch")
+    pytest.importorskip("langchain")
+    import src.rag.hybrid_retrieval
+    from src.rag.preprocessing_pipline import clean_query
+    from tiny_models import load_article_texts, build_tiny_retriever
+
+    def fake_clean_texts(texts, batch_size=32, workers=1, lemma_table=None):
+        # Identity lemmas, standing in for Stanza
+        lemma_table.observe(Counter((token, token) for text in texts for token in text.split()))
+        return list(texts)
+
+    monkeypatch.setattr(src.rag.hybrid_retrieval, "clean_texts", fake_clean_texts)
+    texts = load_article_texts(3)
+    items = [{"page_content": text, "metadata": {"law_short": "العمل", "article_number": str(i + 1), "linked_articles": "[]"}}
+             for i, text in enumerate(texts)]
+    retriever = build_tiny_retriever(tmp_path, items, query_lemma_lookup=True)
+    assert retriever.cache_stats()["query_lemmas"]["hits"] == 0
+
+    words = [word for word in texts[0].split() if word.isalpha()][:3]
+    assert clean_query(" ".join(words), retriever.lemma_table)
+    stats = retriever.cache_stats()["query_lemmas"]
+    assert stats["hits"] == 3 and stats["misses"] == 0 and stats["size"] > 0
+
+
+def test_artifact_carries_the_lemma_table(tmp_path, monkeypatch):
+    pytest.importorskip("torch")
+    pytest.importorskip("langchain")
+    import src.rag.hybrid_retrieval
+    import src.rag.preprocessing_pipline
+    from src.rag.corpus_artifact import CorpusArtifact, build_corpus_artifact
+    from src.rag.corpus_cache import ProcessedCorpusCache
+    from src.rag.preprocessing_pipline import clean_query
+    from tiny_models import load_article_texts, build_tiny_retriever
+
+    texts = load_article_texts(3)
+    items = [{"page_content": text, "metadata": {"law_short": "العمل", "article_number": str(i + 1), "linked_articles": "[]"}}
+             for i, text in enumerate(texts)]
+    documents_path = tmp_path / "articles.json"
+    documents_path.write_text(json.dumps(items, ensure_ascii=False), encoding='utf-8')
+    calls = []
+
+    def fake_clean_texts(texts, batch_size=32, workers=1, lemma_table=None):
+        # Identity lemmas, standing in for Stanza
+        calls.append(len(texts))
+        lemma_table.observe(Counter((token, token) for text in texts for token in text.split()))
+        return list(texts)
+
+    # The processed texts are cached, but the empty lemma table is filled by lemmatizing the corpus once
+    cache = ProcessedCorpusCache(str(tmp_path / "processed"))
+    for text in texts:
+        cache.put(text, text)
+    cache.save()
+    monkeypatch.setattr(src.rag.preprocessing_pipline, "clean_texts", fake_clean_texts)
+    build_corpus_artifact(str(documents_path), str(tmp_path / "corpus"), str(tmp_path / "processed"))
+    assert calls == [3]
+    artifact = CorpusArtifact.load(str(tmp_path / "corpus"))
+    assert artifact.meta["lemma_table"] and artifact.lemma_counts()
+
+    # A retriever started from the artifact with an empty table never runs Stanza over the corpus
+    def no_stanza(texts, *args, **kwargs):
+        raise AssertionError(f"Stanza ran on {len(texts)} articles")
+
+    monkeypatch.setattr(src.rag.hybrid_retrieval, "clean_texts", no_stanza)
+    retriever = build_tiny_retriever(tmp_path / "retriever", items, documents=str(tmp_path / "corpus"), query_lemma_lookup=True)
+    assert len(retriever.lemma_table) == len(artifact.lemma_counts())
+    words = [word for word in texts[0].split() if word.isalpha()][:3]
+    assert clean_query(" ".join(words), retriever.lemma_table)
+    assert retriever.cache_stats()["query_lemmas"]["misses"] == 0
+    # The texts are read from the artifact's memory-mapped columns
+    assert retriever.corpus.raw_texts[2] == texts[2] and not isinstance(retriever.corpus.raw_texts, list)
@@ -0,0 +1,43 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+from src.rag.memory_report import deep_sizeof, format_memory_report, memory_report
+
+
+def article(number, text):
+    return {"page_content": text, "metadata": {"law_short": "العمل", "article_number": str(number), "linked_articles": "[]"}}
+
+
+def test_memory_report_counts_shared_objects_once():
+    text = "x" * 10000
+    shared = [text]
+    report = memory_report([("first", shared), ("second", {"text": text}), ("empty", None)])
+    assert report["first"]["heap_bytes"] >= 10000
+    assert report["second"]["heap_bytes"] < 1000
+    assert report["empty"] == {"heap_bytes": 0, "mapped_bytes": 0}
+    assert deep_sizeof(shared)[0] == report["first"]["heap_bytes"]
+    assert "total" in format_memory_report(report, before=report)
+
+
+def test_memory_mapped_arrays_are_counted_once_per_file(tmp_path):
+    np.save(tmp_path / "array.npy", np.zeros(1000, dtype=np.float32))
+    mapped = np.load(tmp_path / "array.npy", mmap_mode='r')
+    heap, mapped_bytes = deep_sizeof([mapped[:500], mapped[500:], mapped])
+    assert mapped_bytes == 4000
+    assert heap < 4000
+
+
+def test_retriever_memory_report_shares_the_corpus(tmp_path):
+    pytest.importorskip("torch")
+    pytest.importorskip("langchain")
+    from tiny_models import build_tiny_retriever, load_article_texts
+
+    items = [article(i + 1, text) for i, text in enumerate(load_article_texts(4))]
+    retriever = build_tiny_retriever(tmp_path, items)
+    report = retriever.memory_report()
+    assert list(report)[:4] == ["corpus", "raw_documents", "processed_documents", "article_graph"]
+    # The Document views and the graph reference the texts held by the corpus store
+    assert report["corpus"]["heap_bytes"] > sum(len(item["page_content"]) for item in items)
+    assert report["raw_documents"]["heap_bytes"] + report["processed_documents"]["heap_bytes"] < 1000
+    # The BM25 and dense indexes written by the factory are memory-mapped
+    assert report["dense_index"]["mapped_bytes"] > 0
@@ -0,0 +1,78 @@
+import os
+import pytest
+
+pytest.importorskip("langchain")
+from langchain.schema import Document
+from langchain.storage import LocalFileStore
+from langchain.storage._lc_store import create_kv_docstore
+from src.rag.caching import CachedDocstore
+from src.rag.packed_docstore import PackedByteStore, default_docstore_path, migrate_file_store, open_docstore
+from tiny_models import REPO_ROOT
+
+
+def test_byte_store_roundtrip(tmp_path):
+    store = PackedByteStore(str(tmp_path / "store.sqlite"))
+    store.mset([(f"key-{i}", f"value {i}".encode()) for i in range(1200)])
+    keys = ["key-5", "missing", "key-1100", "key-5"]
+    assert store.mget(keys) == [b"value 5", None, b"value 1100", b"value 5"]
+    assert len(store.mget([f"key-{i}" for i in range(1200)])) == 1200
+
+    store.mset([("key-5", b"new")])
+    store.mdelete(["key-1100"])
+    assert store.mget(["key-5", "key-1100"]) == [b"new", None]
+    assert len(store) == 1199
+    assert list(store.yield_keys(prefix="key-119")) == ["key-119"] + [f"key-119{i}" for i in range(10)]
+
+
+def test_migration_matches_file_store(tmp_path):
+    source = str(tmp_path / "docstore")
+    documents = [Document(page_content=f"نص المادة {i}", metadata={"article_number": str(i), "law_short": "العمل"}) for i in range(20)]
+    create_kv_docstore(LocalFileStore(source)).mset([(f"id-{i}", doc) for i, doc in enumerate(documents)])
+
+    output = str(tmp_path / "docstore.sqlite")
+    assert migrate_file_store(source, output) == 20
+    packed = open_docstore(output, read_only=True)
+    keys = [f"id-{i}" for i in (3, 19, 0)] + ["unknown"]
+    assert packed.mget(keys) == open_docstore(source).mget(keys)
+    assert packed.mget(keys)[0] == documents[3]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_read_only_store_must_exist(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        open_docstore(str(tmp_path / "missing.sqlite"), read_only=True)
+
+
+def test_default_docstore_path_prefers_the_migrated_file(tmp_path):
+    packed, legacy = str(tmp_path / "docstore.sqlite"), str(tmp_path / "docstore")
+    # A fresh install builds the packed docstore
+    assert default_docstore_path(packed, legacy) == packed
+    os.makedirs(legacy)
+    assert default_docstore_path(packed, legacy) == legacy
+    migrate_file_store(legacy, packed)
+    assert default_docstore_path(packed, legacy) == packed
+
+
+def test_parent_document_cache(tmp_path):
+    store = create_kv_docstore(PackedByteStore(str(tmp_path / "store.sqlite")))
+    store.mset([("a", Document(page_content="a")), ("b", Document(page_content="b"))])
+    cached = CachedDocstore(store, max_size=1)
+
+    assert [doc.page_content for doc in cached.mget(["a", "b"])] == ["a", "b"]
+    assert cached.mget(["b", "c"])[1] is None
+    assert cached.stats()["hits"] == 1
+    assert len(cached.cache) == 1
+
+    cached.mdelete(["b"])
+    assert cached.mget(["b"]) == [None]
+    cached.mset([("b", Document(page_content="b2"))])
+    assert cached.mget(["b"])[0].page_content == "b2"
+
+
+@pytest.mark.skipif(not os.path.isdir(os.path.join(REPO_ROOT, "data/docstore")), reason="no docstore directory")
+def test_migrate_repository_docstore(tmp_path):
+    source = os.path.join(REPO_ROOT, "data/docstore")
+    output = str(tmp_path / "docstore.sqlite")
+    keys = sorted(os.listdir(source))
+    assert migrate_file_store(source, output) == len(keys)
+    assert open_docstore(output, read_only=True).mget(keys[:50]) == open_docstore(source).mget(keys[:50])
@@ -0,0 +1,70 @@
+import time
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("langchain")
+from tiny_models import load_article_texts, build_tiny_retriever
+
+BRANCH_SECONDS = 0.2
+
+
+class SlowBranch:
+    def __init__(self, documents):
+        self.documents = documents
+        self.calls = []
+
+    def search_with_scores(self, query):
+        start = time.perf_counter()
+        time.sleep(BRANCH_SECONDS)
+        self.calls.append((start, time.perf_counter()))
+        return [(document, 1.0 / (rank + 1)) for rank, document in enumerate(self.documents)]
+
+
+@pytest.fixture
+def retriever(tmp_path):
+    items = [{"page_content": text, "metadata": {"law_short": "العمل", "article_number": str(i + 1), "linked_articles": "[]"}}
+             for i, text in enumerate(load_article_texts(4))]
+    retriever = build_tiny_retriever(tmp_path, items)
+    documents = retriever.sparse.docs
+    retriever.dense_branch = SlowBranch([documents[0], documents[1]])
+    retriever.dense_search_with_scores = retriever.dense_branch.search_with_scores
+    retriever.sparse = SlowBranch([documents[1], documents[2]])
+    return retriever
+
+
+def test_branches_overlap_and_timings_are_recorded(retriever):
+    start = time.perf_counter()
+    candidates = retriever.retrieve_candidates("عقد العمل")
+    elapsed = time.perf_counter() - start
+
+    (dense_start, dense_end), = retriever.dense_branch.calls
+    (sparse_start, sparse_end), = retriever.sparse.calls
+    assert max(dense_start, sparse_start) < min(dense_end, sparse_end)
+    assert elapsed < 1.75 * BRANCH_SECONDS
+    assert candidates[0]["document"].metadata["article_number"] == "2"
+
+    timings = retriever.retrieval_timings()
+    assert timings["queries"] == 1
+    assert timings["last_ms"]["dense"] >= BRANCH_SECONDS * 1000
+    assert timings["last_ms"]["sparse"] >= BRANCH_SECONDS * 1000
+    assert timings["last_ms"]["total"] < timings["last_ms"]["dense"] + timings["last_ms"]["sparse"]
+
+
+def test_closed_retriever_runs_the_branches_inline(retriever):
+    retriever.close()
+    start = time.perf_counter()
+    assert retriever.retrieve_candidates("عقد العمل")
+    assert time.perf_counter() - start >= 2 * BRANCH_SECONDS
+    assert retriever.retrieval_timings()["queries"] == 1
+
+
+def test_close_waits_for_the_requests_that_retained_the_retriever(retriever):
+    retriever.retain()
+    retriever.close()
+    assert not retriever.retrieval_executor._shutdown
+    start = time.perf_counter()
+    assert retriever.retrieve_candidates("عقد العمل")
+    assert time.perf_counter() - start < 1.75 * BRANCH_SECONDS
+    retriever.release()
+    assert retriever.retrieval_executor._shutdown
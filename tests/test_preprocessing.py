@@ -0,0 +1,67 @@
+from collections import Counter
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("stanza")
+import src.rag.preprocessing_pipline as preprocessing
+from src.rag.lemma_table import LemmaTable
+from src.rag.preprocessing_pipline import clean_query, clean_text, clean_texts, _QUERY_TOKEN_RE
+from tiny_models import load_article_texts
+
+
+def fake_lemma(token):
+    return token[2:] if token.startswith("ال") and len(token) > 3 else token
+
+
+class FakeStanza:
+    """
+    Context-free stand-in for the Stanza pipeline: every token is its own word, lemmatized by
+    fake_lemma. Records the texts it is called on.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        words = [SimpleNamespace(lemma=fake_lemma(token)) for token in _QUERY_TOKEN_RE.findall(text)]
+        return SimpleNamespace(sentences=[SimpleNamespace(words=words)])
+
+
+@pytest.fixture(scope="module")
+def ar_nlp():
+    # The Arabic Stanza model is only available where it was downloaded beforehand
+    import stanza
+    try:
+        nlp = stanza.Pipeline('ar', download_method=None, verbose=False)
+    except Exception as e:
+        pytest.skip(f"Arabic Stanza model unavailable: {e}")
+    previous, preprocessing._ar_nlp = preprocessing._ar_nlp, nlp
+    yield nlp
+    preprocessing._ar_nlp = previous
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_clean_texts_matches_clean_text(ar_nlp, workers):
+    texts = load_article_texts(5) + ["", "المادة ١٢: يُعاقَب بالحبس"]
+    # batch_size=2 splits the texts into several batches, which workers=2 fans out to a spawn pool
+    assert clean_texts(texts, batch_size=2, workers=workers) == [clean_text(text) for text in texts]
+
+
+def test_clean_query_matches_clean_text_and_sends_unknown_runs_to_stanza(monkeypatch):
+    nlp = FakeStanza()
+    monkeypatch.setattr(preprocessing, "_ar_nlp", nlp)
+    table = LemmaTable()
+    known = ["فصل", "العامل", "العقد", "،"]
+    table.observe(Counter((token, fake_lemma(token)) for token in known))
+
+    query = "فصل العاملُ بسبب انتهاء مدة العقد، وفقاً للقانون"
+    expected = clean_text(query)
+    nlp.calls.clear()
+    assert clean_query(query, table) == expected
+    # Only the runs of unknown tokens (here "العاملُ" with its diacritic, and the rest after
+    # the known ones) reach Stanza, one call per run
+    assert nlp.calls == ["العاملُ بسبب انتهاء مدة", "وفقاً للقانون"]
+
+    nlp.calls.clear()
+    assert clean_query("العقد، فصل", table) == clean_text("العقد، فصل")
+    assert nlp.calls == ["العقد، فصل"]  # from clean_text only
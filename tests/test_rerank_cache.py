@@ -0,0 +1,76 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("langchain")
+from langchain.schema import Document
+from src.rag.article_graph import ArticleGraph
+from src.rag.caching import LRUCache
+from src.rag.hybrid_retrieval import HybridRetriever, normalize_query_key
+from src.rag.reranker import CrossEncoderReranker
+from tiny_models import load_article_texts, build_tiny_tokenizer, build_tiny_cross_encoder
+
+
+def make_retriever(texts):
+    # Only the state rerank() needs, without loading the embedding models and indexes
+    retriever = HybridRetriever.__new__(HybridRetriever)
+    tokenizer = build_tiny_tokenizer(load_article_texts())
+    retriever.reranker = CrossEncoderReranker(tokenizer=tokenizer, model=build_tiny_cross_encoder(tokenizer))
+    retriever.rerank_cache = LRUCache(100)
+    retriever.rerank_cascade = None
+    retriever.corpus_version = "v1"
+    documents = [Document(page_content=text, metadata={"original_text": text, "law_short": "labour", "article_number": i})
+                 for i, text in enumerate(texts)]
+    retriever.article_graph = ArticleGraph(documents)
+    retriever.link_hops = 1
+    return retriever, documents
+
+
+def test_normalize_query_key_merges_near_identical_questions():
+    assert normalize_query_key("ما هي مدة الإجازة السنوية؟") == normalize_query_key("  ما هى مدة الاجازة   السنويه ")
+
+
+def test_only_uncached_pairs_reach_the_model():
+    retriever, documents = make_retriever(load_article_texts(6))
+    first = retriever.rerank("ما هي مدة الإجازة السنوية؟", documents[:4], rank_diff_threshold=10)
+    scored_tokens = retriever.reranker.stats()["real_tokens"]
+
+    second = retriever.rerank("ما هى مدة الاجازة السنويه", documents[:4], rank_diff_threshold=10)
+    assert second == first
+    assert retriever.reranker.stats()["real_tokens"] == scored_tokens
+    assert retriever.rerank_cache.stats()["hits"] == 4
+
+    retriever.rerank("ما هي مدة الإجازة السنوية؟", documents[2:], rank_diff_threshold=10)
+    assert retriever.rerank_cache.stats()["hits"] == 6
+    assert len(retriever.rerank_cache) == 6
+
+
+def test_corpus_version_invalidates_scores():
+    retriever, documents = make_retriever(load_article_texts(2))
+    retriever.rerank("سؤال", documents)
+    retriever.corpus_version = "v2"
+    retriever.rerank("سؤال", documents)
+    assert retriever.rerank_cache.stats()["hits"] == 0
+
+
+def test_retrieval_cascade_keeps_the_first_candidates():
+    retriever, documents = make_retriever(load_article_texts(6))
+    retriever.rerank_cascade, retriever.cascade_depth = "retrieval", 3
+    selected = retriever.rerank("سؤال", documents, rank_diff_threshold=10)
+    assert sorted(row[0] for row in selected) == sorted(doc.page_content for doc in documents[:3])
+
+
+def test_cross_encoder_cascade_prunes_before_the_large_model():
+    retriever, documents = make_retriever(load_article_texts(6))
+    small_tokenizer = build_tiny_tokenizer(load_article_texts(), vocab_size=500)
+    retriever.cascade_reranker = CrossEncoderReranker(tokenizer=small_tokenizer,
+                                                      model=build_tiny_cross_encoder(small_tokenizer, hidden_size=16, num_layers=1, seed=1))
+    retriever.rerank_cascade, retriever.cascade_depth = "cross_encoder", 2
+    query = "ما هي مدة الإجازة السنوية؟"
+
+    small_scores = retriever.cascade_reranker.score(query, [doc.page_content for doc in documents])
+    expected = sorted(range(6), key=lambda i: small_scores[i], reverse=True)[:2]
+    selected = retriever.rerank(query, documents, rank_diff_threshold=10)
+    assert sorted(row[0] for row in selected) == sorted(documents[i].page_content for i in expected)
+    # Only the kept pairs reach the large model
+    kept_features = retriever.reranker.encode(query, [documents[i].page_content for i in expected])
+    assert retriever.reranker.stats()["real_tokens"] == sum(len(feature["input_ids"]) for feature in kept_features)
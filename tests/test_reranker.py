@@ -0,0 +1,65 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("tokenizers")
+from src.rag.reranker import CrossEncoderReranker, plan_batches, padded_tokens
+from tiny_models import load_article_texts, build_tiny_tokenizer, build_tiny_cross_encoder
+
+
+@pytest.fixture(scope="module")
+def reranker():
+    tokenizer = build_tiny_tokenizer(load_article_texts())
+    return CrossEncoderReranker(tokenizer=tokenizer, model=build_tiny_cross_encoder(tokenizer),
+                                max_batch_size=4, max_batch_tokens=512)
+
+
+def test_plan_batches_respects_limits():
+    lengths = [500, 12, 40, 300, 13, 90, 11, 250, 35]
+    batches = plan_batches(lengths, max_batch_size=3, max_batch_tokens=600)
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    for batch in batches:
+        assert len(batch) <= 3
+        assert len(batch) == 1 or len(batch) * max(lengths[i] for i in batch) <= 600
+    assert padded_tokens(lengths, batches) < len(lengths) * max(lengths)
+
+
+def test_micro_batched_scores_match_single_batch(reranker):
+    texts = load_article_texts(30)
+    query = "ما هي مدة الاجازة السنوية للعامل"
+    scores = reranker.score(query, texts)
+
+    inputs = reranker.tokenizer([[query, text] for text in texts], padding=True, truncation=True,
+                                max_length=512, return_tensors='pt')
+    with torch.no_grad():
+        expected = reranker.model(**inputs).logits.view(-1).tolist()
+    assert scores == pytest.approx(expected, abs=1e-4)
+    assert reranker.stats()["padded_tokens"] < inputs["input_ids"].numel()
+
+
+def test_empty_input(reranker):
+    assert reranker.score("سؤال", []) == []
+
+
+@pytest.mark.parametrize("max_length", [512, 101])
+def test_cached_pair_inputs_match_tokenizer(reranker, max_length):
+    reranker = CrossEncoderReranker(tokenizer=reranker.tokenizer, model=reranker.model, max_length=max_length)
+    texts = load_article_texts(60)
+    words = " ".join(texts).split()
+    # Short, long and over-long queries exercise every branch of the longest-first truncation
+    for query in ["ما هي مدة الاجازة", " ".join(words[:40]), " ".join(words[:300]), " ".join(words[1000:1700])]:
+        encodings = reranker.tokenizer([[query, text] for text in texts], truncation=True, max_length=max_length)
+        features = reranker.encode(query, texts)
+        assert [feature["input_ids"] for feature in features] == encodings["input_ids"]
+        assert [feature["attention_mask"] for feature in features] == encodings["attention_mask"]
+
+
+def test_token_cache_persists(tmp_path, reranker):
+    path = str(tmp_path / "reranker_tokens.json")
+    texts = load_article_texts(5)
+    cached = CrossEncoderReranker(tokenizer=reranker.tokenizer, model=reranker.model, token_cache_path=path)
+    expected = cached.text_ids(texts)
+    cached.save_token_cache()
+    reloaded = CrossEncoderReranker(tokenizer=reranker.tokenizer, model=reranker.model, token_cache_path=path)
+    assert len(reloaded.text_token_ids) == 5
+    assert reloaded.text_ids(texts) == expected
@@ -0,0 +1,143 @@
+import os
+import json
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def load_article_texts(limit=None):
+    with open(os.path.join(REPO_ROOT, "data/merged_data/legal_articles_with_short.json"), 'r', encoding='utf-8') as f:
+        return [item['page_content'] for item in json.load(f)][:limit]
+
+
+def build_tiny_tokenizer(texts, vocab_size=2000):
+    """
+    A small XLM-R style BPE tokenizer trained on the given texts, standing in for the
+    bge-reranker tokenizer when the HuggingFace models cannot be downloaded.
+    """
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors, trainers
+    from transformers import XLMRobertaTokenizerFast
+
+    tokenizer = Tokenizer(models.BPE(unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    special_tokens = ["<s>", "<pad>", "</s>", "<unk>"]
+    tokenizer.train_from_iterator(texts, trainers.BpeTrainer(vocab_size=vocab_size, special_tokens=special_tokens))
+    bos, eos = tokenizer.token_to_id("<s>"), tokenizer.token_to_id("</s>")
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="<s> $A </s>",
+        pair="<s> $A </s> </s> $B </s>",
+        special_tokens=[("<s>", bos), ("</s>", eos)],
+    )
+    return XLMRobertaTokenizerFast(tokenizer_object=tokenizer, bos_token="<s>", eos_token="</s>", sep_token="</s>",
+                                   cls_token="<s>", pad_token="<pad>", unk_token="<unk>", mask_token="<unk>",
+                                   model_max_length=512)
+
+
+def build_tiny_cross_encoder(tokenizer, hidden_size=32, num_layers=2, seed=0, initializer_range=0.02):
+    """
+    A randomly initialized XLM-R sequence classifier with one output, the architecture of
+    bge-reranker-v2-m3 at a tiny size. A larger initializer_range spreads the scores apart,
+    which the default keeps within a few 1e-5.
+    """
+    import torch
+    from transformers import XLMRobertaConfig, XLMRobertaForSequenceClassification
+
+    torch.manual_seed(seed)
+    config = XLMRobertaConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=hidden_size,
+        num_hidden_layers=num_layers,
+        num_attention_heads=2,
+        intermediate_size=hidden_size * 2,
+        max_position_embeddings=514,
+        pad_token_id=tokenizer.pad_token_id,
+        bos_token_id=tokenizer.bos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        initializer_range=initializer_range,
+        num_labels=1,
+    )
+    return XLMRobertaForSequenceClassification(config).eval()
+
+
+def build_tiny_sentence_transformer(tokenizer, path, hidden_size=32, num_layers=2, seed=0, initializer_range=0.02):
+    """
+    A randomly initialized XLM-R encoder with mean pooling and normalization, saved to path and
+    loaded as a SentenceTransformer, the layout of multilingual-e5-large at a tiny size.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import XLMRobertaConfig, XLMRobertaModel
+
+    torch.manual_seed(seed)
+    config = XLMRobertaConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=hidden_size,
+        num_hidden_layers=num_layers,
+        num_attention_heads=2,
+        intermediate_size=hidden_size * 2,
+        max_position_embeddings=514,
+        pad_token_id=tokenizer.pad_token_id,
+        bos_token_id=tokenizer.bos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        initializer_range=initializer_range,
+    )
+    XLMRobertaModel(config).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    transformer = models.Transformer(path, max_seq_length=512)
+    pooling = models.Pooling(hidden_size, pooling_mode="mean")
+    return SentenceTransformer(modules=[transformer, pooling, models.Normalize()], device="cpu")
+
+
+def build_tiny_retriever(path, items, embeddings=None, reranker=None, **kwargs):
+    """
+    A NumPy-backend HybridRetriever over the given corpus items (page_content and metadata),
+    built through its constructor with a fake embedder and a tiny reranker injected instead of
+    the HuggingFace models. The processed corpus cache is filled with the raw texts, standing in
+    for Stanza, and the docstore and dense index are written under path first.
+
+    Keyword arguments override the constructor arguments, e.g. documents= for a corpus artifact.
+    """
+    from langchain.schema import Document
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from src.rag.corpus_cache import ProcessedCorpusCache
+    from src.rag.dense_index import NumpyDenseIndex
+    from src.rag.hybrid_retrieval import HybridRetriever
+    from src.rag.packed_docstore import open_docstore
+    from src.rag.reranker import CrossEncoderReranker
+
+    path = str(path)
+    cache = ProcessedCorpusCache(os.path.join(path, "processed"))
+    for item in items:
+        cache.put(item["page_content"], item["page_content"])
+    cache.save()
+    documents_path = os.path.join(path, "articles.json")
+    with open(documents_path, 'w', encoding='utf-8') as f:
+        json.dump(items, f, ensure_ascii=False, indent=2)
+
+    embeddings = embeddings or DeterministicFakeEmbedding(size=16)
+    documents = [Document(page_content=item["page_content"], metadata=dict(item["metadata"], original_text=item["page_content"]))
+                 for item in items]
+    parents, children = HybridRetriever.split_parent_documents(documents)
+    open_docstore(os.path.join(path, "docstore.sqlite")).mset(parents)
+    NumpyDenseIndex.from_embeddings(embeddings.embed_documents([child.page_content for child in children]),
+                                    [f"chunk-{i}" for i in range(len(children))],
+                                    [child.metadata["doc_id"] for child in children],
+                                    model_name="fake-embeddings").save(os.path.join(path, "dense"))
+    if reranker is None:
+        tokenizer = build_tiny_tokenizer(load_article_texts())
+        reranker = CrossEncoderReranker(tokenizer=tokenizer, model=build_tiny_cross_encoder(tokenizer))
+
+    options = {
+        "documents": documents_path,
+        "embedding_model_name": "fake-embeddings",
+        "dense_backend": "numpy",
+        "docstore_path": os.path.join(path, "docstore.sqlite"),
+        "dense_index_path": os.path.join(path, "dense"),
+        "sparse_index_path": os.path.join(path, "bm25"),
+        "processed_cache_dir": os.path.join(path, "processed"),
+        "query_lemma_lookup": False,
+        "retrieval_workers": 2,
+        "embeddings": embeddings,
+        "reranker": reranker,
+    }
+    options.update(kwargs)
+    return HybridRetriever(**options)